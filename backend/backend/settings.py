@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+from celery.schedules import crontab
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -26,6 +27,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "allauth",
     "allauth.account",
     "allauth.headless",
@@ -77,6 +79,12 @@ TEMPLATES = [
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # application/json via orjson, application/msgpack on request; see dashboard/renderers.py
+    'DEFAULT_RENDERER_CLASSES': [
+        'dashboard.renderers.ORJSONRenderer',
+        'dashboard.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 # SPECTACULAR_SETTINGS = {
@@ -128,6 +136,49 @@ CELERY_RESULT_BACKEND = 'redis://localhost:6379/1'  # Store task results
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
+CELERY_BEAT_SCHEDULE = {
+    'maintain-review-partitions': {
+        'task': 'reviews.tasks.maintain_review_partitions',
+        'schedule': crontab(minute=0, hour=3),
+    },
+    'prerender-scheduled-reports': {
+        'task': 'dashboard.tasks.prerender_scheduled_reports',
+        'schedule': crontab(minute=0, hour=4),
+    },
+}
+
+# Monthly Review partitions (see reviews/partitions.py); None keeps every month
+REVIEW_PARTITION_RETAIN_MONTHS = None
+# Query language for feedback search when the request has no ?lang= (see reviews/search.py)
+REVIEW_SEARCH_LANGUAGE = 'en'
+# Report jobs (dashboard.ReportJob) still pending or running after this many seconds are failed
+REPORT_JOB_TIMEOUT = 30 * 60
+# Preset reports rendered nightly per tenant, and how long stored reports are kept
+SCHEDULED_REPORT_PRESETS = ['daily', 'weekly', 'monthly', 'quarterly']
+REPORT_STORE_RETENTION_DAYS = 7
+# Stored Gemini trend analyses (dashboard/analysis_cache.py): lifetime in seconds and row limit
+LLM_ANALYSIS_CACHE_TTL = 7 * 24 * 60 * 60
+LLM_ANALYSIS_CACHE_MAX_ENTRIES = 1000
+# Trend analysis: "sample" sends at most 200 reviews in one call, "map_reduce" covers every review in
+# token-bounded batches, up to GEMINI_MAX_CHUNKS batches per analysis before it samples down to fit
+GEMINI_SUMMARY_MODE = 'sample'
+GEMINI_CHUNK_TOKENS = 24000
+GEMINI_MAX_CHUNKS = 8
+GEMINI_MAP_CONCURRENCY = 4
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_CACHE_URL', 'redis://localhost:6379/2'),
+    }
+}
+DASHBOARD_CACHE_TTL = 60 * 60 * 24  # upper bound; entries are invalidated by data version
+DASHBOARD_CACHE_LOCK_TTL = 30  # seconds one request may hold the recompute lock
+
+# Approximate dashboard counts (?approx=1/0/auto); see dashboard/approx.py
+DASHBOARD_APPROX_MODE = 'auto'
+DASHBOARD_APPROX_AUTO_ROWS = 1_000_000  # estimated rollup rows before "auto" samples
+DASHBOARD_APPROX_SAMPLE_ROWS = 20_000  # target sample size
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -162,6 +213,10 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Generated report files; point the default storage at object storage in production
+MEDIA_URL = "media/"
+MEDIA_ROOT = BASE_DIR / "media"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
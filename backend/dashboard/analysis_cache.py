@@ -0,0 +1,71 @@
+"""
+Persistent cache of LLM trend analyses.
+
+An analysis is keyed by a fingerprint of the model, the prompt template
+version, the category, the date range text and the SHA-256 of every review
+text, sorted so the order reviews come back in does not matter. The same
+reviews asked about again return the stored result without calling the
+model; one new or edited review changes the fingerprint. Rows live in
+the database so they survive restarts and are shared by every worker.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import AnalysisCacheEntry
+
+
+def _ttl():
+    return timedelta(seconds=getattr(settings, 'LLM_ANALYSIS_CACHE_TTL', 7 * 24 * 60 * 60))
+
+
+def _max_entries():
+    return getattr(settings, 'LLM_ANALYSIS_CACHE_MAX_ENTRIES', 1000)
+
+
+def analysis_fingerprint(model_name, prompt_version, category, date_range, reviews):
+    review_hashes = sorted(hashlib.sha256(review.encode()).hexdigest() for review in reviews)
+    parts = [model_name, prompt_version, category, date_range, review_hashes]
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+
+def get_cached_analysis(fingerprint):
+    """The stored result for a fingerprint, or None when missing or expired."""
+    now = timezone.now()
+    entry = AnalysisCacheEntry.objects.filter(fingerprint=fingerprint, expires_at__gt=now).first()
+    if entry is None:
+        return None
+    AnalysisCacheEntry.objects.filter(fingerprint=fingerprint).update(last_used_at=now, hits=F('hits') + 1)
+    return entry.result
+
+
+def store_analysis(fingerprint, result, model_name, prompt_version, category, review_count):
+    now = timezone.now()
+    AnalysisCacheEntry.objects.update_or_create(
+        fingerprint=fingerprint,
+        defaults={
+            'model_name': model_name,
+            'prompt_version': prompt_version,
+            'category': category,
+            'review_count': review_count,
+            'result': result,
+            'last_used_at': now,
+            'expires_at': now + _ttl(),
+        },
+    )
+    evict_analyses(now)
+
+
+def evict_analyses(now=None):
+    """Drop expired entries, then the least recently used beyond the size limit. Returns how many went."""
+    removed, _ = AnalysisCacheEntry.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    excess = AnalysisCacheEntry.objects.count() - _max_entries()
+    if excess > 0:
+        oldest = list(AnalysisCacheEntry.objects.order_by('last_used_at').values_list('fingerprint', flat=True)[:excess])
+        evicted, _ = AnalysisCacheEntry.objects.filter(fingerprint__in=oldest).delete()
+        removed += evicted
+    return removed
@@ -0,0 +1,168 @@
+"""
+Approximate counts for very large tenants.
+
+`?approx=1` forces a sampled answer, `?approx=0` an exact one and
+`?approx=auto` (the default, see DASHBOARD_APPROX_MODE) samples only when
+the planner estimates more rollup rows than DASHBOARD_APPROX_AUTO_ROWS.
+
+Samples are whole days of the tenant's ReviewDailyRollup rows: a
+systematic sample of n of the window's N days, read through the
+(user_data, day, ...) unique index, so a sample touches only its own rows
+instead of every page of the shared table. Totals are N times the mean
+sampled day, with the usual cluster-sampling variance
+N^2 (1 - n/N) s^2 / n over per-day sums. Shares use the ratio estimator
+with its delta-method variance. Bounds are reported at 95% confidence.
+"""
+import json
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+from rest_framework.exceptions import ValidationError
+
+from reviews.models import ReviewDailyRollup
+
+APPROX_Z = 1.96
+APPROX_MODES = {'1': 'on', 'true': 'on', 'on': 'on', '0': 'off', 'false': 'off', 'off': 'off', 'auto': 'auto'}
+GROUP_FIELDS = ('source', 'sentiment', 'category')
+# Fixed offset into the systematic sample: repeated polls read the same days, so numbers don't jitter
+SAMPLE_SEED = 17
+
+FIRST_DAY_SQL = """
+SELECT MIN((SELECT MIN(day) FROM {table} WHERE user_data_id = tenant)) FROM unnest(%s::bigint[]) AS tenant
+"""
+
+SAMPLE_SQL = """
+SELECT day, {field} AS key, SUM(review_count) AS count
+FROM {table}
+WHERE user_data_id = ANY(%s) AND day = ANY(%s::date[])
+GROUP BY day, {field}
+"""
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def estimated_rows(queryset):
+    """Planner row estimate for a queryset: one EXPLAIN round trip, no scan."""
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        # e.g. user_data_id__in=[] for a tenant without UserData yet
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def sample_percent(request, rollups):
+    """
+    Share of `rollups` to sample, as a percentage, or None for an exact answer.
+
+    The sample is sized to read roughly DASHBOARD_APPROX_SAMPLE_ROWS rows.
+    """
+    value = request.query_params.get('approx', _setting('DASHBOARD_APPROX_MODE', 'auto'))
+    mode = APPROX_MODES.get(str(value).lower())
+    if mode is None:
+        raise ValidationError({'approx': "Expected 1, 0 or auto."})
+    if mode == 'off':
+        return None
+
+    rows = estimated_rows(rollups)
+    if rows == 0:
+        return None
+    if mode == 'auto' and rows <= _setting('DASHBOARD_APPROX_AUTO_ROWS', 1_000_000):
+        return None
+    percent = 100.0 * _setting('DASHBOARD_APPROX_SAMPLE_ROWS', 20_000) / max(rows, 1)
+    return None if percent >= 100 else max(percent, 0.01)
+
+
+def _bound(variance):
+    return APPROX_Z * math.sqrt(max(variance, 0.0))
+
+
+def _first_day(user_data_ids):
+    """Earliest rollup day across the tenant's UserData, one index probe each."""
+    table = connection.ops.quote_name(ReviewDailyRollup._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(FIRST_DAY_SQL.format(table=table), [list(user_data_ids)])
+        return cursor.fetchone()[0]
+
+
+def sample_days(start, end, percent):
+    """Every k-th day of [start, end] so that about `percent` of the days are kept."""
+    days = (end - start).days + 1
+    step = max(1, min(days // 2, round(100 / percent)))
+    offset = SAMPLE_SEED % step
+    return [start + timedelta(days=day) for day in range(offset, days, step)], days
+
+
+def _variance(values, n, population):
+    """Variance of N * mean(values) for a sample of n of `population` clusters."""
+    if n < 2:
+        return 0.0
+    mean = sum(values) / n
+    spread = sum((value - mean) ** 2 for value in values) / (n - 1)
+    return population ** 2 * (1 - n / population) * spread / n
+
+
+def sampled_counts(user_data_ids, window, field, percent):
+    """
+    Estimated review counts per `field` value over a window, with error bounds.
+
+    Returns {'total': {...}, 'groups': {value: {...}}} where each entry has
+    'count' and 'error' (absolute, 95%), and groups also have 'share' and
+    'share_error' as percentages of the total.
+    """
+    if field not in GROUP_FIELDS:
+        raise ValueError(f"Cannot sample by {field}")
+    result = {'total': {'count': 0, 'error': 0}, 'groups': {}}
+    start = window.start or _first_day(user_data_ids)
+    if start is None or start > window.end:
+        return result
+
+    days, population = sample_days(start, window.end, percent)
+    sql = SAMPLE_SQL.format(
+        field=connection.ops.quote_name(field),
+        table=connection.ops.quote_name(ReviewDailyRollup._meta.db_table),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [list(user_data_ids), days])
+        rows = cursor.fetchall()
+
+    # Per-day sums; sampled days without reviews count as zeros
+    n = len(days)
+    index = {day: i for i, day in enumerate(days)}
+    totals = [0] * n
+    groups = {}
+    for day, key, count in rows:
+        totals[index[day]] += count
+        groups.setdefault(key, [0] * n)[index[day]] += count
+
+    def estimate(values):
+        return {'count': round(population * sum(values) / n), 'error': round(_bound(_variance(values, n, population)))}
+
+    kept_total = sum(totals)
+    result['total'] = estimate(totals)
+    for key, values in groups.items():
+        entry = estimate(values)
+        share = sum(values) / kept_total if kept_total else 0.0
+        # Delta-method variance of the ratio estimator sum(values) / sum(totals)
+        residuals = [value - share * total for value, total in zip(values, totals)]
+        mean_total = kept_total / n
+        share_variance = (_variance(residuals, n, population) / population ** 2 / mean_total ** 2
+                          if kept_total else 0.0)
+        entry['share'] = round(share * 100, 2)
+        entry['share_error'] = round(_bound(share_variance) * 100, 2)
+        result['groups'][key] = entry
+    return result
+
+
+def approximation_info(percent):
+    return {'sample_percent': round(percent, 4), 'confidence': 0.95, 'method': 'day-cluster-sample'}
@@ -0,0 +1,203 @@
+"""
+Native async variants of the dashboard endpoints for ASGI deployments.
+
+DRF's APIView is synchronous, so these are plain Django async views that
+wrap the request in a DRF Request (so the sync mixins and helpers read
+query params and bodies the same way), authenticate it with the configured
+DRF authentication classes and return JSON.
+
+Blocking work goes through run_blocking(), which hands it to the
+request's own sync thread: each handler does all of its ORM work in one
+call there, on one database connection, while the event loop keeps
+serving other requests. Fanning the queries of one request out over
+separate threads would open a connection per query (with CONN_MAX_AGE=0)
+and was slower than the sync view; see the benchmark_async_views command.
+"""
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Sum
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from onboard.data_version import etag_matches, get_tenant_data_version, request_fingerprint, tag_response, version_etag
+from .approx import sample_percent, sampled_counts
+from .gemini_service import generate_analysis
+from .summary import CHART_SOURCES
+from .timewindows import resolve_time_window, today
+from .views import (
+    RollupMixin, TimeRangeMixin, TimeSeriesMixin, SENTIMENT_SERIES, TREND_ANALYSIS_ERROR,
+    approximate_review_stats, empty_trend_analysis, resolve_trend_analysis_range, review_stats_payload,
+    review_stats_queries, trend_analysis_metadata, trend_analysis_reviews,
+)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run blocking ORM or network work on the request's sync thread.
+
+    Under ASGI every request gets its own thread for thread-sensitive
+    calls, so all of a request's queries share one connection, which
+    request_finished closes or keeps per CONN_MAX_AGE.
+    """
+    return await sync_to_async(func, thread_sensitive=True)(*args, **kwargs)
+
+
+class AsyncAPIView(View):
+    """
+    Minimal async counterpart of APIView.
+
+    Handlers are `async def` methods returning JSON-serialisable data or an
+    HttpResponse. Requests are authenticated by `authentication_classes`
+    (DRF's defaults unless overridden) on a worker thread, and like APIView
+    the view is csrf_exempt: SessionAuthentication enforces CSRF itself.
+    Setting `etag_endpoint` adds the same data-version ETags and 304s as the
+    sync dashboard views.
+    """
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    authentication_required = True
+    etag_endpoint = None
+    parser_classes = [JSONParser, FormParser, MultiPartParser]
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        drf_request = Request(
+            request,
+            parsers=[parser() for parser in self.parser_classes],
+            authenticators=[auth() for auth in self.authentication_classes],
+        )
+        self.request = drf_request
+
+        try:
+            # Request.user runs the authenticators, which may hit the database
+            user = await run_blocking(lambda: drf_request.user)
+            if self.authentication_required and not user.is_authenticated:
+                raise exceptions.NotAuthenticated()
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+
+        method = request.method.lower()
+        handler = getattr(self, method, None) if method in self.http_method_names else None
+        if handler is None:
+            return self.http_method_not_allowed(request, *args, **kwargs)
+
+        etag = None
+        if self.etag_endpoint and method == 'get':
+            etag = await run_blocking(self.get_etag, kwargs)
+            if etag_matches(request, etag):
+                return tag_response(HttpResponseNotModified(), etag)
+
+        try:
+            result = await handler(drf_request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+
+        response = result if isinstance(result, HttpResponse) else JsonResponse(result, safe=False, encoder=DjangoJSONEncoder)
+        if etag and response.status_code == 200:
+            tag_response(response, etag)
+        return response
+
+    def handle_exception(self, exc):
+        """An APIException as JSON, with APIView's 401/403 choice for authentication failures."""
+        authenticate_header = None
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            authenticators = self.request.authenticators
+            authenticate_header = authenticators[0].authenticate_header(self.request) if authenticators else None
+            if not authenticate_header:
+                exc.status_code = 403
+        detail = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+        response = JsonResponse(detail, status=exc.status_code, safe=False)
+        if authenticate_header:
+            response['WWW-Authenticate'] = authenticate_header
+        return response
+
+    def get_etag(self, kwargs):
+        fingerprint = request_fingerprint(self.request, self.etag_endpoint, kwargs, day=today().isoformat())
+        return version_etag(fingerprint, get_tenant_data_version(self.request.user.pk))
+
+
+class AsyncReviewStatsView(RollupMixin, TimeRangeMixin, AsyncAPIView):
+    etag_endpoint = 'review-stats'
+
+    async def get(self, request, *args, **kwargs):
+        return await run_blocking(self.review_stats, request)
+
+    def review_stats(self, request):
+        window = self.get_time_window()
+        rollups = self.get_rollups().filter(**window.rollup_filter())
+
+        percent = sample_percent(request, rollups)
+        if percent is not None:
+            user_data_ids = self.get_user_data_ids()
+            return approximate_review_stats(
+                sampled_counts(user_data_ids, window, 'source', percent),
+                sampled_counts(user_data_ids, window, 'sentiment', percent),
+                percent,
+            )
+        return review_stats_payload(*(query() for query in review_stats_queries(rollups)))
+
+
+class AsyncFeedbackSourcesView(TimeSeriesMixin, AsyncAPIView):
+    etag_endpoint = 'feedback-sources'
+
+    async def get(self, request, time, *args, **kwargs):
+        return await run_blocking(self.feedback_sources, request, time)
+
+    def feedback_sources(self, request, time):
+        window = resolve_time_window(time, request.query_params)
+        source_counts = (self.get_rollups()
+                         .filter(**window.rollup_filter())
+                         .values('source')
+                         .annotate(count=Sum('review_count'))
+                         .order_by('-count'))
+        return {
+            'sources': [{'source': item['source'], 'count': item['count']} for item in source_counts],
+            'sources_over_time': self.get_series('source', CHART_SOURCES),
+        }
+
+
+class AsyncSentimentOverviewView(TimeSeriesMixin, AsyncAPIView):
+    """Sentiment distribution and monthly sentiment trends in one response."""
+    etag_endpoint = 'sentiment-overview'
+
+    async def get(self, request, *args, **kwargs):
+        return await run_blocking(self.sentiment_overview)
+
+    def sentiment_overview(self):
+        distribution = self.get_rollups().values('sentiment').annotate(count=Sum('review_count'))
+        counts = {item['sentiment']: item['count'] for item in distribution}
+        total = sum(counts.values()) or 1  # avoid division by zero
+        return {
+            "overall_distribution": {s: round(counts.get(s, 0) * 100 / total, 2) for s in SENTIMENT_SERIES},
+            "trends": self.get_series('sentiment', SENTIMENT_SERIES),
+        }
+
+
+class AsyncTrendAnalysisView(RollupMixin, AsyncAPIView):
+    """
+    TrendAnalysisView for ASGI workers. How many Gemini requests a call may
+    spend is bounded by GEMINI_SUMMARY_MODE and GEMINI_MAX_CHUNKS.
+    """
+
+    async def post(self, request):
+        category, date_from, date_to, from_date, to_date = resolve_trend_analysis_range(request.data)
+
+        try:
+            review_texts = await run_blocking(lambda: list(
+                trend_analysis_reviews(self.get_user_data_ids(), category, from_date, to_date)))
+            if not review_texts:
+                return empty_trend_analysis(category, date_from, date_to)
+
+            # The Gemini call blocks on the network, so it runs off the event loop
+            analysis_result = await run_blocking(generate_analysis, review_texts, category, date_from)
+            analysis_result["metadata"] = trend_analysis_metadata(len(review_texts), category, date_from, date_to)
+            return analysis_result
+        except Exception as e:
+            return JsonResponse({"error": str(e), **TREND_ANALYSIS_ERROR}, status=500)
@@ -0,0 +1,83 @@
+"""
+Tenant-versioned response cache for the dashboard aggregate views.
+
+Entries are keyed by (user, endpoint, URL kwargs, query params, day) and
+store the tenant data version they were computed at. A version match is a
+hit. Every response carries an ETag for that key and version, so a client
+polling with If-None-Match gets a 304 before any aggregate query runs. A mismatch means new reviews landed: one request takes a short lock
+and recomputes while concurrent requests keep getting the stale payload,
+so a burst of dashboard loads right after an ingest costs one query set
+instead of one per request.
+"""
+import functools
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.response import Response
+
+from onboard.data_version import (
+    etag_matches, get_tenant_data_version, not_modified, request_fingerprint, tag_response, version_etag,
+)
+
+RESPONSE_KEY = "dashboard:{digest}"
+LOCK_KEY = "dashboard-lock:{digest}"
+
+
+def _ttl():
+    return getattr(settings, 'DASHBOARD_CACHE_TTL', 60 * 60 * 24)
+
+
+def _lock_ttl():
+    return getattr(settings, 'DASHBOARD_CACHE_LOCK_TTL', 30)
+
+
+def response_digest(endpoint, request, kwargs):
+    """Stable digest of everything besides the data that can change a dashboard response."""
+    # Time ranges are relative to today, so yesterday's entry never answers today
+    return request_fingerprint(request, endpoint, kwargs, day=timezone.now().date().isoformat())
+
+
+def cached_dashboard_response(endpoint):
+    """Cache a dashboard handler's 200 responses under the tenant's data version."""
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            version = list(get_tenant_data_version(request.user.pk))
+            digest = response_digest(endpoint, request, kwargs)
+            key = RESPONSE_KEY.format(digest=digest)
+            lock_key = LOCK_KEY.format(digest=digest)
+
+            media_type = request.accepted_media_type
+            etag = version_etag(digest, version, media_type)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+            entry = cache.get(key)
+            if entry is not None and entry['version'] == version:
+                response = tag_response(Response(entry['data']), etag)
+                response['X-Cache'] = 'hit'
+                return response
+
+            locked = cache.add(lock_key, 1, timeout=_lock_ttl())
+            if entry is not None and not locked:
+                # Someone else is already recomputing; serve what we have
+                stale_etag = version_etag(digest, entry['version'], media_type)
+                if etag_matches(request, stale_etag):
+                    return not_modified(stale_etag)
+                response = tag_response(Response(entry['data']), stale_etag)
+                response['X-Cache'] = 'stale'
+                return response
+
+            try:
+                response = handler(self, request, *args, **kwargs)
+                if response.status_code == 200:
+                    cache.set(key, {'version': version, 'data': response.data}, timeout=_ttl())
+                    tag_response(response, etag)
+                response['X-Cache'] = 'miss'
+                return response
+            finally:
+                if locked:
+                    cache.delete(lock_key)
+        return wrapper
+    return decorator
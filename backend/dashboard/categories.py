@@ -0,0 +1,100 @@
+"""
+Shared category x sentiment matrix.
+
+The category widgets (product feedback categories, top feedback topics,
+feature-specific feedback) are all views of one pivot over the tenant's
+ReviewDailyRollup rows. It is computed in a single query per tenant and
+time window and cached under the tenant data version, so loading the
+three widgets costs one aggregate instead of three.
+
+A category's dominant sentiment is the classified sentiment with the
+most reviews, picked with row_number() over the category's cells; ties
+break alphabetically so the answer is stable.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from onboard.data_version import get_tenant_data_version
+from reviews.models import ReviewDailyRollup
+
+from .summary import SENTIMENTS
+
+MATRIX_KEY = "dashboard-category-matrix:{digest}"
+TOP_TOPICS = 12
+
+MATRIX_SQL = """
+WITH cells AS (
+    SELECT category, sentiment,
+           SUM(review_count) AS count, SUM(rating_sum) AS rating_sum, SUM(rating_count) AS rating_count
+    FROM {table}
+    WHERE user_data_id = ANY(%s) AND {window}
+    GROUP BY category, sentiment
+), ranked AS (
+    SELECT cells.*,
+           SUM(count) OVER () AS grand_total,
+           row_number() OVER (PARTITION BY category ORDER BY sentiment = '', count DESC, sentiment) AS rank
+    FROM cells
+)
+SELECT category,
+       {sentiment_columns},
+       SUM(count)::bigint AS total,
+       SUM(count) * 100.0 / NULLIF(MAX(grand_total), 0) AS share,
+       MAX(sentiment) FILTER (WHERE rank = 1 AND sentiment <> '') AS dominant_sentiment,
+       SUM(rating_sum) / NULLIF(SUM(rating_count), 0) AS average_rating
+FROM ranked
+GROUP BY category
+ORDER BY total DESC, category
+"""
+
+
+def _matrix_digest(user_data_ids, window):
+    parts = [list(user_data_ids), str(window.start), str(window.end)]
+    return hashlib.sha1(json.dumps(parts).encode()).hexdigest()
+
+
+def compute_category_matrix(user_data_ids, window):
+    """
+    One row per category, largest first: {'category', 'positive', 'negative',
+    'neutral', 'total', 'share', 'dominant_sentiment', 'average_rating'}.
+
+    Unclassified reviews count towards 'total' but never dominate.
+    """
+    window_sql = 'day <= %s'
+    window_params = [window.end]
+    if window.start is not None:
+        window_sql += ' AND day >= %s'
+        window_params.append(window.start)
+    sql = MATRIX_SQL.format(
+        table=connection.ops.quote_name(ReviewDailyRollup._meta.db_table),
+        window=window_sql,
+        sentiment_columns=", ".join(
+            f'COALESCE(SUM(count) FILTER (WHERE sentiment = %s), 0)::bigint AS "{sentiment}"' for sentiment in SENTIMENTS
+        ),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [list(user_data_ids), *window_params, *SENTIMENTS])
+        columns = [column[0] for column in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    for row in rows:
+        row['category'] = row['category'] or None
+        row['share'] = round(float(row['share'] or 0), 2)
+        if row['average_rating'] is not None:
+            row['average_rating'] = round(row['average_rating'], 2)
+    return rows
+
+
+def category_matrix(user_id, user_data_ids, window):
+    """compute_category_matrix(), cached until the tenant's data version moves."""
+    version = list(get_tenant_data_version(user_id))
+    key = MATRIX_KEY.format(digest=_matrix_digest(user_data_ids, window))
+    entry = cache.get(key)
+    if entry is not None and entry['version'] == version:
+        return entry['rows']
+    rows = compute_category_matrix(user_data_ids, window)
+    cache.set(key, {'version': version, 'rows': rows}, timeout=getattr(settings, 'DASHBOARD_CACHE_TTL', 60 * 60 * 24))
+    return rows
@@ -0,0 +1,68 @@
+"""
+Facet counts for the feedback explorer.
+
+Each facet is counted over the listing's search plus every *other* active
+filter, so picking a source still shows how many reviews the remaining
+sources would give. All three facets come from one GROUPING SETS query:
+every row carries one "passes the filter" flag per facet, and each facet's
+count only includes rows that pass the other facets' filters.
+"""
+from django.db import connection
+from django.db.models import BooleanField, ExpressionWrapper, Q, Value
+
+FACET_FIELDS = ('source', 'sentiment', 'category')
+
+# GROUPING(source, sentiment, category) for each single-column grouping set
+FACET_GROUPING = {'source': 0b011, 'sentiment': 0b101, 'category': 0b110}
+
+FACETS_SQL = """
+SELECT GROUPING(f.source, f.sentiment, f.category) AS grouping_id, f.source, f.sentiment, f.category,
+       {counts}
+FROM ({base}) AS f
+GROUP BY GROUPING SETS ((f.source), (f.sentiment), (f.category))
+"""
+
+
+def active_filters(params):
+    """{field: value} for the facet filters a request applies ("all" means no filter)."""
+    return {
+        field: params[field]
+        for field in FACET_FIELDS
+        if params.get(field) and params[field] != 'all'
+    }
+
+
+def facet_counts(queryset, filters):
+    """
+    {field: [{'value': ..., 'count': n}, ...]} for each facet, largest first.
+
+    `queryset` is the listing before the facet filters are applied (tenant
+    and search only); `filters` are the active ones from active_filters().
+    """
+    flags = {
+        f'{field}_ok': ExpressionWrapper(Q(**{field: filters[field]}), output_field=BooleanField())
+        if field in filters else Value(True)
+        for field in FACET_FIELDS
+    }
+    base = queryset.annotate(**flags).values(*FACET_FIELDS, *flags).order_by()
+    base_sql, base_params = base.query.sql_with_params()
+
+    counts = ", ".join(
+        f"COUNT(*) FILTER (WHERE {' AND '.join(f'f.{other}_ok' for other in FACET_FIELDS if other != field)}) AS {field}_count"
+        for field in FACET_FIELDS
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(FACETS_SQL.format(counts=counts, base=base_sql), base_params)
+        rows = cursor.fetchall()
+
+    facets = {field: [] for field in FACET_FIELDS}
+    by_grouping = {grouping: field for field, grouping in FACET_GROUPING.items()}
+    for grouping_id, source, sentiment, category, *field_counts in rows:
+        field = by_grouping[grouping_id]
+        index = FACET_FIELDS.index(field)
+        count = field_counts[index]
+        if count:
+            facets[field].append({'value': (source, sentiment, category)[index], 'count': count})
+    for values in facets.values():
+        values.sort(key=lambda item: (-item['count'], item['value'] or ''))
+    return facets
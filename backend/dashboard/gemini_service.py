@@ -1,8 +1,18 @@
 import os
 import re
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
-from datetime import datetime
+
+from django.conf import settings
+
+from .analysis_cache import analysis_fingerprint, get_cached_analysis, store_analysis
+
+GEMINI_MODEL = "gemini-1.5-pro"
+# Bump whenever the prompt or the result parsing changes, so stored analyses are not reused
+PROMPT_VERSION = 2
+MAX_REVIEWS_FOR_PROMPT = 200  # Keep the sample size manageable in "sample" mode
 
 # Try to import the Gemini package, but provide a fallback if unavailable
 try:
@@ -47,10 +57,31 @@ def generate_analysis(reviews: List[str], category: str, date_range: str) -> Dic
         }
 
     if GEMINI_AVAILABLE and GEMINI_API_KEY:
+        fingerprint = analysis_fingerprint(GEMINI_MODEL, f"{PROMPT_VERSION}:{_summary_mode()}",
+                                           category, date_range, reviews)
+        try:
+            cached = get_cached_analysis(fingerprint)
+        except Exception as e:
+            print(f"Warning: analysis cache unavailable: {e}")
+            cached = None
+        if cached is not None:
+            print(f"Using cached Gemini analysis for {len(reviews)} reviews.")
+            # The stored timings, if any, describe the run that filled the cache, not this request
+            cached.pop("timings", None)
+            return {**cached, "cached": True}
+
         print(f"Attempting analysis with Gemini for {len(reviews)} reviews...")
         try:
             result = _analyze_with_gemini(reviews, category, date_range)
-            result["analysis_type"] = "gemini"
+            # Text extraction fallbacks keep their own type, and map-reduce results merged from
+            # one are flagged degraded; neither is worth storing
+            result.setdefault("analysis_type", "gemini")
+            if result["analysis_type"] == "gemini" and not result.get("degraded"):
+                try:
+                    stored = {key: value for key, value in result.items() if key != "timings"}
+                    store_analysis(fingerprint, stored, GEMINI_MODEL, PROMPT_VERSION, category, len(reviews))
+                except Exception as e:
+                    print(f"Warning: could not store Gemini analysis: {e}")
             return result
         except Exception as e:
             print(f"Error during Gemini analysis: {e}. Falling back to simple analysis.")
@@ -165,16 +196,37 @@ def _simple_analysis(reviews: List[str], category: str, date_range: str) -> Dict
 def _analyze_with_gemini(reviews: List[str], category: str, date_range: str) -> Dict[str, Any]:
     """
     Use Gemini API for more sophisticated, synthesized analysis focusing on themes.
+
+    In "sample" mode (GEMINI_SUMMARY_MODE, the default) at most
+    MAX_REVIEWS_FOR_PROMPT evenly spaced reviews are sent. In "map_reduce"
+    mode a set that does not fit in one prompt goes through
+    _map_reduce_analysis(), which covers every review that fits in
+    GEMINI_MAX_CHUNKS batches.
     """
-    # Sampling strategy 
-    MAX_REVIEWS_FOR_PROMPT = 200  # Keep the sample size manageable
-    if len(reviews) > MAX_REVIEWS_FOR_PROMPT:
-        step = max(1, len(reviews) // MAX_REVIEWS_FOR_PROMPT)
-        sampled_reviews = [reviews[i] for i in range(0, len(reviews), step)][:MAX_REVIEWS_FOR_PROMPT]
-        print(f"Sampled {len(sampled_reviews)} reviews out of {len(reviews)} for Gemini.")
-    else:
+    started = time.perf_counter()
+    if _summary_mode() == "map_reduce":
+        if _estimate_tokens(reviews) > _chunk_tokens():
+            return _map_reduce_analysis(reviews, category, date_range)
         sampled_reviews = reviews
+    else:
+        # Sampling strategy 
+        if len(reviews) > MAX_REVIEWS_FOR_PROMPT:
+            step = max(1, len(reviews) // MAX_REVIEWS_FOR_PROMPT)
+            sampled_reviews = [reviews[i] for i in range(0, len(reviews), step)][:MAX_REVIEWS_FOR_PROMPT]
+            print(f"Sampled {len(sampled_reviews)} reviews out of {len(reviews)} for Gemini.")
+        else:
+            sampled_reviews = reviews
+
+    result = _call_gemini(_analysis_prompt(sampled_reviews, category, date_range), category, date_range)
+    result["timings"] = {
+        "mode": "single",
+        "reviews": len(sampled_reviews),
+        "total_seconds": round(time.perf_counter() - started, 3),
+    }
+    return result
 
+
+def _analysis_prompt(sampled_reviews: List[str], category: str, date_range: str) -> str:
     # Prepare reviews text for the prompt
     reviews_text = "\n\n".join([f"Review {i+1}:\n{review}" for i, review in enumerate(sampled_reviews)])
 
@@ -234,9 +286,13 @@ Based *only* on the provided review texts, generate the following analysis:
 
 **Generate the JSON output now based on the provided reviews.**
 """
+    return prompt
+
 
+def _call_gemini(prompt: str, category: str, date_range: str) -> Dict[str, Any]:
+    """Send one prompt to Gemini and parse the JSON analysis it returns."""
     # Initialize the model (using 1.5 Pro as it's generally better for nuanced tasks)
-    model = genai.GenerativeModel(model_name="gemini-1.5-pro")
+    model = genai.GenerativeModel(model_name=GEMINI_MODEL)
 
     # Configure safety settings
     safety_settings = [
@@ -300,6 +356,181 @@ Based *only* on the provided review texts, generate the following analysis:
         raise  # Re-raise the exception so the calling function handles the fallback
 
 
+def _summary_mode() -> str:
+    return getattr(settings, "GEMINI_SUMMARY_MODE", "sample")
+
+
+def _chunk_tokens() -> int:
+    return getattr(settings, "GEMINI_CHUNK_TOKENS", 24000)
+
+
+def _max_chunks() -> int:
+    return max(1, getattr(settings, "GEMINI_MAX_CHUNKS", 8))
+
+
+def _map_concurrency() -> int:
+    return max(1, getattr(settings, "GEMINI_MAP_CONCURRENCY", 4))
+
+
+def _estimate_tokens(texts: List[str]) -> int:
+    # About four characters per token for English text; only used to size batches
+    return sum(len(text) // 4 + 1 for text in texts)
+
+
+def _pack(items: List[Any], sizes: List[int], max_tokens: int) -> List[List[Any]]:
+    """Group items, in order, so each group's estimated size stays within max_tokens."""
+    groups, current, current_tokens = [], [], 0
+    for item, tokens in zip(items, sizes):
+        if current and current_tokens + tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def chunk_reviews(reviews: List[str], max_tokens: int) -> List[List[str]]:
+    """Split reviews, in order, into batches of at most max_tokens estimated tokens each."""
+    # A single oversized review is truncated rather than dropped
+    reviews = [review[:max_tokens * 4] for review in reviews]
+    return _pack(reviews, [_estimate_tokens([review]) for review in reviews], max_tokens)
+
+
+def budget_chunks(reviews: List[str], max_tokens: int, max_chunks: int) -> List[List[str]]:
+    """
+    chunk_reviews(), but never more than max_chunks batches: a larger set is
+    thinned to every n-th review, with n the smallest step that fits.
+    """
+    chunks = chunk_reviews(reviews, max_tokens)
+    step = 1
+    while len(chunks) > max_chunks:
+        step = max(step + 1, -(-step * len(chunks) // max_chunks))
+        chunks = chunk_reviews(reviews[::step], max_tokens)
+    return chunks
+
+
+def _is_degraded(result: Dict[str, Any]) -> bool:
+    return result.get("analysis_type") == "gemini_text_fallback"
+
+
+def _chunk_prompt(chunk: List[str], index: int, total: int, category: str, date_range: str) -> str:
+    reviews_text = "\n\n".join(f"Review {i+1}:\n{review}" for i, review in enumerate(chunk))
+    return f"""
+The following {len(chunk)} customer reviews for the category '{category}' ({date_range}) are batch {index} of {total} from a larger set. Summarize this batch so it can later be merged with the other batches.
+
+--- START REVIEWS ---
+{reviews_text}
+--- END REVIEWS ---
+
+Based *only* on these reviews, return a valid JSON object with exactly these keys:
+* "summary": 2-4 sentences on the main sentiment patterns in this batch.
+* "positiveInsights": 2-6 recurring themes customers praised, as strings.
+* "negativeInsights": 2-6 recurring themes customers criticized, as strings.
+
+Do not include any text outside the JSON object.
+"""
+
+
+def _merge_prompt(partials: List[Dict[str, Any]], category: str, date_range: str, final: bool) -> str:
+    review_count = sum(partial["reviewCount"] for partial in partials)
+    partials_text = json.dumps(partials, ensure_ascii=False, indent=1)
+    if final:
+        instructions = """* "summary": a 3-5 sentence overview of the customer experience, naming the most prominent positive and negative themes.
+* "positiveInsights": 4-8 distinct recurring themes customers praised, as strings.
+* "negativeInsights": 4-8 distinct recurring themes customers criticized, as strings."""
+    else:
+        instructions = """* "summary": 2-4 sentences on the main sentiment patterns.
+* "positiveInsights": 2-6 recurring themes customers praised, as strings.
+* "negativeInsights": 2-6 recurring themes customers criticized, as strings."""
+    return f"""
+Below are {len(partials)} partial analyses, each of one batch of customer reviews for the category '{category}' ({date_range}), {review_count} reviews in total. "reviewCount" is how many reviews each batch covered.
+
+--- START PARTIAL ANALYSES ---
+{partials_text}
+--- END PARTIAL ANALYSES ---
+
+Merge them into one analysis of all {review_count} reviews. Weigh each batch by its reviewCount, combine themes that say the same thing and keep the ones that recur across batches. Return a valid JSON object with exactly these keys:
+{instructions}
+
+Do not include any text outside the JSON object.
+"""
+
+
+def _partial(result: Dict[str, Any], review_count: int) -> Dict[str, Any]:
+    return {
+        "summary": result["summary"],
+        "positiveInsights": result["positiveInsights"],
+        "negativeInsights": result["negativeInsights"],
+        "reviewCount": review_count,
+    }
+
+
+def _map_reduce_analysis(reviews: List[str], category: str, date_range: str) -> Dict[str, Any]:
+    """
+    Analyse every review: summarize token-bounded batches in parallel (map),
+    then merge the batch summaries (reduce). Merges that would not fit in one
+    prompt are done in parallel rounds first, so any number of reviews ends
+    in a single final call. A set needing more than GEMINI_MAX_CHUNKS batches
+    is sampled down to that many, which bounds the calls per analysis. At
+    most GEMINI_MAP_CONCURRENCY requests run at once. Per-stage wall-clock
+    times are returned under "timings"; "degraded" is set when any call only
+    came back through text extraction.
+    """
+    started = time.perf_counter()
+    max_tokens = _chunk_tokens()
+    chunks = budget_chunks(reviews, max_tokens, _max_chunks())
+    analysed = sum(len(chunk) for chunk in chunks)
+    print(f"Map-reduce analysis of {analysed} of {len(reviews)} reviews in {len(chunks)} batches...")
+
+    with ThreadPoolExecutor(max_workers=_map_concurrency()) as pool:
+        results = list(pool.map(
+            lambda item: _call_gemini(_chunk_prompt(item[1], item[0], len(chunks), category, date_range),
+                                      category, date_range),
+            enumerate(chunks, 1),
+        ))
+        degraded = sum(map(_is_degraded, results))
+        partials = [_partial(result, len(chunk)) for result, chunk in zip(results, chunks)]
+        map_seconds = time.perf_counter() - started
+
+        # Intermediate merge rounds until the partials fit in one prompt
+        rounds = 0
+        while len(partials) > 1 and _estimate_tokens([json.dumps(partials)]) > max_tokens:
+            groups = _pack(partials, [_estimate_tokens([json.dumps(partial)]) for partial in partials], max_tokens)
+            if len(groups) == len(partials):
+                break  # each partial alone fills a prompt; merge what we have
+            merged = list(pool.map(
+                lambda group: _call_gemini(_merge_prompt(group, category, date_range, final=False),
+                                           category, date_range),
+                groups,
+            ))
+            degraded += sum(map(_is_degraded, merged))
+            partials = [_partial(result, sum(p["reviewCount"] for p in group)) for result, group in zip(merged, groups)]
+            rounds += 1
+
+    reduce_started = time.perf_counter()
+    result = _call_gemini(_merge_prompt(partials, category, date_range, final=True), category, date_range)
+    finished = time.perf_counter()
+    degraded += _is_degraded(result)
+    result["degraded"] = degraded > 0
+    result["timings"] = {
+        "mode": "map_reduce",
+        "reviews": len(reviews),
+        "sampled_reviews": analysed,
+        "chunks": len(chunks),
+        "degraded_calls": degraded,
+        "merge_rounds": rounds,
+        "concurrency": _map_concurrency(),
+        "map_seconds": round(map_seconds, 3),
+        "merge_seconds": round(reduce_started - started - map_seconds, 3),
+        "reduce_seconds": round(finished - reduce_started, 3),
+        "total_seconds": round(finished - started, 3),
+    }
+    print(f"Map-reduce analysis finished: {result['timings']}")
+    return result
+
+
 def _extract_from_text_fallback(response_text: str, category: str, date_range: str) -> Dict[str, Any]:
     """Fallback function to attempt extracting analysis sections from raw text if JSON fails."""
     print("Attempting fallback text extraction...")
@@ -348,6 +579,7 @@ def _extract_from_text_fallback(response_text: str, category: str, date_range: s
     return {
         "summary": summary,
         "positiveInsights": positive,
-        "negativeInsights": negative
+        "negativeInsights": negative,
+        "analysis_type": "gemini_text_fallback",
     }
 
@@ -0,0 +1,132 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.test.utils import override_settings
+
+from onboard.models import CustomUser
+from .benchmark_dashboard_summary import NO_CACHE
+
+# (label, sync path, async path)
+ENDPOINTS = [
+    ('review-stats', '/review-stats/{range}/?approx=0', '/async/review-stats/{range}/?approx=0'),
+    ('feedback-sources', '/feedback-sources/{range}/', '/async/feedback-sources/{range}/'),
+    ('sentiment-overview', '/sentiment-distribution/', '/async/sentiment-overview/'),
+]
+
+
+class ConnectionCounter:
+    """connection_created receiver counting new database connections."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, sender, connection, **kwargs):
+        self.count += 1
+
+
+class Command(BaseCommand):
+    """
+    Usage:
+      python manage.py benchmark_async_views --email someone@example.com --requests 200 --concurrency 20
+    """
+    help = ("Serve the same dashboard requests through the ASGI app (async views) and a threaded WSGI "
+            "handler (sync views) and compare wall time and database connections opened.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', required=True, help="Tenant user whose dashboard is requested.")
+        parser.add_argument('--range', default='ALL', help="Time range passed to the endpoints.")
+        parser.add_argument('--requests', type=int, default=100, help="Requests per endpoint and handler.")
+        parser.add_argument('--concurrency', type=int, default=10, help="Requests in flight at once.")
+
+    def _scope(self, path, cookie):
+        path, _, query = path.partition('?')
+        return {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+            'root_path': '', 'server': ('testserver', 80), 'client': ('127.0.0.1', 0),
+            'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+        }
+
+    async def _asgi_request(self, app, path, cookie):
+        communicator = ApplicationCommunicator(app, self._scope(path, cookie))
+        await communicator.send_input({'type': 'http.request', 'body': b''})
+        start = await communicator.receive_output(timeout=60)
+        while (await communicator.receive_output(timeout=60)).get('more_body'):
+            pass
+        await communicator.send_input({'type': 'http.disconnect'})
+        await communicator.wait(timeout=60)
+        return start['status']
+
+    def _run_async(self, path, cookie, total, concurrency):
+        app = get_asgi_application()
+        limit = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with limit:
+                return await self._asgi_request(app, path, cookie)
+
+        async def run():
+            return await asyncio.gather(*(one() for _ in range(total)))
+        return asyncio.run(run())
+
+    def _wsgi_request(self, app, path, cookie):
+        path, _, query = path.partition('?')
+        environ = {'PATH_INFO': path, 'QUERY_STRING': query, 'HTTP_COOKIE': cookie, 'SERVER_NAME': 'testserver'}
+        setup_testing_defaults(environ)
+        statuses = []
+        response = app(environ, lambda status, headers: statuses.append(int(status.split()[0])))
+        try:
+            for _ in response:
+                pass
+        finally:
+            response.close()  # request_finished: connections are closed per CONN_MAX_AGE
+        return statuses[0]
+
+    def _run_sync(self, path, cookie, total, concurrency):
+        # Like a threaded WSGI server; the test Client would keep connections open
+        app = WSGIHandler()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(lambda _: self._wsgi_request(app, path, cookie), range(total)))
+
+    def _measure(self, run, path, cookie, total, concurrency):
+        counter = ConnectionCounter()
+        connection_created.connect(counter)
+        try:
+            started = time.perf_counter()
+            statuses = run(path, cookie, total, concurrency)
+            elapsed = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(counter)
+        if set(statuses) != {200}:
+            raise CommandError(f"{path} returned {sorted(set(statuses))}")
+        return elapsed * 1000 / total, counter.count / total
+
+    def handle(self, *args, **options):
+        try:
+            user = CustomUser.objects.get(email=options['email'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+
+        login = Client()
+        login.force_login(user)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={login.cookies[settings.SESSION_COOKIE_NAME].value}"
+        total, concurrency = options['requests'], options['concurrency']
+
+        self.stdout.write(f"CONN_MAX_AGE={settings.DATABASES['default'].get('CONN_MAX_AGE', 0)}, "
+                          f"{total} requests per row, {concurrency} in flight")
+        self.stdout.write(f"{'endpoint':<22}{'handler':<8}{'ms/req':>10}{'conns/req':>12}")
+        # Every request computes its response, as on a cache miss
+        with override_settings(CACHES=NO_CACHE, ALLOWED_HOSTS=['testserver']):
+            for label, sync_path, async_path in ENDPOINTS:
+                for handler, run, path in [('sync', self._run_sync, sync_path), ('async', self._run_async, async_path)]:
+                    ms, connections = self._measure(run, path.format(range=options['range']), cookie, total, concurrency)
+                    self.stdout.write(f"{label:<22}{handler:<8}{ms:>10.2f}{connections:>12.2f}")
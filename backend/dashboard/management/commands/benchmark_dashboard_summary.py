@@ -0,0 +1,109 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from onboard.models import CustomUser
+from dashboard.views import (
+    ReviewStatsView, LastSixMonthsStatsView, TrendingTopicsView, FeedbackSourcesView,
+    SentimentDistributionView, SentimentTrendsView, SentimentBySourceView,
+    ProductFeedbackCategoriesView, TopFeedbackTopicsView, DashboardSummaryView,
+)
+
+# Every view is wrapped in cached_dashboard_response; without this, runs after the first are cache hits
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+# (label, view, path, url kwargs) for every widget the dashboard home loads
+WIDGET_REQUESTS = [
+    ('review-stats', ReviewStatsView, '/review-stats/{range}/?time_range={range}', {'time_range': '{range}'}),
+    ('last-6-months', LastSixMonthsStatsView, '/last-6-months/{range}/', {'time': '{range}'}),
+    ('trending-topics', TrendingTopicsView, '/trending-topics/{range}/', {'time': '{range}'}),
+    ('feedback-sources', FeedbackSourcesView, '/feedback-sources/{range}/', {'time': '{range}'}),
+    ('sentiment-distribution', SentimentDistributionView, '/sentiment-distribution/', {}),
+    ('sentiment-trends', SentimentTrendsView, '/sentiment-trends/', {}),
+    ('sentiments-by-source', SentimentBySourceView, '/sentiments-by-source/', {}),
+    ('product-feedback-categories', ProductFeedbackCategoriesView, '/product-feedback-categories/', {}),
+    ('top-feedback-topics', TopFeedbackTopicsView, '/top-feedback-topics/', {}),
+]
+
+
+class QueryTimer:
+    """connection.execute_wrapper hook that accumulates query count and DB time."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+class Command(BaseCommand):
+    """
+    Usage:
+      python manage.py benchmark_dashboard_summary --email someone@example.com --range 6M --repeat 20
+    """
+    help = "Compare DB time of the per-widget dashboard endpoints against the consolidated summary endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', required=True, help="Tenant user whose dashboard is benchmarked.")
+        parser.add_argument('--range', default='ALL', help="Time range passed to the endpoints (7D, 14D, 4W, 3M, 6M, 12M, ALL).")
+        parser.add_argument('--repeat', type=int, default=10, help="Number of timed runs per endpoint.")
+
+    def _measure(self, view, path, kwargs, user, repeat):
+        factory = APIRequestFactory()
+        handler = view.as_view()
+        timer = QueryTimer()
+        with override_settings(CACHES=NO_CACHE), connection.execute_wrapper(timer):
+            for _ in range(repeat):
+                request = factory.get(path)
+                force_authenticate(request, user=user)
+                response = handler(request, **kwargs)
+                response.render()
+                if response.status_code != 200:
+                    raise CommandError(f"{path} returned {response.status_code}: {response.content[:200]}")
+        return timer.queries / repeat, timer.seconds * 1000 / repeat
+
+    def handle(self, *args, **options):
+        try:
+            user = CustomUser.objects.get(email=options['email'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+
+        time_range = options['range']
+        repeat = options['repeat']
+
+        self.stdout.write(f"{'endpoint':<32}{'queries':>10}{'db ms':>12}")
+        widget_queries = 0
+        widget_ms = 0.0
+        for label, view, path, kwargs in WIDGET_REQUESTS:
+            queries, ms = self._measure(
+                view,
+                path.format(range=time_range),
+                {k: v.format(range=time_range) for k, v in kwargs.items()},
+                user,
+                repeat,
+            )
+            widget_queries += queries
+            widget_ms += ms
+            self.stdout.write(f"{label:<32}{queries:>10.1f}{ms:>12.2f}")
+
+        self.stdout.write(f"{'per-widget total':<32}{widget_queries:>10.1f}{widget_ms:>12.2f}")
+
+        queries, ms = self._measure(
+            DashboardSummaryView,
+            f'/dashboard/summary/{time_range}/',
+            {'time_range': time_range},
+            user,
+            repeat,
+        )
+        self.stdout.write(f"{'dashboard/summary':<32}{queries:>10.1f}{ms:>12.2f}")
+        if ms:
+            self.stdout.write(self.style.SUCCESS(f"Summary endpoint uses {widget_ms / ms:.1f}x less DB time per page load."))
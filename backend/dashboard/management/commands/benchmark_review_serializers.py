@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from onboard.data_version import get_user_data_ids
+from onboard.models import CustomUser
+from reviews.models import Review
+from dashboard.serializers import ReviewRowSerializer, ReviewSerializer
+from .benchmark_dashboard_summary import QueryTimer
+
+
+class Command(BaseCommand):
+    """
+    Usage:
+      python manage.py benchmark_review_serializers --email someone@example.com --page-size 1000 --repeat 20
+    """
+    help = "Compare the ModelSerializer review listing against the values()-based fast path on full pages."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', required=True, help="Tenant user whose reviews are listed.")
+        parser.add_argument('--page-size', type=int, default=1000, help="Rows per page.")
+        parser.add_argument('--repeat', type=int, default=10, help="Number of timed runs per path.")
+        parser.add_argument('--fields', help="Comma-separated sparse fieldset for the fast path.")
+
+    def _measure(self, render, repeat):
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            for _ in range(repeat):
+                data = render()
+        total_ms = (time.perf_counter() - start) * 1000 / repeat
+        return len(data), timer.seconds * 1000 / repeat, total_ms
+
+    def handle(self, *args, **options):
+        try:
+            user = CustomUser.objects.get(email=options['email'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+
+        size = options['page_size']
+        repeat = options['repeat']
+        fields = options['fields'].split(',') if options['fields'] else ReviewSerializer.Meta.fields
+        reviews = Review.objects.filter(user_data_id__in=get_user_data_ids(user.pk)).order_by('-date', '-id')
+
+        paths = [
+            ('ModelSerializer', lambda: ReviewSerializer(reviews[:size], many=True).data),
+            ('values() fast path', lambda: ReviewRowSerializer(
+                reviews.values(*dict.fromkeys([*fields, 'date', 'id']))[:size], many=True, fields=fields).data),
+        ]
+
+        self.stdout.write(f"{'path':<24}{'rows':>8}{'db ms':>12}{'total ms':>12}")
+        results = []
+        for label, render in paths:
+            rows, db_ms, total_ms = self._measure(render, repeat)
+            results.append(total_ms)
+            self.stdout.write(f"{label:<24}{rows:>8}{db_ms:>12.2f}{total_ms:>12.2f}")
+
+        if results[1]:
+            self.stdout.write(self.style.SUCCESS(f"Fast path is {results[0] / results[1]:.1f}x faster per {size}-row page."))
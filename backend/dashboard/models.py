@@ -1,3 +1,70 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class ReportJob(models.Model):
+    """
+    A report generated by a Celery worker instead of the request thread.
+
+    `params` are the normalized report parameters (see reports.py) and
+    `params_digest` their hash; at most one pending or running job exists
+    per user and digest, so a report requested twice is built once.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+    ACTIVE_STATUSES = (PENDING, RUNNING)
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='report_jobs')
+    params = models.JSONField()
+    params_digest = models.CharField(max_length=40)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    progress = models.PositiveSmallIntegerField(default=0)  # percent
+    current_step = models.CharField(max_length=50, blank=True)
+    file = models.FileField(upload_to='reports/%Y/%m/', blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'params_digest'],
+                condition=Q(status__in=['pending', 'running']),
+                name='report_job_one_active_per_params',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.params.get('report_type', 'report')} report {self.pk} ({self.status})"
+
+
+class AnalysisCacheEntry(models.Model):
+    """
+    A stored LLM trend analysis, keyed by a fingerprint of everything that
+    went into the prompt (see analysis_cache.py). Entries expire after
+    LLM_ANALYSIS_CACHE_TTL and the least recently used are evicted beyond
+    LLM_ANALYSIS_CACHE_MAX_ENTRIES.
+    """
+    fingerprint = models.CharField(max_length=64, primary_key=True)
+    model_name = models.CharField(max_length=100)
+    prompt_version = models.PositiveSmallIntegerField()
+    category = models.CharField(max_length=100)
+    review_count = models.PositiveIntegerField()
+    result = models.JSONField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
 
-# Create your models here.
+    def __str__(self):
+        return f"{self.model_name} analysis of {self.review_count} '{self.category}' reviews"
@@ -0,0 +1,214 @@
+"""
+Keyset pagination for review listings.
+
+Pages are ordered newest first on (date, id) and a page boundary is the
+(date, id) of its last row, so the next page is an index range scan that
+starts where the previous one stopped. Page 500 costs the same as page 1:
+there is no OFFSET to skip.
+
+The envelope keeps the exact `count` that the page-number pagination
+always returned, so existing clients keep working. That count is the one
+COUNT(*) left per request. Clients that do not need it can send
+`?total=estimate`, which returns the planner's row estimate as
+`estimated_total` (one EXPLAIN) instead of `count`, or `?total=none` to
+drop the total altogether.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .approx import estimated_rows
+
+
+def _cursor_value(value):
+    # Full microsecond precision: DjangoJSONEncoder rounds to milliseconds,
+    # which would skip rows that share the boundary's millisecond
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot put {type(value).__name__} in a cursor")
+
+
+class KeysetPagination(BasePagination):
+    """
+    Newest-first pages on a two-column key, (date, id) unless the view sets
+    `keyset_ordering` (e.g. ('rank', 'id') for search results). Both columns
+    are compared descending and the second one must be unique.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    total_query_param = 'total'
+    ordering = ('date', 'id')
+    invalid_cursor_message = 'Invalid cursor'
+    # How each key column's cursor value is turned back into a Python value
+    key_parsers = {'date': datetime.fromisoformat, 'id': int, 'rank': float, 'similarity': float}
+    # ?total= values: 'exact' (the default) adds `count`, 'estimate' adds `estimated_total`, 'none' adds neither
+    default_total = 'exact'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_total(self, request):
+        return request.query_params.get(self.total_query_param, self.default_total)
+
+    def get_ordering(self, view):
+        return getattr(view, 'keyset_ordering', None) or self.ordering
+
+    def encode_cursor(self, row, reverse=False):
+        # Rows are model instances or, for values() listings, dicts
+        payload = {'k': [row[key] if isinstance(row, dict) else getattr(row, key) for key in self.keys]}
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(payload, default=_cursor_value).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values = [self.key_parsers[key](value) for key, value in zip(self.keys, payload['k'], strict=True)]
+            return values, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.keys = self.get_ordering(view)
+        size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        self.count = self.estimated_total = None
+        total = self.get_total(request)
+        if total == 'estimate':
+            self.estimated_total = estimated_rows(queryset.order_by())
+        elif total != 'none':
+            self.count = queryset.order_by().count()
+
+        first, second = self.keys
+        reverse = cursor is not None and cursor[1]
+        if cursor is None:
+            queryset = queryset.order_by(f'-{first}', f'-{second}')
+        elif not reverse:
+            (a, b), _ = cursor
+            # first <= boundary is the index range; the OR only settles ties on the boundary itself
+            queryset = (queryset
+                        .filter(Q(**{f'{first}__lte': a}), Q(**{f'{first}__lt': a}) | Q(**{f'{second}__lt': b}))
+                        .order_by(f'-{first}', f'-{second}'))
+        else:
+            (a, b), _ = cursor
+            queryset = (queryset
+                        .filter(Q(**{f'{first}__gte': a}), Q(**{f'{first}__gt': a}) | Q(**{f'{second}__gt': b}))
+                        .order_by(first, second))
+
+        rows = list(queryset[:size + 1])
+        has_more = len(rows) > size
+        rows = rows[:size]
+        if reverse:
+            rows.reverse()
+
+        # Walking backwards we came from a later page, so there is always a next one
+        has_next = reverse or has_more
+        has_previous = has_more if reverse else cursor is not None
+        self.next_row = rows[-1] if rows and has_next else None
+        self.previous_row = rows[0] if rows and has_previous else None
+        return rows
+
+    def get_next_link(self):
+        return self.encode_cursor(self.next_row) if self.next_row is not None else None
+
+    def get_previous_link(self):
+        return self.encode_cursor(self.previous_row, reverse=True) if self.previous_row is not None else None
+
+    def get_paginated_response(self, data):
+        payload = {'next': self.get_next_link(), 'previous': self.get_previous_link(), 'results': data}
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        if self.estimated_total is not None:
+            payload['estimated_total'] = self.estimated_total
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'estimated_total': {'type': 'integer'},
+                'results': schema,
+            },
+        }
+
+
+class FeedbackPagination(KeysetPagination):
+    """
+    Keyset pages for the feedback listing.
+
+    Requests that still send ?page=N (and no cursor) get the old numbered
+    pages with a full count, so existing clients keep working while they
+    move to `next`/`previous` links.
+    """
+
+    def __init__(self):
+        self.legacy = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if 'page' in request.query_params and self.cursor_query_param not in request.query_params:
+            self.legacy = LegacyFeedbackPagination()
+            ordering = [f'-{key}' for key in self.get_ordering(view)]
+            return self.legacy.paginate_queryset(queryset.order_by(*ordering), request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.legacy is not None:
+            return self.legacy.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class LegacyFeedbackPagination(PageNumberPagination):
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class RecentFeedbackPagination(KeysetPagination):
+    """
+    The recent feedback widget has always received a bare list of the 15
+    newest reviews. That stays the answer to a plain request; the link to
+    older pages goes in a Link header, and ?cursor= or ?page_size= pages
+    return the usual envelope.
+    """
+    page_size = 15
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.bare = not ({self.cursor_query_param, self.page_size_query_param} & set(request.query_params))
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_total(self, request):
+        # A bare list has nowhere to put a total
+        return 'none' if self.bare else super().get_total(request)
+
+    def get_paginated_response(self, data):
+        if not self.bare:
+            return super().get_paginated_response(data)
+        response = Response(data)
+        next_link = self.get_next_link()
+        if next_link:
+            response['Link'] = f'<{next_link}>; rel="next"'
+        return response
+
@@ -0,0 +1,51 @@
+"""
+Fast renderers for the API.
+
+ORJSONRenderer replaces DRF's stdlib JSONRenderer for application/json;
+MessagePackRenderer answers `Accept: application/msgpack` with a binary
+encoding that is smaller and cheaper to parse for large chart series.
+Types neither library knows natively (Decimal, lazy strings, timedelta,
+...) go through DRF's JSONEncoder.default, so both render the same values
+as the stock renderer.
+"""
+import datetime
+
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_drf_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=_drf_encoder.default, option=self.options)
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        # Same ISO 8601 strings the JSON renderers produce
+        return _drf_encoder.default(obj)
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()  # numpy arrays and scalars, e.g. embeddings
+    return _drf_encoder.default(obj)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_msgpack_default, use_bin_type=True)
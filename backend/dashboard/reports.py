@@ -0,0 +1,537 @@
+"""
+Report building, shared by GenerateReportView and the report job task.
+
+A report is a title, an optional date range line and the selected sections
+in a fixed order, rendered as PDF (ReportBuilder) or as CSV, XLSX or HTML
+tables (report_tables() and the writers below). Everything works on
+whatever review queryset it is given, so the same code serves the request
+thread and Celery workers.
+
+Sections do not query the database themselves: a ReportDataset fetches
+everything the selected sections show up front, in one grouped query for
+the counts and one query for the latest reviews, so a report costs at
+most two queries whichever sections are chosen.
+
+Rendered reports are kept in the default file storage under a hash of
+the tenant's data version and the report parameters (render_stored_report),
+so asking for the same report again is a file read until new reviews
+arrive. A nightly task pre-renders the preset reports for every tenant.
+"""
+import csv
+import datetime
+import hashlib
+import json
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.html import escape
+from rest_framework.exceptions import ValidationError
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+from onboard.data_version import get_tenant_data_version, get_user_data_ids
+from reviews.exports import EXPORT_CHUNK_SIZE, Echo, chunked
+from reviews.models import Review
+
+from .facets import facet_counts
+
+# XLSX output is optional, like the Parquet export
+try:
+    import xlsxwriter
+    XLSX_AVAILABLE = True
+except ImportError:
+    XLSX_AVAILABLE = False
+
+# Sections in the order they appear in a report
+REPORT_SECTIONS = [
+    'executive_summary', 'sentiment_analysis', 'feedback_sources', 'product_feedback', 'detailed_feedback',
+]
+# Sections that show counts from ReportDataset's grouped query
+AGGREGATE_SECTIONS = {'executive_summary', 'sentiment_analysis', 'feedback_sources', 'product_feedback'}
+# Days covered by each time filter preset
+REPORT_PRESET_DAYS = {'daily': 0, 'weekly': 7, 'monthly': 30, 'quarterly': 90}
+REPORT_STORE_PREFIX = 'reports/store/'
+REPORT_CONTENT_TYPES = {
+    'pdf': 'application/pdf',
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'html': 'text/html; charset=utf-8',
+}
+
+
+def normalize_report_params(data):
+    """The report parameters of a request body, with defaults filled in and sections as a list."""
+    sections = data.get('sections', [])
+    # Ensure sections is a list
+    if isinstance(sections, str):
+        sections = [sections]
+    report_format = data.get('format', 'pdf')
+    if report_format not in REPORT_CONTENT_TYPES:
+        raise ValidationError({'format': f"Expected one of {', '.join(REPORT_CONTENT_TYPES)}."})
+    time_filter = data.get('timeFilter', 'default')
+    date_range = data.get('dateRange', {}) or {}
+    if time_filter in REPORT_PRESET_DAYS:
+        # Presets only use the range for display; resolving it here means a preset
+        # report asked for by a client and the nightly pre-render hash the same
+        date_range = preset_date_range(time_filter)
+    return {
+        'report_type': data.get('reportType', 'comprehensive'),
+        'time_filter': time_filter,
+        'date_range': date_range,
+        'format': report_format,
+        'sections': [section for section in REPORT_SECTIONS if section in sections],
+    }
+
+
+def _format_day(day):
+    return f"{day:%B} {day.day}, {day.year}"
+
+
+def preset_date_range(time_filter):
+    """The displayed date range of a preset report, e.g. "October 11, 2026" to "October 18, 2026"."""
+    today = timezone.now().date()
+    start = today - datetime.timedelta(days=REPORT_PRESET_DAYS[time_filter])
+    return {'fromFormatted': _format_day(start), 'toFormatted': _format_day(today)}
+
+
+def report_params_digest(params):
+    """Stable digest of normalized report parameters; identical requests share it."""
+    return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def report_filename(params, day):
+    return f"{params['report_type']}_report_{day.strftime('%Y-%m-%d')}.{params['format']}"
+
+
+def tenant_reviews(user_id):
+    return Review.objects.filter(user_data_id__in=get_user_data_ids(user_id))
+
+
+def report_content_key(user_id, params):
+    """Hash of the tenant's data version and the report parameters: equal keys mean identical reports."""
+    parts = {'user': user_id, 'version': list(get_tenant_data_version(user_id)), 'params': params}
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def stored_report_name(key, report_format):
+    return f"{REPORT_STORE_PREFIX}{key[:2]}/{key}.{report_format}"
+
+
+def find_stored_report(user_id, params):
+    """Storage name of an already rendered copy of this report at the current data version, or None."""
+    name = stored_report_name(report_content_key(user_id, params), params['format'])
+    return name if default_storage.exists(name) else None
+
+
+def render_stored_report(user_id, params, progress=None):
+    """
+    Storage name of the tenant's report for `params`, rendering it only when
+    no copy exists for the current data version.
+    """
+    # The key is taken before the data is read, so reviews landing mid-render
+    # can only make the stored copy newer than its key, never older
+    name = stored_report_name(report_content_key(user_id, params), params['format'])
+    if default_storage.exists(name):
+        if progress:
+            progress('stored', 1, 1)
+        return name
+    with tempfile.TemporaryFile() as spool:
+        write_report(tenant_reviews(user_id), params, spool, progress)
+        spool.seek(0)
+        return default_storage.save(name, File(spool))
+
+
+def prune_stored_reports(max_age):
+    """Delete stored reports older than the timedelta `max_age`; returns how many were removed."""
+    cutoff = timezone.now() - max_age
+    removed = 0
+    try:
+        shards, _ = default_storage.listdir(REPORT_STORE_PREFIX)
+    except FileNotFoundError:
+        return 0
+    for shard in shards:
+        _, files = default_storage.listdir(f"{REPORT_STORE_PREFIX}{shard}")
+        for filename in files:
+            name = f"{REPORT_STORE_PREFIX}{shard}/{filename}"
+            if default_storage.get_modified_time(name) < cutoff:
+                default_storage.delete(name)
+                removed += 1
+    return removed
+
+
+def report_date_filter(time_filter, date_range=None):
+    """
+    Convert time filter to a dictionary suitable for database filtering
+    """
+    today = timezone.now()
+    date_filter = {'date__isnull': False}
+
+    if time_filter == 'daily':
+        today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        date_filter = {'date__gte': today_start}
+    elif time_filter == 'weekly':
+        week_ago = today - datetime.timedelta(days=7)
+        date_filter = {'date__gte': week_ago}
+    elif time_filter == 'monthly':
+        month_ago = today - datetime.timedelta(days=30)
+        date_filter = {'date__gte': month_ago}
+    elif time_filter == 'quarterly':
+        quarter_ago = today - datetime.timedelta(days=90)
+        date_filter = {'date__gte': quarter_ago}
+    elif time_filter == 'custom' and date_range:
+        from_date = date_range.get('from')
+        to_date = date_range.get('to')
+        if from_date:
+            try:
+                from_datetime = datetime.datetime.fromisoformat(from_date.replace('Z', '+00:00'))
+                date_filter['date__gte'] = from_datetime
+            except (ValueError, TypeError, AttributeError):
+                pass
+        if to_date:
+            try:
+                to_datetime = datetime.datetime.fromisoformat(to_date.replace('Z', '+00:00'))
+                to_datetime = to_datetime.replace(hour=23, minute=59, second=59)
+                date_filter['date__lte'] = to_datetime
+            except (ValueError, TypeError, AttributeError):
+                pass
+    return date_filter
+
+
+class ReportDataset:
+    """
+    Everything the selected sections of a report show, fetched once.
+
+    Source, sentiment and category counts come from one GROUPING SETS query
+    (facet_counts() with no filters), skipped when no selected section shows
+    them. The detailed feedback rows are read by iter_reviews() as they are
+    written out.
+    """
+    top_categories = 5
+    detail_fields = ('date', 'sentiment', 'category', 'source', 'review', 'comments')
+
+    def __init__(self, reviews, params):
+        self.reviews = reviews.filter(**report_date_filter(params['time_filter'], params['date_range']))
+        sections = set(params['sections'])
+
+        self.total = 0
+        self.sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0, 'unknown': 0}
+        self.sources = []
+        self.categories = []
+
+        if sections & AGGREGATE_SECTIONS:
+            counts = facet_counts(self.reviews, {})
+            for item in counts['sentiment']:
+                # Handle None values
+                sentiment_key = item['value'] if item['value'] is not None else 'unknown'
+                self.sentiment_counts[sentiment_key] = item['count']
+                self.total += item['count']
+            self.sources = counts['source']
+            self.categories = counts['category'][:self.top_categories]
+
+    def iter_reviews(self, limit=None, chunk_size=EXPORT_CHUNK_SIZE):
+        """
+        Newest-first review rows for the detailed feedback section.
+
+        With a limit that is one small fetch; without, the whole range is read
+        through a server-side cursor chunk_size rows at a time, so a report
+        over every review never holds them all in memory.
+        """
+        rows = self.reviews.order_by('-date', '-id').values(*self.detail_fields)
+        if limit is not None:
+            return iter(rows[:limit])
+        return rows.iterator(chunk_size=chunk_size)
+
+    def sentiment_percentage(self, sentiment):
+        # Calculate percentages safely
+        if not self.total:
+            return 0
+        return round((self.sentiment_counts.get(sentiment, 0) / self.total) * 100, 2)
+
+
+class ReportBuilder:
+    """Renders normalized report parameters to a PDF over `reviews`."""
+    # A PDF lists the latest few reviews; the tabular formats list them all
+    detail_limit = 10
+
+    def __init__(self, reviews):
+        self.reviews = reviews
+
+    def build(self, params, sink, progress=None):
+        """
+        Write the PDF for `params` to the file-like `sink`.
+
+        `progress(step, done, total)` is called once the data is fetched,
+        after each section and once more after the document is laid out, so
+        callers can report how far a long report has got.
+        """
+        doc = SimpleDocTemplate(sink, pagesize=letter)
+        styles = getSampleStyleSheet()
+        story = []
+
+        sections = params['sections']
+        total = len(sections) + 2
+        data = ReportDataset(self.reviews, params)
+        if progress:
+            progress('data', 1, total)
+
+        # Add title
+        story.append(Paragraph(_report_title(params), styles['Heading1']))
+        story.append(Spacer(1, 12))
+
+        # Add date range - Use formatted dates if available, otherwise use ISO dates
+        date_text = _date_range_text(params)
+        if date_text:
+            story.append(Paragraph(date_text, styles['Normal']))
+            story.append(Spacer(1, 12))
+
+        for done, section in enumerate(sections, 2):
+            getattr(self, f'_add_{section}')(story, styles, data)
+            if progress:
+                progress(section, done, total)
+
+        doc.build(story)
+        if progress:
+            progress('render', total, total)
+
+    def _add_executive_summary(self, story, styles, data):
+        # Add title
+        story.append(Paragraph("Executive Summary", styles['Heading2']))
+        story.append(Spacer(1, 12))
+
+        # Add statistics as paragraphs
+        story.append(Paragraph(f"Total Feedback: {data.total}", styles['Normal']))
+        story.append(Paragraph(f"Positive Sentiment: {data.sentiment_percentage('positive')}%", styles['Normal']))
+        story.append(Paragraph(f"Negative Sentiment: {data.sentiment_percentage('negative')}%", styles['Normal']))
+        story.append(Paragraph(f"Neutral Sentiment: {data.sentiment_percentage('neutral')}%", styles['Normal']))
+        if data.sentiment_percentage('unknown') > 0:
+            story.append(Paragraph(f"Unknown Sentiment: {data.sentiment_percentage('unknown')}%", styles['Normal']))
+        story.append(Spacer(1, 12))
+
+    def _add_sentiment_analysis(self, story, styles, data):
+        # Add title and content
+        story.append(Paragraph("Sentiment Analysis", styles['Heading2']))
+        story.append(Spacer(1, 12))
+
+        # Create a table for sentiment distribution
+        rows = [["Sentiment", "Count", "Percentage"]]
+        for sentiment, count in data.sentiment_counts.items():
+            # Safe capitalize with null check
+            sentiment_display = sentiment.capitalize() if sentiment else "Unknown"
+            rows.append([sentiment_display, str(count), f"{data.sentiment_percentage(sentiment)}%"])
+
+        # Add table
+        table = Table(rows, colWidths=[150, 100, 100])
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]))
+        story.append(table)
+        story.append(Spacer(1, 12))
+
+    def _add_feedback_sources(self, story, styles, data):
+        # Add title
+        story.append(Paragraph("Feedback Sources", styles['Heading2']))
+        story.append(Spacer(1, 12))
+
+        # Add information about sources with null checks
+        if not data.sources:
+            story.append(Paragraph("No source data available", styles['Normal']))
+        else:
+            for source in data.sources:
+                source_name = source['value'] if source['value'] else "Unknown source"
+                story.append(Paragraph(f"{source_name}: {source['count']} reviews", styles['Normal']))
+
+        story.append(Spacer(1, 12))
+
+    def _add_product_feedback(self, story, styles, data):
+        # Add title
+        story.append(Paragraph("Product Feedback", styles['Heading2']))
+        story.append(Spacer(1, 12))
+
+        # Add product category information with null checks
+        story.append(Paragraph("Top Product Categories:", styles['Heading3']))
+        if not data.categories:
+            story.append(Paragraph("No category data available", styles['Normal']))
+        else:
+            for cat in data.categories:
+                category_name = cat['value'] if cat['value'] else "Uncategorized"
+                story.append(Paragraph(f"{category_name}: {cat['count']} mentions", styles['Normal']))
+
+        story.append(Spacer(1, 12))
+
+    def _add_detailed_feedback(self, story, styles, data):
+        # Add title
+        story.append(Paragraph("Detailed Feedback", styles['Heading2']))
+        story.append(Spacer(1, 12))
+
+        # Add detailed reviews with null checks
+        for idx, review in enumerate(data.iter_reviews(self.detail_limit), 1):
+            story.append(Paragraph(f"Review #{idx}", styles['Heading3']))
+
+            # Safe display with null checks
+            sentiment = review['sentiment'].capitalize() if review['sentiment'] else "Unknown"
+            category = review['category'] if review['category'] else "Uncategorized"
+            source = review['source'] if review['source'] else "Unknown source"
+
+            story.append(Paragraph(f"Sentiment: {sentiment}", styles['Normal']))
+            story.append(Paragraph(f"Category: {category}", styles['Normal']))
+            story.append(Paragraph(f"Source: {source}", styles['Normal']))
+
+            # Only include text if it exists (could be in review or comments field)
+            if review['review']:
+                story.append(Paragraph(f"Feedback: {review['review']}", styles['Normal']))
+            elif review['comments']:
+                story.append(Paragraph(f"Feedback: {review['comments']}", styles['Normal']))
+
+            story.append(Spacer(1, 12))
+
+
+def _report_title(params):
+    return f"{params['report_type'].title()} Report"
+
+
+def _date_range_text(params):
+    date_range = params['date_range']
+    date_from = date_range.get('fromFormatted', date_range.get('from', ''))
+    date_to = date_range.get('toFormatted', date_range.get('to', ''))
+    return f"Date Range: {date_from} to {date_to}" if date_from and date_to else None
+
+
+def _review_row(review):
+    feedback = review['review'] or (json.dumps(review['comments']) if review['comments'] else '')
+    return [review['date'], review['source'] or "Unknown source",
+            review['sentiment'].capitalize() if review['sentiment'] else "Unknown",
+            review['category'] or "Uncategorized", feedback]
+
+
+def report_tables(params, data, progress=None):
+    """
+    (title, header, rows) for each selected section, the same figures the
+    PDF shows. The detailed feedback rows are every review in range, read
+    lazily, so writers must consume each table before asking for the next.
+    """
+    sections = params['sections']
+    total = len(sections) + 1
+    for done, section in enumerate(sections, 1):
+        if section == 'executive_summary':
+            rows = [["Total Feedback", data.total]] + [
+                [f"{sentiment.capitalize()} Sentiment", f"{data.sentiment_percentage(sentiment)}%"]
+                for sentiment in ('positive', 'negative', 'neutral', 'unknown')
+                if sentiment != 'unknown' or data.sentiment_percentage('unknown') > 0
+            ]
+            yield "Executive Summary", ["Metric", "Value"], rows
+        elif section == 'sentiment_analysis':
+            rows = [[sentiment.capitalize() if sentiment else "Unknown", count, f"{data.sentiment_percentage(sentiment)}%"]
+                    for sentiment, count in data.sentiment_counts.items()]
+            yield "Sentiment Analysis", ["Sentiment", "Count", "Percentage"], rows
+        elif section == 'feedback_sources':
+            rows = [[source['value'] or "Unknown source", source['count']] for source in data.sources]
+            yield "Feedback Sources", ["Source", "Reviews"], rows
+        elif section == 'product_feedback':
+            rows = [[cat['value'] or "Uncategorized", cat['count']] for cat in data.categories]
+            yield "Top Product Categories", ["Category", "Mentions"], rows
+        elif section == 'detailed_feedback':
+            rows = (_review_row(review) for review in data.iter_reviews())
+            yield "Detailed Feedback", ["Date", "Source", "Sentiment", "Category", "Feedback"], rows
+        if progress:
+            progress(section, done, total)
+
+
+def stream_report_csv(params, data, progress=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """The report as CSV, one block per section separated by a blank line, in chunks of rows."""
+    writer = csv.writer(Echo())
+
+    def lines():
+        yield writer.writerow([_report_title(params)])
+        if _date_range_text(params):
+            yield writer.writerow([_date_range_text(params)])
+        for title, header, rows in report_tables(params, data, progress):
+            yield writer.writerow([])
+            yield writer.writerow([title])
+            yield writer.writerow(header)
+            for row in rows:
+                yield writer.writerow(row)
+
+    return chunked(lines(), chunk_size)
+
+
+HTML_HEAD = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>body{{font-family:sans-serif}}table{{border-collapse:collapse;margin-bottom:1.5em}}
+th,td{{border:1px solid #999;padding:4px 8px;text-align:left;vertical-align:top}}th{{background:#ddd}}</style>
+</head><body>
+"""
+
+
+def stream_report_html(params, data, progress=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """The report as a standalone HTML page with one table per section, in chunks of rows."""
+    def cells(tag, row):
+        return ''.join(f"<{tag}>{escape('' if value is None else value)}</{tag}>" for value in row)
+
+    def lines():
+        title = _report_title(params)
+        yield HTML_HEAD.format(title=escape(title))
+        yield f"<h1>{escape(title)}</h1>\n"
+        if _date_range_text(params):
+            yield f"<p>{escape(_date_range_text(params))}</p>\n"
+        for title, header, rows in report_tables(params, data, progress):
+            yield f"<h2>{escape(title)}</h2>\n<table><thead><tr>{cells('th', header)}</tr></thead><tbody>\n"
+            for row in rows:
+                yield f"<tr>{cells('td', row)}</tr>\n"
+            yield "</tbody></table>\n"
+        yield "</body></html>\n"
+
+    return chunked(lines(), chunk_size)
+
+
+def write_report_xlsx(params, data, sink, progress=None):
+    """
+    The report as a workbook with one sheet per section, written to the
+    file-like `sink`. constant_memory mode flushes each row to disk as it
+    is written, so memory use does not grow with the number of reviews.
+    """
+    if not XLSX_AVAILABLE:
+        raise RuntimeError("XLSX reports need the XlsxWriter package.")
+    workbook = xlsxwriter.Workbook(sink, {'constant_memory': True, 'remove_timezone': True})
+    workbook.set_properties({'title': _report_title(params), 'comments': _date_range_text(params) or ''})
+    bold = workbook.add_format({'bold': True})
+    date_format = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm'})
+    for title, header, rows in report_tables(params, data, progress):
+        sheet = workbook.add_worksheet(title[:31])
+        sheet.write_row(0, 0, header, bold)
+        for index, row in enumerate(rows, 1):
+            for column, value in enumerate(row):
+                if isinstance(value, datetime.datetime):
+                    sheet.write_datetime(index, column, value, date_format)
+                else:
+                    sheet.write(index, column, value)
+    workbook.close()
+
+
+REPORT_STREAMS = {
+    'csv': stream_report_csv,
+    'html': stream_report_html,
+}
+
+
+def write_report(reviews, params, sink, progress=None):
+    """Render the report in params['format'] to the binary file-like `sink`."""
+    if params['format'] == 'pdf':
+        ReportBuilder(reviews).build(params, sink, progress)
+        return
+    data = ReportDataset(reviews, params)
+    if params['format'] == 'xlsx':
+        write_report_xlsx(params, data, sink, progress)
+        return
+    for chunk in REPORT_STREAMS[params['format']](params, data, progress):
+        sink.write(chunk.encode())
@@ -1,6 +1,74 @@
 from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from django.urls import reverse
 from reviews.models import Review
+from .models import ReportJob
 class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
         fields = ['id', 'review_id', 'date', 'rating', 'source', 'review', 'title', 'username', 'url', 'category', 'sub_category', 'sentiment', 'particular_issue', 'summary']
+
+
+# Extra columns a search annotates onto review listings
+SEARCH_FIELDS = ['rank', 'headline']
+FUZZY_FIELDS = ['similarity']
+
+
+def parse_fields(params, default, allowed):
+    """
+    Columns selected by ?fields=a,b,c (a sparse fieldset), or `default`.
+
+    Unknown names are rejected rather than ignored so typos do not silently
+    return fewer columns than the client expects.
+    """
+    value = params.get('fields')
+    if not value:
+        return list(default)
+    fields = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise ValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(allowed)}."})
+    return fields
+
+
+class ReviewRowSerializer(serializers.BaseSerializer):
+    """
+    Read-only serializer for review listings built from `.values()` rows.
+
+    It renders the same representation as ReviewSerializer for the selected
+    `fields`, but skips model instantiation and per-field serializer
+    objects, so a 1000-row page costs a dict comprehension per row.
+    """
+    datetime_field = serializers.DateTimeField()
+
+    def __init__(self, *args, fields=None, **kwargs):
+        self.row_fields = fields or ReviewSerializer.Meta.fields
+        super().__init__(*args, **kwargs)
+
+    def to_representation(self, row):
+        data = {name: row[name] for name in self.row_fields}
+        if data.get('date') is not None:
+            # Same ISO 8601 output (and 'Z' suffix) as the ModelSerializer
+            data['date'] = self.datetime_field.to_representation(data['date'])
+        return data
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    status_url = serializers.SerializerMethodField()
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = ['id', 'status', 'progress', 'current_step', 'error', 'params',
+                  'created_at', 'started_at', 'finished_at', 'status_url', 'download_url']
+
+    def _absolute(self, name, job):
+        url = reverse(name, kwargs={'job_id': job.pk})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_status_url(self, job):
+        return self._absolute('report-job', job)
+
+    def get_download_url(self, job):
+        return self._absolute('report-job-download', job) if job.status == ReportJob.DONE else None
@@ -0,0 +1,164 @@
+"""
+Single-pass dashboard summary.
+
+The review, source and sentiment widgets on the dashboard home are derived
+from one GROUPING SETS query over the tenant's ReviewDailyRollup rows.
+Widgets that look at different windows (the selected time range, all time)
+read separate FILTERed sums from the same pass instead of issuing their own
+queries. The category widgets and trending topics are not part of the pass:
+DashboardSummaryView fills them from the same helpers as their standalone
+endpoints (categories.category_matrix and the trending topics query), so
+the two always agree field for field.
+"""
+from datetime import date, timedelta
+
+from django.db import connection
+from django.db.models import DateField
+from django.db.models.functions import TruncMonth
+
+from .timewindows import MONTH_NAMES
+
+SENTIMENTS = ('positive', 'negative', 'neutral')
+# Chart series label -> stored Review.source value
+CHART_SOURCES = {
+    'Playstore': 'googleplay',
+    'Reddit': 'reddit',
+    'X': 'twitter',
+    'AppStore': 'appstore',
+    'Trust Pilot': 'trustpilot',
+}
+PREDEFINED_SOURCES = ['googleplay', 'reddit', 'twitter', 'appstore', 'trustpilot']
+
+# GROUPING(month, source, sentiment) bitmask for each grouping set;
+# a set bit means the column is rolled up in that row.
+GROUP_TOTAL = 0b111
+GROUP_SOURCE = 0b101
+GROUP_SENTIMENT = 0b110
+GROUP_SOURCE_SENTIMENT = 0b100
+GROUP_MONTH_SENTIMENT = 0b010
+GROUP_MONTH_SOURCE = 0b001
+
+SUMMARY_SQL = """
+SELECT GROUPING(r.month, r.source, r.sentiment) AS grouping_id,
+       r.month::date AS month, r.source, r.sentiment,
+       SUM(r.review_count) AS total,
+       COALESCE(SUM(r.review_count) FILTER (WHERE r.day BETWEEN %s AND %s), 0) AS in_range
+FROM ({base}) AS r
+GROUP BY GROUPING SETS (
+    (),
+    (r.source),
+    (r.sentiment),
+    (r.source, r.sentiment),
+    (r.month, r.sentiment),
+    (r.month, r.source)
+)
+"""
+
+
+def _last_six_months(today):
+    """First day of each of the six calendar months ending with today's month."""
+    months = []
+    current = today.replace(day=1)
+    for _ in range(6):
+        months.insert(0, current)
+        current = (current - timedelta(days=1)).replace(day=1)
+    return months
+
+
+def _percentages(counts, total):
+    total = total or 1  # avoid division by zero
+    return {s: round((counts.get(s, 0) * 100.0) / total, 2) for s in SENTIMENTS}
+
+
+def fetch_summary_rows(rollups, start_date, end_date):
+    """Run the single grouped pass and return its rows as dicts."""
+    base = (rollups
+            .annotate(month=TruncMonth('day', output_field=DateField()))
+            .values('month', 'day', 'source', 'sentiment', 'review_count')
+            .order_by())
+    base_sql, base_params = base.query.sql_with_params()
+    params = [start_date or date.min, end_date, *base_params]
+    # The window params precede the subquery in the statement text
+    sql = SUMMARY_SQL.format(base=base_sql)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def build_dashboard_summary(rollups, start_date, end_date, today):
+    """
+    Build the review, source and sentiment widgets from one grouped query.
+
+    `rollups` is the tenant-scoped ReviewDailyRollup queryset and the range
+    is the selected time range as dates.
+    """
+    rows = fetch_summary_rows(rollups, start_date, end_date)
+    groups = {}
+    for row in rows:
+        groups.setdefault(row['grouping_id'], []).append(row)
+
+    totals = (groups.get(GROUP_TOTAL) or [{'total': 0, 'in_range': 0}])[0]
+    all_time_total = totals['total'] or 0
+
+    # Review stats (selected time range)
+    in_range_sources = sorted(
+        (r for r in groups.get(GROUP_SOURCE, []) if r['in_range']),
+        key=lambda r: r['in_range'], reverse=True,
+    )
+    top_source = in_range_sources[0] if in_range_sources else None
+    in_range_sentiments = {r['sentiment']: r['in_range'] for r in groups.get(GROUP_SENTIMENT, []) if r['in_range']}
+    most_common = max(in_range_sentiments, key=in_range_sentiments.get) if in_range_sentiments else None
+    review_stats = {
+        "total_feedback": totals['in_range'] or 0,
+        "top_source": f"{top_source['source']} ({top_source['in_range']})" if top_source else "N/A",
+        "most_common_sentiment": most_common or "N/A",
+    }
+
+    # Monthly series (last six calendar months)
+    months = _last_six_months(today)
+    month_sentiments = {}
+    for r in groups.get(GROUP_MONTH_SENTIMENT, []):
+        month_sentiments.setdefault(r['month'], {})[r['sentiment']] = r['total']
+    month_sources = {}
+    for r in groups.get(GROUP_MONTH_SOURCE, []):
+        month_sources.setdefault(r['month'], {})[r['source']] = r['total']
+
+    last_six_months = []
+    sources_over_time = []
+    for month in months:
+        sentiments = month_sentiments.get(month, {})
+        sources = month_sources.get(month, {})
+        labels = {'period': month.isoformat(), 'month': MONTH_NAMES[month.month - 1]}
+        last_six_months.append({**labels, **{s: sentiments.get(s, 0) for s in SENTIMENTS}})
+        sources_over_time.append({
+            **labels,
+            **{label: sources.get(source, 0) for label, source in CHART_SOURCES.items()},
+        })
+
+    # Sentiment distribution (all time)
+    sentiment_totals = {r['sentiment']: r['total'] for r in groups.get(GROUP_SENTIMENT, [])}
+
+    # Sentiment by source (all time, predefined sources)
+    source_sentiments = {}
+    source_totals = {r['source']: r['total'] for r in groups.get(GROUP_SOURCE, [])}
+    for r in groups.get(GROUP_SOURCE_SENTIMENT, []):
+        source_sentiments.setdefault(r['source'], {})[r['sentiment']] = r['total']
+    sentiment_by_source = {
+        source: _percentages(source_sentiments.get(source, {}), source_totals.get(source, 0))
+        for source in PREDEFINED_SOURCES
+    }
+
+    return {
+        "review_stats": review_stats,
+        "last_six_months": last_six_months,
+        "feedback_sources": {
+            'sources': [{'source': r['source'], 'count': r['in_range']} for r in in_range_sources],
+            'sources_over_time': sources_over_time,
+        },
+        "sentiment_distribution": {
+            "overall_distribution": _percentages(sentiment_totals, all_time_total),
+        },
+        "sentiment_trends": {"trends": last_six_months},
+        "sentiment_by_source": {"sources": sentiment_by_source},
+    }
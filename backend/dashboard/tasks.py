@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+
+from onboard.models import UserData
+
+from .models import ReportJob
+from .reports import REPORT_SECTIONS, normalize_report_params, prune_stored_reports, render_stored_report
+
+
+@shared_task
+def generate_report_job(job_id):
+    """Build a ReportJob's PDF, recording progress per section, and store it."""
+    claimed = (ReportJob.objects
+               .filter(pk=job_id, status=ReportJob.PENDING)
+               .update(status=ReportJob.RUNNING, started_at=timezone.now()))
+    if not claimed:
+        return  # already picked up by another worker, or cancelled
+    job = ReportJob.objects.get(pk=job_id)
+
+    def progress(step, done, total):
+        # A plain UPDATE so polling clients see it without touching the rest of the row
+        ReportJob.objects.filter(pk=job_id).update(progress=done * 100 // total, current_step=step)
+
+    try:
+        name = render_stored_report(job.user_id, job.params, progress)
+    except Exception as e:
+        ReportJob.objects.filter(pk=job_id).update(status=ReportJob.FAILED, error=str(e), finished_at=timezone.now())
+        raise
+    ReportJob.objects.filter(pk=job_id).update(
+        status=ReportJob.DONE, file=name, progress=100, finished_at=timezone.now(),
+    )
+
+
+@shared_task
+def prerender_scheduled_reports():
+    """
+    Scheduled by CELERY_BEAT_SCHEDULE: queue the preset reports of every
+    tenant and drop stored reports past REPORT_STORE_RETENTION_DAYS.
+    """
+    prune_stored_reports(timedelta(days=getattr(settings, 'REPORT_STORE_RETENTION_DAYS', 7)))
+    for user_id in UserData.objects.values_list('user_id', flat=True).distinct():
+        prerender_tenant_reports.delay(user_id)
+
+
+@shared_task
+def prerender_tenant_reports(user_id):
+    """Render the full report for each preset in SCHEDULED_REPORT_PRESETS unless it is already stored."""
+    for preset in getattr(settings, 'SCHEDULED_REPORT_PRESETS', ['daily', 'weekly', 'monthly', 'quarterly']):
+        params = normalize_report_params({'timeFilter': preset, 'sections': REPORT_SECTIONS})
+        render_stored_report(user_id, params)
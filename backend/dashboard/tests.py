@@ -1,3 +1,696 @@
-from django.test import TestCase
+import base64
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count
+from django.test import Client, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from onboard.models import CustomUser, UserData
+from reviews.models import Review, ReviewDailyRollup
+from .analysis_cache import analysis_fingerprint, evict_analyses, get_cached_analysis, store_analysis
+from .approx import sample_days, sampled_counts
+from . import gemini_service
+from .models import AnalysisCacheEntry, ReportJob
+from .reports import (
+    find_stored_report, normalize_report_params, render_stored_report, report_params_digest, write_report,
+)
+from .summary import GROUP_SENTIMENT, GROUP_SOURCE, GROUP_SOURCE_SENTIMENT, GROUP_TOTAL, fetch_summary_rows
+from .tasks import generate_report_job
+from .timewindows import TimeWindow, bucket_series, today
+
+SOURCES = ['googleplay', 'reddit', 'twitter', 'appstore']
+CATEGORIES = ['Bugs', 'Pricing', 'UI/UX', None]
+SENTIMENTS = ['positive', 'negative', 'neutral', None]
+
+# Tests never touch the configured (Redis) cache: it needs a live server and clearing it would flush real data
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'}}
+
+
+def create_tenant(name, review_count=0, start=None):
+    """A user with one UserData and `review_count` reviews spread over sources, categories and days."""
+    user = CustomUser.objects.create_user(username=name, email=f'{name}@example.com', password='secret')
+    user_data = UserData.objects.create(user=user)
+    start = start or datetime.now(timezone.utc)
+    Review.objects.bulk_create([
+        Review(
+            user_data=user_data,
+            review_id=f'{name}-{i}',
+            date=start - timedelta(hours=i * 7),
+            rating=i % 5 + 1,
+            source=SOURCES[i % len(SOURCES)],
+            review=f'review {i}',
+            title=f'title {i}',
+            username=f'user{i % 9}',
+            url='https://example.com',
+            category=CATEGORIES[i % len(CATEGORIES)],
+            sentiment=SENTIMENTS[(i // 2) % len(SENTIMENTS)],
+        )
+        for i in range(review_count)
+    ])
+    return user, user_data
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DashboardSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.user_data = create_tenant('summary', review_count=300)
+        # Another tenant's reviews never leak into the totals
+        create_tenant('other', review_count=50)
+
+    def test_grouping_sets_match_naive_counts(self):
+        end = today()
+        start = end - timedelta(days=30)
+        rollups = ReviewDailyRollup.objects.filter(user_data=self.user_data)
+        rows = fetch_summary_rows(rollups, start, end)
+        groups = {}
+        for row in rows:
+            groups.setdefault(row['grouping_id'], []).append(row)
+
+        reviews = Review.objects.filter(user_data=self.user_data)
+        self.assertEqual(groups[GROUP_TOTAL][0]['total'], reviews.count())
+        in_range = reviews.filter(**TimeWindow(start, end).review_filter())
+        self.assertEqual(groups[GROUP_TOTAL][0]['in_range'], in_range.count())
+
+        def naive(*fields):
+            return {tuple(row[f] or '' for f in fields): row['count']
+                    for row in reviews.values(*fields).annotate(count=Count('id')).order_by()}
+
+        self.assertEqual({(r['source'],): r['total'] for r in groups[GROUP_SOURCE]}, naive('source'))
+        self.assertEqual({(r['sentiment'],): r['total'] for r in groups[GROUP_SENTIMENT]}, naive('sentiment'))
+        self.assertEqual(
+            {(r['source'], r['sentiment']): r['total'] for r in groups[GROUP_SOURCE_SENTIMENT]},
+            naive('source', 'sentiment'),
+        )
+
+    def test_widgets_match_standalone_endpoints(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for time_range in ['ALL', '7D', '3M']:
+            with self.subTest(time_range):
+                summary = client.get(f'/dashboard/summary/{time_range}/').json()
+                standalone = {
+                    'trending_topics': f'/trending-topics/{time_range}/',
+                    'product_feedback_categories': f'/product-feedback-categories/?time_range={time_range}',
+                    'top_feedback_topics': f'/top-feedback-topics/?time_range={time_range}',
+                    'sentiment_distribution': '/sentiment-distribution/',
+                }
+                for widget, url in standalone.items():
+                    self.assertEqual(summary[widget], client.get(url).json(), widget)
+                self.assertEqual(summary['sentiment_trends']['trends'], client.get('/sentiment-trends/').json()['trends'])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DashboardCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.user_data = create_tenant('cached', review_count=40)
+        cls.other_user, cls.other_data = create_tenant('neighbour', review_count=10)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_review(self, user_data, review_id):
+        # Data versions move on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(user_data=user_data, review_id=review_id, date=datetime.now(timezone.utc),
+                                  source='reddit', review='new', url='https://example.com', sentiment='positive')
+
+    def test_hit_until_own_data_version_moves(self):
+        first = self.client.get('/review-stats/ALL/')
+        self.assertEqual((first['X-Cache'], first.data['total_feedback']), ('miss', 40))
+        self.assertEqual(self.client.get('/review-stats/ALL/')['X-Cache'], 'hit')
+
+        # Another tenant's ingest leaves this tenant's entry alone
+        self.add_review(self.other_data, 'neighbour-new')
+        self.assertEqual(self.client.get('/review-stats/ALL/')['X-Cache'], 'hit')
+
+        self.add_review(self.user_data, 'cached-new')
+        refreshed = self.client.get('/review-stats/ALL/')
+        self.assertEqual((refreshed['X-Cache'], refreshed.data['total_feedback']), ('miss', 41))
+
+    def test_entries_are_per_user(self):
+        self.client.get('/review-stats/ALL/')
+        self.client.force_authenticate(self.other_user)
+        response = self.client.get('/review-stats/ALL/')
+        self.assertEqual((response['X-Cache'], response.data['total_feedback']), ('miss', 10))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.user_data = create_tenant('etag', review_count=20)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertRevalidates(self, url):
+        first = self.client.get(url)
+        etag = first['ETag']
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('Accept', first['Vary'])
+
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((not_modified.status_code, not_modified['ETag']), (304, etag))
+        # If-None-Match is a weak comparison
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=f'W/{etag}').status_code, 304)
+        # A MessagePack body is different bytes, so it never matches the JSON tag
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag, HTTP_ACCEPT='application/msgpack').status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(user_data=self.user_data, review_id=f'etag-{url}', date=datetime.now(timezone.utc),
+                                  source='reddit', review='new', url='https://example.com')
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+    def test_cached_aggregate(self):
+        self.assertRevalidates('/review-stats/ALL/')
+
+    def test_review_listing(self):
+        self.assertRevalidates('/recent-feedback/ALL/')
+
+    def test_onboarding_status(self):
+        self.assertRevalidates('/_allauth/onboard/check-status/')
+
+    def test_status_saves_leave_dashboard_caches(self):
+        status_url = '/_allauth/onboard/check-status/'
+        self.client.get('/review-stats/ALL/')
+        etag = self.client.get(status_url)['ETag']
+
+        user_data = UserData.objects.get(pk=self.user_data.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            user_data.save()  # nothing changed
+        self.assertEqual(self.client.get(status_url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user_data.step_status['step1'] = 'completed'
+            user_data.save()
+        changed = self.client.get(status_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((changed.status_code, changed.json()['step_status']['step1']), (200, 'completed'))
+        # Progress is not dashboard data
+        self.assertEqual(self.client.get('/review-stats/ALL/')['X-Cache'], 'hit')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class BucketSeriesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.user_data = create_tenant('series')
+        cls.end = datetime(2025, 5, 20, tzinfo=timezone.utc)
+        for i, hour in enumerate((0, 1, 13, 23, 23)):
+            Review.objects.create(user_data=cls.user_data, review_id=f'series-{i}', date=cls.end.replace(hour=hour),
+                                  source='reddit', review='text', url='https://example.com', sentiment='negative')
+
+    def series(self, granularity, queryset, **kwargs):
+        window = TimeWindow(self.end.date() - timedelta(days=1), self.end.date())
+        return bucket_series(queryset, window, granularity, 'sentiment', {'negative': 'negative'}, **kwargs)
+
+    def test_hour_buckets_cover_the_whole_end_day(self):
+        rows = self.series('hour', Review.objects.filter(user_data=self.user_data), date_field='date', weight_field=None)
+        self.assertEqual(len(rows), 48)
+        self.assertEqual(rows[-1]['bucket'], datetime(2025, 5, 20, 23))
+        counts = {row['bucket'].hour: row['negative'] for row in rows[24:] if row['negative']}
+        self.assertEqual(counts, {0: 1, 1: 1, 13: 1, 23: 2})
+
+    def test_day_buckets_zero_fill(self):
+        rows = self.series('day', ReviewDailyRollup.objects.filter(user_data=self.user_data))
+        self.assertEqual([(row['bucket'], row['negative']) for row in rows],
+                         [(self.end.date() - timedelta(days=1), 0), (self.end.date(), 5)])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.user_data = create_tenant('keyset')
+        # Three timestamps shared by several reviews each, one with a microsecond component
+        moments = [datetime(2025, 4, 1, 12, 0, 0, 123456, tzinfo=timezone.utc),
+                   datetime(2025, 4, 1, 12, 0, 0, 123457, tzinfo=timezone.utc),
+                   datetime(2025, 3, 1, tzinfo=timezone.utc)]
+        Review.objects.bulk_create([
+            Review(user_data=cls.user_data, review_id=f'keyset-{i}', date=moments[i % 3], source='reddit',
+                   review='text', url='https://example.com')
+            for i in range(23)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def expected(self):
+        return list(Review.objects.filter(user_data=self.user_data).order_by('-date', '-id').values_list('id', flat=True))
+
+    def walk(self, url, link):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([row['id'] for row in response.data['results']])
+            url = response.data[link]
+        return pages
+
+    def test_pages_cover_ties_once_in_order(self):
+        pages = self.walk('/feedback-detail/?page_size=4', 'next')
+        self.assertEqual([len(page) for page in pages], [4, 4, 4, 4, 4, 3])
+        self.assertEqual([review_id for page in pages for review_id in page], self.expected())
+
+        # Walking back from the last page returns the same pages
+        last = self.client.get('/feedback-detail/?page_size=4')
+        while last.data['next']:
+            last = self.client.get(last.data['next'])
+        backwards = self.walk(last.data['previous'], 'previous')
+        self.assertEqual(backwards, pages[-2::-1])
+
+    def test_new_reviews_do_not_shift_pages(self):
+        first = self.client.get('/feedback-detail/?page_size=5')
+        Review.objects.create(user_data=self.user_data, review_id='keyset-new', date=datetime.now(timezone.utc),
+                              source='reddit', review='text', url='https://example.com')
+        second = self.client.get(first.data['next'])
+        self.assertEqual([row['id'] for row in second.data['results']], self.expected()[6:11])
+
+    def test_envelope_totals(self):
+        response = self.client.get('/feedback-detail/?page_size=4')
+        self.assertEqual(list(response.data), ['count', 'next', 'previous', 'results'])
+        self.assertEqual(self.client.get(response.data['next']).data['count'], 23)
+
+        estimated = self.client.get('/feedback-detail/?page_size=4&total=estimate').data
+        self.assertNotIn('count', estimated)
+        self.assertIsInstance(estimated['estimated_total'], int)
+        self.assertEqual(list(self.client.get('/feedback-detail/?page_size=4&total=none').data),
+                         ['next', 'previous', 'results'])
+
+    def test_invalid_cursor_is_404(self):
+        self.assertEqual(self.client.get('/feedback-detail/?cursor=not-a-cursor').status_code, 404)
+
+    def test_legacy_page_numbers(self):
+        response = self.client.get('/feedback-detail/?page=2&page_size=10')
+        self.assertEqual(response.data['count'], 23)
+        self.assertEqual([row['id'] for row in response.data['results']], self.expected()[10:20])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ApproximateCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.user_data = create_tenant('approx', review_count=3000)
+        # Signed up, nothing scraped yet: no UserData at all
+        cls.new_user = CustomUser.objects.create_user(username='fresh', email='fresh@example.com')
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE reviews_reviewdailyrollup")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_tenant_without_user_data(self):
+        self.client.force_authenticate(self.new_user)
+        for url in ('/review-stats/ALL/', '/review-stats/ALL/?approx=1', '/sentiment-distribution/',
+                    '/sentiment-distribution/?approx=1', '/feedback-detail/?total=estimate'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_systematic_day_sample(self):
+        start = datetime(2025, 1, 1).date()
+        days, population = sample_days(start, start + timedelta(days=99), 10)
+        self.assertEqual((len(days), population), (10, 100))
+        self.assertEqual({(b - a).days for a, b in zip(days, days[1:])}, {10})
+
+    @override_settings(DASHBOARD_APPROX_SAMPLE_ROWS=600)
+    def test_estimates_bracket_exact_counts(self):
+        self.client.force_authenticate(self.user)
+        exact = self.client.get('/review-stats/ALL/?approx=0').data
+        approx = self.client.get('/review-stats/ALL/?approx=1').data
+        self.assertNotIn('approximate', exact)
+        self.assertEqual(approx['approximate']['method'], 'day-cluster-sample')
+        error = approx['approximate']['total_feedback_error']
+        self.assertGreater(error, 0)
+        self.assertLessEqual(abs(approx['total_feedback'] - exact['total_feedback']), error)
+
+        window = TimeWindow(None, today())
+        sampled = sampled_counts([self.user_data.id], window, 'sentiment', 25)
+        counts = dict(Review.objects.filter(user_data=self.user_data)
+                      .values_list('sentiment').annotate(count=Count('id')).order_by())
+        for sentiment, entry in sampled['groups'].items():
+            exact_share = counts[sentiment or None] * 100 / 3000
+            self.assertLessEqual(abs(entry['share'] - exact_share), entry['share_error'] + 0.01, sentiment)
+
+
+class ReportStorageMixin:
+    """Reports are written to a throwaway MEDIA_ROOT."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+REPORT_BODY = {'reportType': 'comprehensive', 'timeFilter': 'monthly', 'format': 'csv',
+               'sections': ['sentiment_analysis', 'feedback_sources']}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReportJobTests(ReportStorageMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.user_data = create_tenant('reporter', review_count=30)
+        cls.other_user, _ = create_tenant('bystander')
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def queue(self, body=REPORT_BODY):
+        with mock.patch('dashboard.views.generate_report_job') as task, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/reports/jobs/', body, format='json')
+        return response, task.delay
+
+    def test_identical_requests_share_one_job(self):
+        first, delay = self.queue()
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(first['Location'], first.data['status_url'])
+        delay.assert_called_once_with(str(first.data['id']))
+
+        again, delay = self.queue()
+        self.assertEqual(again.data['id'], first.data['id'])
+        delay.assert_not_called()
+
+        other, _ = self.queue({**REPORT_BODY, 'format': 'html'})
+        self.assertNotEqual(other.data['id'], first.data['id'])
+        self.assertEqual(ReportJob.objects.filter(user=self.user).count(), 2)
+
+    def test_one_active_job_per_params_constraint(self):
+        params = normalize_report_params(REPORT_BODY)
+        digest = report_params_digest(params)
+        job = ReportJob.objects.create(user=self.user, params=params, params_digest=digest)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ReportJob.objects.create(user=self.user, params=params, params_digest=digest, status=ReportJob.RUNNING)
+        # Another user, or a finished job, does not block a new one
+        ReportJob.objects.create(user=self.other_user, params=params, params_digest=digest)
+        job.status = ReportJob.DONE
+        job.save()
+        ReportJob.objects.create(user=self.user, params=params, params_digest=digest)
+
+    @override_settings(REPORT_JOB_TIMEOUT=60)
+    def test_stale_job_times_out(self):
+        first, _ = self.queue()
+        ReportJob.objects.filter(pk=first.data['id']).update(created_at=datetime.now(timezone.utc) - timedelta(minutes=2))
+        second, delay = self.queue()
+        self.assertNotEqual(second.data['id'], first.data['id'])
+        delay.assert_called_once()
+        stale = ReportJob.objects.get(pk=first.data['id'])
+        self.assertEqual((stale.status, stale.error), (ReportJob.FAILED, 'Timed out'))
+
+    def test_worker_runs_job_to_download(self):
+        queued, _ = self.queue()
+        self.assertIsNone(queued.data['download_url'])
+        self.assertEqual(self.client.get(f"{queued['Location']}download/").status_code, 409)
+        generate_report_job(str(queued.data['id']))
+
+        job = self.client.get(queued['Location']).data
+        self.assertEqual((job['status'], job['progress']), ('done', 100))
+        download = self.client.get(job['download_url'])
+        self.assertEqual(download.status_code, 200)
+        self.assertIn(b'Sentiment', b''.join(download.streaming_content))
+
+        # The same report again is already stored, so the job is finished on arrival
+        stored, delay = self.queue()
+        self.assertEqual((stored.status_code, stored.data['status']), (200, 'done'))
+        delay.assert_not_called()
+
+    def test_jobs_are_private(self):
+        queued, _ = self.queue()
+        self.client.force_authenticate(self.other_user)
+        self.assertEqual(self.client.get(queued['Location']).status_code, 404)
+        self.assertEqual(self.client.get('/reports/jobs/').data, [])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class StoredReportTests(ReportStorageMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.user_data = create_tenant('stored', review_count=12)
+
+    def render(self, params):
+        with mock.patch('dashboard.reports.write_report', wraps=write_report) as write:
+            name = render_stored_report(self.user.pk, params)
+        return name, write.call_count
+
+    def test_rendered_once_per_data_version(self):
+        params = normalize_report_params(REPORT_BODY)
+        self.assertIsNone(find_stored_report(self.user.pk, params))
+        name, renders = self.render(params)
+        self.assertEqual(renders, 1)
+        self.assertEqual(find_stored_report(self.user.pk, params), name)
+        self.assertEqual(self.render(params), (name, 0))
+
+        # Other parameters are another report
+        other_name, renders = self.render(normalize_report_params({**REPORT_BODY, 'format': 'html'}))
+        self.assertNotEqual(other_name, name)
+        self.assertEqual(renders, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(user_data=self.user_data, review_id='stored-new', date=datetime.now(timezone.utc),
+                                  source='reddit', review='new', url='https://example.com')
+        self.assertIsNone(find_stored_report(self.user.pk, params))
+        new_name, renders = self.render(params)
+        self.assertNotEqual(new_name, name)
+        self.assertEqual(renders, 1)
+
+    def test_generate_view_serves_stored_report(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        streamed = client.post('/reports/generate/', REPORT_BODY, format='json')
+        self.assertEqual(streamed['X-Cache'], 'miss')
+
+        name = render_stored_report(self.user.pk, normalize_report_params(REPORT_BODY))
+        stored = client.post('/reports/generate/', REPORT_BODY, format='json')
+        self.assertEqual(stored['X-Cache'], 'hit')
+        with default_storage.open(name) as handle:
+            self.assertEqual(b''.join(stored.streaming_content), handle.read())
+
+
+class AnalysisCacheTests(TestCase):
+    def store(self, name):
+        fingerprint = analysis_fingerprint('gemini-test', 1, 'Bugs', 'last week', [name])
+        store_analysis(fingerprint, {'summary': name}, 'gemini-test', 1, 'Bugs', 1)
+        return fingerprint
+
+    def test_fingerprint_ignores_review_order(self):
+        first = analysis_fingerprint('gemini-test', 1, 'Bugs', 'last week', ['a', 'b'])
+        self.assertEqual(first, analysis_fingerprint('gemini-test', 1, 'Bugs', 'last week', ['b', 'a']))
+        self.assertNotEqual(first, analysis_fingerprint('gemini-test', 1, 'Bugs', 'last week', ['a', 'c']))
+        self.assertNotEqual(first, analysis_fingerprint('gemini-test', 2, 'Bugs', 'last week', ['a', 'b']))
+
+    @override_settings(LLM_ANALYSIS_CACHE_TTL=60)
+    def test_entries_expire_after_ttl(self):
+        fingerprint = self.store('fresh')
+        self.assertEqual(get_cached_analysis(fingerprint), {'summary': 'fresh'})
+        self.assertEqual(AnalysisCacheEntry.objects.get(pk=fingerprint).hits, 1)
+
+        later = datetime.now(timezone.utc) + timedelta(seconds=61)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            self.assertIsNone(get_cached_analysis(fingerprint))
+            self.assertEqual(evict_analyses(), 1)
+        self.assertFalse(AnalysisCacheEntry.objects.exists())
+
+    @override_settings(LLM_ANALYSIS_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_used_are_evicted(self):
+        start = datetime.now(timezone.utc)
+        fingerprints = []
+        for minute, name in enumerate(['a', 'b', 'c']):
+            with mock.patch('django.utils.timezone.now', return_value=start + timedelta(minutes=minute)):
+                if name == 'c':
+                    # Reading 'a' makes 'b' the least recently used
+                    get_cached_analysis(fingerprints[0])
+                fingerprints.append(self.store(name))
+
+        self.assertEqual(set(AnalysisCacheEntry.objects.values_list('pk', flat=True)),
+                         {fingerprints[0], fingerprints[2]})
+        self.assertIsNone(get_cached_analysis(fingerprints[1]))
+
+
+def fake_gemini(degraded_prompts=()):
+    """A _call_gemini stub with a fixed answer, as a text fallback for prompts containing a marker."""
+    def call(prompt, category, date_range):
+        result = {'summary': 'Mixed.', 'positiveInsights': ['good'], 'negativeInsights': ['bad']}
+        if any(marker in prompt for marker in degraded_prompts):
+            result['analysis_type'] = 'gemini_text_fallback'
+        return result
+    return call
+
+
+@override_settings(GEMINI_SUMMARY_MODE='map_reduce', GEMINI_CHUNK_TOKENS=100, GEMINI_MAX_CHUNKS=8,
+                   GEMINI_MAP_CONCURRENCY=2)
+class MapReduceAnalysisTests(TestCase):
+    # 40 characters, about 11 estimated tokens: 9 fit in a 100-token batch
+    reviews = [f'review {i:03d} ' + 'x' * 29 for i in range(40)]
+
+    def setUp(self):
+        patcher = mock.patch.multiple(gemini_service, GEMINI_AVAILABLE=True, GEMINI_API_KEY='test', create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def analyse(self, reviews, stub=None):
+        stub = mock.Mock(side_effect=stub or fake_gemini())
+        with mock.patch.object(gemini_service, '_call_gemini', stub):
+            result = gemini_service.generate_analysis(reviews, 'Bugs', 'last week')
+        return result, [call.args[0] for call in stub.call_args_list]
+
+    def test_chunks_keep_order_and_size(self):
+        chunks = gemini_service.chunk_reviews(self.reviews, 100)
+        self.assertEqual([review for chunk in chunks for review in chunk], self.reviews)
+        self.assertTrue(all(gemini_service._estimate_tokens(chunk) <= 100 for chunk in chunks))
+        self.assertEqual(len(chunks), 5)
+        # An oversized review is truncated to a batch of its own
+        self.assertEqual(gemini_service.chunk_reviews(['y' * 1000, 'z'], 100), [['y' * 400], ['z']])
+        self.assertEqual(gemini_service._pack('abc', [60, 60, 30], 100), [['a'], ['b', 'c']])
+
+    def test_budget_samples_down_to_max_chunks(self):
+        chunks = gemini_service.budget_chunks(self.reviews, 100, 2)
+        self.assertLessEqual(len(chunks), 2)
+        sampled = [review for chunk in chunks for review in chunk]
+        step = self.reviews.index(sampled[1])
+        self.assertEqual(sampled, self.reviews[::step])
+        self.assertEqual(gemini_service.budget_chunks(self.reviews, 100, 8),
+                         gemini_service.chunk_reviews(self.reviews, 100))
+
+    def test_map_merge_and_reduce(self):
+        result, prompts = self.analyse(self.reviews)
+        map_prompts = [p for p in prompts if 'are batch' in p]
+        self.assertEqual(len(map_prompts), 5)
+        timings = result['timings']
+        self.assertEqual(timings['chunks'], 5)
+        self.assertEqual((timings['reviews'], timings['sampled_reviews']), (40, 40))
+        # Five partials do not fit in 100 tokens, so they are merged in rounds before the final call
+        self.assertGreater(timings['merge_rounds'], 0)
+        self.assertEqual(len(prompts), 5 + len([p for p in prompts if 'partial analyses' in p]))
+        self.assertIn('40 reviews in total', prompts[-1])
+        for key in ('map_seconds', 'merge_seconds', 'reduce_seconds', 'total_seconds'):
+            self.assertGreaterEqual(timings[key], 0)
+        self.assertFalse(result['degraded'])
+        self.assertTrue(AnalysisCacheEntry.objects.exists())
+
+        self.assertNotIn('timings', AnalysisCacheEntry.objects.get().result)
+
+        cached, prompts = self.analyse(self.reviews)
+        self.assertEqual(prompts, [])
+        self.assertTrue(cached['cached'])
+        self.assertNotIn('timings', cached)
+
+    @override_settings(GEMINI_MAX_CHUNKS=2)
+    def test_calls_are_bounded(self):
+        result, prompts = self.analyse(self.reviews * 10)
+        self.assertLessEqual(result['timings']['chunks'], 2)
+        self.assertLess(result['timings']['sampled_reviews'], 400)
+        self.assertLessEqual(len(prompts), 2 + 1 + 1)
+
+    def test_degraded_batches_are_not_cached(self):
+        result, _ = self.analyse(self.reviews, fake_gemini(degraded_prompts=['batch 3 of 5']))
+        self.assertEqual(result['analysis_type'], 'gemini')
+        self.assertTrue(result['degraded'])
+        self.assertEqual(result['timings']['degraded_calls'], 1)
+        self.assertFalse(AnalysisCacheEntry.objects.exists())
+
+    @override_settings(GEMINI_SUMMARY_MODE='sample')
+    def test_sample_mode_is_one_call(self):
+        result, prompts = self.analyse(self.reviews * 10)
+        self.assertEqual(len(prompts), 1)
+        self.assertEqual(result['timings'], {**result['timings'], 'mode': 'single', 'reviews': 200})
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AsyncViewTests(TestCase):
+    # Handlers query on the request's own sync thread, so they see this test's uncommitted data
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.user_data = create_tenant('async', review_count=40)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def basic_auth(self, password='secret'):
+        credentials = f'{self.user.email}:{password}'.encode()
+        return {'HTTP_AUTHORIZATION': 'Basic ' + base64.b64encode(credentials).decode()}
+
+    def test_results_match_sync_views(self):
+        for sync_url, async_url in [('/review-stats/ALL/', '/async/review-stats/ALL/'),
+                                    ('/review-stats/1W/?approx=0', '/async/review-stats/1W/?approx=0'),
+                                    ('/feedback-sources/ALL/', '/async/feedback-sources/ALL/')]:
+            with self.subTest(async_url):
+                sync, async_ = self.client.get(sync_url), self.client.get(async_url)
+                self.assertEqual(async_.status_code, 200)
+                self.assertEqual(async_.json(), sync.json())
+
+        overview = self.client.get('/async/sentiment-overview/').json()
+        distribution = self.client.get('/sentiment-distribution/').json()
+        self.assertEqual(overview['overall_distribution'], distribution['overall_distribution'])
+
+    def test_authentication_classes(self):
+        self.assertEqual(Client().get('/async/review-stats/ALL/').status_code, 403)
+        self.assertEqual(Client().get('/async/review-stats/ALL/', **self.basic_auth()).status_code, 200)
+        # Bad credentials fail outright rather than falling back to anonymous
+        self.assertEqual(Client().get('/async/review-stats/ALL/', **self.basic_auth('wrong')).status_code, 403)
+
+        session = Client()
+        session.force_login(self.user)
+        self.assertEqual(session.get('/async/review-stats/ALL/').status_code, 200)
+
+    def test_etag(self):
+        first = self.client.get('/async/review-stats/ALL/')
+        self.assertEqual(self.client.get('/async/review-stats/ALL/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+    def test_trend_analysis(self):
+        body = {'category': 'Bugs', 'timePreset': 'quarterly'}
+        self.assertEqual(Client().post('/async/trends/analysis/', body, content_type='application/json').status_code, 403)
+
+        with mock.patch.object(gemini_service, 'GEMINI_AVAILABLE', False):
+            async_ = self.client.post('/async/trends/analysis/', body, format='json')
+            sync = self.client.post('/trends/analysis/', body, format='json')
+        self.assertEqual(async_.status_code, 200)
+        self.assertEqual(async_.json(), sync.json())
+        self.assertEqual(async_.json()['metadata']['reviewCount'], 10)
+
+        # Another tenant's reviews in the same category are not analysed
+        create_tenant('async-other', review_count=40)
+        with mock.patch.object(gemini_service, 'GEMINI_AVAILABLE', False):
+            for url in ['/trends/analysis/', '/async/trends/analysis/']:
+                response = self.client.post(url, body, format='json')
+                self.assertEqual(response.json()['metadata']['reviewCount'], 10)
+        self.assertEqual(Client().post('/trends/analysis/', body, content_type='application/json').status_code, 403)
+
+        invalid = self.client.post('/async/trends/analysis/', {'category': 'Bugs', 'timePreset': 'hourly'}, format='json')
+        self.assertEqual((invalid.status_code, invalid.json()), (400, {'error': 'Invalid time preset: hourly'}))
+
+    def test_csrf(self):
+        body = {'category': 'Bugs', 'timePreset': 'weekly'}
+        session = Client(enforce_csrf_checks=True)
+        session.force_login(self.user)
+        rejected = session.post('/async/trends/analysis/', body, content_type='application/json')
+        self.assertEqual(rejected.status_code, 403)
+        self.assertIn('CSRF', rejected.json()['detail'])
+
+        # Like APIView, only session authentication needs the token
+        basic = Client(enforce_csrf_checks=True)
+        with mock.patch.object(gemini_service, 'GEMINI_AVAILABLE', False):
+            response = basic.post('/async/trends/analysis/', body, content_type='application/json', **self.basic_auth())
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,215 @@
+"""
+Shared time windows and calendar bucketing for the dashboard.
+
+Presets ("7D", "3M", ...) and custom ranges (?start=YYYY-MM-DD&end=YYYY-MM-DD)
+resolve to a TimeWindow of whole UTC days. Time series are bucketed in SQL
+with date_trunc and zero-filled against generate_series, so a view gets one
+row per bucket straight from the database instead of rebuilding month keys
+in Python.
+"""
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import connection
+from django.db.models import DateField, DateTimeField, F, Value
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+PRESET_DAYS = {'7D': 7, '14D': 14, '4W': 28, '3M': 90, '6M': 180, '12M': 365}
+GRANULARITIES = {'hour': '1 hour', 'day': '1 day', 'week': '1 week', 'month': '1 month'}
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+MAX_BUCKETS = 1000
+LAYOUTS = ('rows', 'columnar')
+
+SERIES_SQL = """
+SELECT b.bucket AS bucket, {columns}
+FROM generate_series(date_trunc(%s, %s::timestamp), date_trunc(%s, %s::timestamp), %s::interval) AS b(bucket)
+LEFT JOIN ({base}) AS r ON r.bucket::timestamp = b.bucket
+GROUP BY b.bucket
+ORDER BY b.bucket
+"""
+
+
+class TimeWindow:
+    """An inclusive range of UTC days; start is None for "all time"."""
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return f"TimeWindow({self.start!r}, {self.end!r})"
+
+    def rollup_filter(self, field='day'):
+        constraints = {f'{field}__lte': self.end}
+        if self.start is not None:
+            constraints[f'{field}__gte'] = self.start
+        return constraints
+
+    def review_filter(self, field='date'):
+        constraints = {f'{field}__lt': _midnight(self.end + timedelta(days=1))}
+        if self.start is not None:
+            constraints[f'{field}__gte'] = _midnight(self.start)
+        return constraints
+
+
+def _midnight(day):
+    return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+
+def today():
+    return timezone.now().date()
+
+
+def _parse_day(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError({name: "Expected a date in YYYY-MM-DD format."})
+
+
+def custom_window(params, end=None):
+    """Window from ?start= and ?end=, or None when no custom start was given."""
+    start = _parse_day(params, 'start')
+    if start is None:
+        return None
+    end = _parse_day(params, 'end') or end or today()
+    if start > end:
+        raise ValidationError({'start': "start must not be after end."})
+    return TimeWindow(start, end)
+
+
+def resolve_time_window(time_range, params):
+    """
+    Window for a time range preset, "CUSTOM" or "ALL".
+
+    A custom range needs ?start= (and optionally ?end=, defaulting to today);
+    "ALL" has no lower bound rather than scanning from datetime.min.
+    """
+    time_range = (time_range or 'ALL').upper()
+    end = today()
+    window = custom_window(params, end)
+    if window is not None:
+        return window
+    if time_range == 'CUSTOM':
+        raise ValidationError({'start': "A custom time range needs a start date."})
+    if time_range in PRESET_DAYS:
+        return TimeWindow(end - timedelta(days=PRESET_DAYS[time_range]), end)
+    return TimeWindow(None, end)
+
+
+def last_calendar_months(count, end=None):
+    """Window covering the `count` calendar months ending with end's month."""
+    end = end or today()
+    start = end.replace(day=1)
+    for _ in range(count - 1):
+        start = (start - timedelta(days=1)).replace(day=1)
+    return TimeWindow(start, end)
+
+
+def get_granularity(params, default='month'):
+    granularity = params.get('granularity', default)
+    if granularity not in GRANULARITIES:
+        raise ValidationError({'granularity': f"Expected one of {', '.join(GRANULARITIES)}."})
+    return granularity
+
+
+def get_layout(params, default='rows'):
+    layout = params.get('layout', default)
+    if layout not in LAYOUTS:
+        raise ValidationError({'layout': f"Expected one of {', '.join(LAYOUTS)}."})
+    return layout
+
+
+def _bucket_count(window, granularity):
+    days = (window.end - window.start).days + 1
+    if granularity == 'hour':
+        return days * 24
+    if granularity == 'day':
+        return days
+    if granularity == 'week':
+        return days // 7 + 2
+    return (window.end.year - window.start.year) * 12 + window.end.month - window.start.month + 1
+
+
+def _last_bucket(window, granularity):
+    """Start of the last bucket; hour buckets run until the end day's final hour."""
+    if granularity == 'hour':
+        return datetime.combine(window.end + timedelta(days=1), time.min) - timedelta(hours=1)
+    return window.end
+
+
+def bucket_series(queryset, window, granularity, series_field, series,
+                  date_field='day', weight_field='review_count'):
+    """
+    Zero-filled counts per calendar bucket, one row per bucket.
+
+    `series` maps output keys to values of `series_field`; each row is
+    {'bucket': <date or datetime>, key: count, ...}. Rows are weighted by
+    `weight_field` (rollup counts) or counted once each when it is None.
+    Hour buckets need a DateTimeField, so they come from raw reviews.
+    """
+    if window.start is None:
+        raise ValueError("bucket_series needs a bounded window")
+    if _bucket_count(window, granularity) > MAX_BUCKETS:
+        raise ValidationError({'granularity': f"Too many {granularity} buckets for this range (max {MAX_BUCKETS})."})
+
+    if isinstance(queryset.model._meta.get_field(date_field), DateTimeField):
+        bucket = Trunc(date_field, granularity, tzinfo=dt_timezone.utc)
+        window_filter = window.review_filter(date_field)
+    else:
+        bucket = Trunc(date_field, granularity, output_field=DateField())
+        window_filter = window.rollup_filter(date_field)
+
+    base = (queryset
+            .filter(**window_filter)
+            .annotate(bucket=bucket,
+                      series_key=F(series_field),
+                      weight=F(weight_field) if weight_field else Value(1))
+            .values('bucket', 'series_key', 'weight')
+            .order_by())
+    base_sql, base_params = base.query.sql_with_params()
+
+    keys = list(series)
+    columns = ", ".join(
+        f'COALESCE(SUM(r.weight) FILTER (WHERE r.series_key = %s), 0) AS "s{i}"' for i in range(len(keys))
+    )
+    params = [
+        *(series[key] for key in keys),
+        granularity, window.start, granularity, _last_bucket(window, granularity), GRANULARITIES[granularity],
+        *base_params,
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(SERIES_SQL.format(columns=columns, base=base_sql), params)
+        rows = cursor.fetchall()
+
+    return [
+        {'bucket': row[0] if granularity == 'hour' else row[0].date(), **dict(zip(keys, row[1:]))}
+        for row in rows
+    ]
+
+
+def label_series(rows, granularity):
+    """Add the keys chart widgets read: an ISO 'period' and, for months, the month name."""
+    for row in rows:
+        bucket = row.pop('bucket')
+        labels = {'period': bucket.isoformat()}
+        if granularity == 'month':
+            labels['month'] = MONTH_NAMES[bucket.month - 1]
+        yield {**labels, **row}
+
+
+def columnar(rows):
+    """
+    Series rows as parallel arrays, {'period': [...], 'positive': [...], ...}.
+
+    Chart libraries take one array per axis, and the keys are sent once
+    instead of once per bucket.
+    """
+    rows = list(rows)
+    if not rows:
+        return {}
+    return {key: [row[key] for row in rows] for key in rows[0]}
@@ -30,11 +30,17 @@ from .views import (
     TrendingTopicsView, TrendAnalysisView, 
     RecentFeedbackView, FeedbackSourcesView, SentimentDistributionView,
     SentimentTrendsView, SentimentBySourceView, ProductFeedbackCategoriesView, TopFeedbackTopicsView,
-    FeatureSpecificFeedbackView, FeedbackSourcesDetailedView, FeedbackDetailsView, GenerateReportView
+    FeatureSpecificFeedbackView, FeedbackSourcesDetailedView, FeedbackDetailsView, ExportReviewsView, GenerateReportView,
+    ReportJobsView, ReportJobView, ReportJobDownloadView,
+    DashboardSummaryView
+)
+from .async_views import (
+    AsyncReviewStatsView, AsyncFeedbackSourcesView, AsyncSentimentOverviewView, AsyncTrendAnalysisView,
 )
 
 urlpatterns = [
     path('review-stats/<str:time_range>/', ReviewStatsView.as_view(), name='review-stats'),
+    path('dashboard/summary/<str:time_range>/', DashboardSummaryView.as_view(), name='dashboard-summary'),
     path('last-6-months/<str:time>/', LastSixMonthsStatsView.as_view(), name='last-6-months-stats'),
     path('trending-topics/<str:time>/', TrendingTopicsView.as_view(), name='trending-topics'),
     path('stats/<str:time_range>/', ReviewStatsView.as_view(), name='review-stats'),
@@ -51,5 +57,15 @@ urlpatterns = [
     path('feature-specific-feedback/', FeatureSpecificFeedbackView.as_view(), name='feature-specific-feedback'),
     path('feedback-detailed-sources/', FeedbackSourcesDetailedView.as_view(), name='feedback_sources'),
     path('feedback-detail/', FeedbackDetailsView.as_view(), name='feedback-details'),
+    path('feedback-export/<str:export_format>/', ExportReviewsView.as_view(), name='feedback-export'),
     path('reports/generate/', GenerateReportView.as_view(), name='generate-report'),
+    path('reports/jobs/', ReportJobsView.as_view(), name='report-jobs'),
+    path('reports/jobs/<uuid:job_id>/', ReportJobView.as_view(), name='report-job'),
+    path('reports/jobs/<uuid:job_id>/download/', ReportJobDownloadView.as_view(), name='report-job-download'),
+
+    # Native async variants for ASGI workers
+    path('async/review-stats/<str:time_range>/', AsyncReviewStatsView.as_view(), name='async-review-stats'),
+    path('async/feedback-sources/<str:time>/', AsyncFeedbackSourcesView.as_view(), name='async-feedback-sources'),
+    path('async/sentiment-overview/', AsyncSentimentOverviewView.as_view(), name='async-sentiment-overview'),
+    path('async/trends/analysis/', AsyncTrendAnalysisView.as_view(), name='async-trend-analysis'),
 ]
@@ -1,289 +1,367 @@
 # views.py
-from django.db.models.functions import ExtractYear, ExtractMonth, TruncMonth
 from rest_framework import generics
-from django.db.models import Count, Q, FloatField, ExpressionWrapper, F
+from django.db.models import Q, Sum
 from datetime import datetime, timedelta
-from rest_framework.pagination import LimitOffsetPagination, PageNumberPagination
-from reviews.models import Review
+from reviews.models import Review, ReviewDailyRollup
+from reviews.exports import EXPORT_CONTENT_TYPES, EXPORT_WRITERS, PARQUET_AVAILABLE, write_parquet
+from reviews.search import fuzzy_search_reviews, search_reviews
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from .serializers import ReviewSerializer
-from django.http import FileResponse
+from .serializers import (
+    FUZZY_FIELDS, SEARCH_FIELDS, ReportJobSerializer, ReviewRowSerializer, ReviewSerializer, parse_fields,
+)
+from django.http import FileResponse, StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework import status
-import io
-from reportlab.pdfgen import canvas
-from django.db.models import Count, Case, When
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib.styles import getSampleStyleSheet
-import json
+from rest_framework.exceptions import ValidationError
+import tempfile
+from django.utils.dateparse import parse_datetime
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.core.files.storage import default_storage
+from django.utils import timezone
+import math
 from .gemini_service import generate_analysis
+from .summary import CHART_SOURCES, build_dashboard_summary
+from .cache import cached_dashboard_response
+from .facets import active_filters, facet_counts
+from .pagination import FeedbackPagination, KeysetPagination, RecentFeedbackPagination
+from .categories import TOP_TOPICS, category_matrix
+from .approx import approximation_info, sample_percent, sampled_counts
+from .models import ReportJob
+from .reports import (
+    REPORT_CONTENT_TYPES, REPORT_STREAMS, XLSX_AVAILABLE, ReportDataset, find_stored_report,
+    normalize_report_params, render_stored_report, report_filename, report_params_digest, tenant_reviews,
+)
+from .tasks import generate_report_job
+from onboard.data_version import conditional_on_data_version, get_user_data_ids
+from .timewindows import (
+    PRESET_DAYS, bucket_series, columnar, custom_window, get_granularity, get_layout, label_series,
+    last_calendar_months, resolve_time_window, today,
+)
 
 
 class TimeRangeMixin:
     def __init__(self):
         self.kwargs = None
 
+    def get_time_window(self):
+        time_range = self.request.query_params.get('time_range') or self.kwargs.get('time_range', 'ALL')
+        return resolve_time_window(time_range, self.request.query_params)
+
     def get_time_constraints(self):
-        time_range = self.kwargs.get('time_range', 'ALL')
-        end_date = datetime.now()
-        if time_range == '7D':
-            start_date = end_date - timedelta(days=7)
-        elif time_range == '14D':
-            start_date = end_date - timedelta(days=14)
-        elif time_range == '4W':
-            start_date = end_date - timedelta(weeks=4)
-        elif time_range == '3M':
-            start_date = end_date - timedelta(days=3 * 30)
-        elif time_range == '6M':
-            start_date = end_date - timedelta(days=6 * 30)
-        elif time_range == '12M':
-            start_date = end_date - timedelta(days=365)
-        else:  # Custom or ALL
-            start_date = datetime.min
-
-        return {'date__range': (start_date, end_date)}
-
-class ReviewStatsView(generics.RetrieveAPIView, TimeRangeMixin):
+        return self.get_time_window().review_filter()
+
+    def get_rollup_constraints(self):
+        return self.get_time_window().rollup_filter()
+
+
+# Window lengths (days) accepted by the trend endpoints
+TREND_WINDOW_DAYS = PRESET_DAYS
+DEFAULT_TREND_WINDOW_DAYS = 30
+TREND_Z_THRESHOLD = 1.96  # two-sided 95% for the rate comparison below
+
+
+def trend_z_score(current_mentions, previous_mentions):
+    """
+    z statistic for "the mention rate changed" between two equal-length windows.
+
+    Under a constant Poisson rate the current window's share of the combined
+    mentions is Binomial(n, 0.5), so (c - p) / sqrt(c + p) is approximately
+    standard normal.
+    """
+    total = current_mentions + previous_mentions
+    if total == 0:
+        return 0.0
+    return (current_mentions - previous_mentions) / math.sqrt(total)
+
+
+def trend_direction(current_mentions, previous_mentions):
+    z_score = trend_z_score(current_mentions, previous_mentions)
+    if z_score >= TREND_Z_THRESHOLD:
+        return "↑ Trending up"
+    elif z_score <= -TREND_Z_THRESHOLD:
+        return "↓ Trending down"
+    return "→ Stable"
+
+
+def trending_topics(rollups, window_days):
+    """The five categories mentioned most in the last `window_days` days, with their trend."""
+    end_date = today()
+    start_date = end_date - timedelta(days=window_days)
+    previous_start_date = start_date - timedelta(days=window_days)
+    current_window = Q(day__gt=start_date)  # both windows span exactly window_days days
+
+    # Current and previous window counts per category in one conditional aggregation
+    topics_data = (rollups
+                   .filter(day__gt=previous_start_date, day__lte=end_date)
+                   .values('category')
+                   .annotate(
+        mentions=Sum('review_count', filter=current_window, default=0),
+        previous_mentions=Sum('review_count', filter=~current_window, default=0),
+        negative_sentiment=Sum('review_count', filter=current_window & Q(sentiment='negative'), default=0),
+        positive_sentiment=Sum('review_count', filter=current_window & Q(sentiment='positive'), default=0),
+    )
+                   .filter(mentions__gt=0)
+                   .order_by('-mentions')[:5])
+
+    response_data = []
+    for topic in topics_data:
+        high_sentiment = max('negative_sentiment', 'positive_sentiment', key=topic.get)
+        response_data.append({
+            'category': topic['category'] or None,
+            'trend_direction': trend_direction(topic['mentions'], topic['previous_mentions']),
+            'z_score': round(trend_z_score(topic['mentions'], topic['previous_mentions']), 2),
+            'sentiment': high_sentiment.split('_')[0],
+            'window_days': window_days,
+            'mentions': topic['mentions'],
+            'previous_mentions': topic['previous_mentions'],
+            'last_30_days_mentions': topic['mentions'],  # kept for existing clients
+        })
+    return response_data
+
+
+def trend_window_days(time_range):
+    return TREND_WINDOW_DAYS.get(time_range, DEFAULT_TREND_WINDOW_DAYS)
+
+
+class RollupMixin:
+    """Dashboard aggregates come from the requesting tenant's daily rollups, not raw reviews."""
+
+    def get_user_data_ids(self):
+        # Memoised per request so async views can resolve it once off the event loop
+        if not hasattr(self, '_user_data_ids'):
+            self._user_data_ids = get_user_data_ids(self.request.user.pk)
+        return self._user_data_ids
+
+    def get_rollups(self):
+        return ReviewDailyRollup.objects.filter(user_data_id__in=self.get_user_data_ids())
+
+    def get_reviews(self):
+        # Filtering on the ids rather than joining UserData lets the planner use the (user_data, ...) indexes
+        return Review.objects.filter(user_data_id__in=self.get_user_data_ids())
+
+
+class ReviewRowsMixin:
+    """
+    Review listings served from `.values()` rows.
+
+    Only the columns the response needs (plus the keyset pagination key)
+    are selected, so the embedding and comments never leave Postgres, and
+    ?fields= narrows the payload further.
+    """
+    serializer_class = ReviewRowSerializer
+    extra_fields = ()
+
+    def get_row_fields(self):
+        if not hasattr(self, '_row_fields'):
+            default = [*ReviewSerializer.Meta.fields, *self.extra_fields]
+            self._row_fields = parse_fields(self.request.query_params, default, default)
+        return self._row_fields
+
+    def select_rows(self, queryset):
+        keys = getattr(self, 'keyset_ordering', None) or KeysetPagination.ordering
+        return queryset.values(*dict.fromkeys([*self.get_row_fields(), *keys]))
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs['fields'] = self.get_row_fields()
+        return super().get_serializer(*args, **kwargs)
+
+
+SENTIMENT_SERIES = {'positive': 'positive', 'negative': 'negative', 'neutral': 'neutral'}
+
+
+class TimeSeriesMixin(RollupMixin):
+    """Calendar-bucketed, zero-filled series over the last few months or a custom range."""
+    series_months = 6
+
+    def get_series_window(self):
+        return custom_window(self.request.query_params) or last_calendar_months(self.series_months)
+
+    def get_series(self, series_field, series):
+        """One row per bucket, or parallel arrays per key with ?layout=columnar."""
+        granularity = get_granularity(self.request.query_params)
+        layout = get_layout(self.request.query_params)
+        if granularity == 'hour':
+            # Rollups are daily, so hourly buckets are counted from the reviews themselves
+            queryset, date_field, weight_field = self.get_reviews(), 'date', None
+        else:
+            queryset, date_field, weight_field = self.get_rollups(), 'day', 'review_count'
+        rows = bucket_series(queryset, self.get_series_window(), granularity, series_field, series,
+                             date_field=date_field, weight_field=weight_field)
+        rows = label_series(rows, granularity)
+        return columnar(rows) if layout == 'columnar' else list(rows)
+
+
+def review_stats_queries(rollups):
+    """The independent queries behind ReviewStatsView, as callables."""
+    return (
+        lambda: rollups.aggregate(total=Sum('review_count'))['total'] or 0,
+        lambda: (rollups
+                 .values('source')
+                 .annotate(count=Sum('review_count'))
+                 .order_by('-count')
+                 .first()),
+        lambda: list(rollups
+                     .values('sentiment')
+                     .annotate(count=Sum('review_count'))),
+    )
+
+
+def review_stats_payload(total_feedback, top_source, sentiment_counts):
+    sentiment_stats = {s['sentiment']: s['count'] for s in sentiment_counts}
+    highest_sentiment = max(sentiment_stats, key=sentiment_stats.get) if sentiment_stats else None
+
+    return {
+        "total_feedback": total_feedback,
+        "top_source": f"{top_source['source']} ({top_source['count']})" if top_source else "N/A",
+        "most_common_sentiment": highest_sentiment or "N/A",
+    }
+
+
+def approximate_review_stats(sources, sentiments, percent):
+    """ReviewStatsView payload from sampled_counts() by source and by sentiment."""
+    top_source = max(sources['groups'].items(), key=lambda item: item[1]['count'], default=None)
+    highest_sentiment = max(sentiments['groups'], key=lambda key: sentiments['groups'][key]['count'], default=None)
+    return {
+        "total_feedback": sources['total']['count'],
+        "top_source": f"{top_source[0]} ({top_source[1]['count']})" if top_source else "N/A",
+        "most_common_sentiment": highest_sentiment or "N/A",
+        "approximate": {
+            **approximation_info(percent),
+            "total_feedback_error": sources['total']['error'],
+            "top_source_error": top_source[1]['error'] if top_source else 0,
+        },
+    }
+
+
+class ReviewStatsView(RollupMixin, generics.RetrieveAPIView, TimeRangeMixin):
     permission_classes = [IsAuthenticated]
 
+    @cached_dashboard_response('review-stats')
     def get(self, request, *args, **kwargs):
-        self.kwargs = request.query_params
-        time_constraints = self.get_time_constraints()
-
-        total_feedback = Review.objects.filter(**time_constraints).count()
-
-        top_source = (Review.objects.filter(**time_constraints)
-                     .values('source')
-                     .annotate(count=Count('id'))
-                     .order_by('-count')
-                     .first())
-
-        sentiment_counts = (Review.objects.filter(**time_constraints)
-                          .values('sentiment')
-                          .annotate(count=Count('id')))
-
-        sentiment_stats = {s['sentiment']: s['count'] for s in sentiment_counts}
-        highest_sentiment = max(sentiment_stats, key=sentiment_stats.get) if sentiment_stats else None
-
-        response_data = {
-            "total_feedback": total_feedback,
-            "top_source": f"{top_source['source']} ({top_source['count']})" if top_source else "N/A",
-            "most_common_sentiment": highest_sentiment or "N/A",
-        }
+        window = self.get_time_window()
+        rollups = self.get_rollups().filter(**window.rollup_filter())
+
+        percent = sample_percent(request, rollups)
+        if percent is not None:
+            user_data_ids = self.get_user_data_ids()
+            return Response(approximate_review_stats(
+                sampled_counts(user_data_ids, window, 'source', percent),
+                sampled_counts(user_data_ids, window, 'sentiment', percent),
+                percent,
+            ))
+
+        results = [query() for query in review_stats_queries(rollups)]
+        return Response(review_stats_payload(*results))
+
+
+class DashboardSummaryView(RollupMixin, generics.RetrieveAPIView, TimeRangeMixin):
+    """
+    Every dashboard home widget in one payload. The review, source and
+    sentiment widgets come from a single grouped query; the category widgets
+    and trending topics use the same helpers as their own endpoints.
+    """
+    permission_classes = [IsAuthenticated]
 
-        return Response(response_data)
+    @cached_dashboard_response('dashboard-summary')
+    def get(self, request, time_range, *args, **kwargs):
+        window = self.get_time_window()
+        summary = build_dashboard_summary(self.get_rollups(), window.start, window.end, today=today())
+        matrix = category_matrix(request.user.pk, self.get_user_data_ids(), window)
+        summary.update({
+            "trending_topics": trending_topics(self.get_rollups(), trend_window_days(time_range)),
+            "product_feedback_categories": product_feedback_categories(matrix),
+            "top_feedback_topics": top_feedback_topics(matrix),
+        })
+        return Response(summary)
 
 
-class LastSixMonthsStatsView(generics.RetrieveAPIView):
+class LastSixMonthsStatsView(TimeSeriesMixin, generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
 
+    @cached_dashboard_response('last-6-months')
     def get(self, request, time, *args, **kwargs):  # Changed to get and added time parameter
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=6 * 31)  # Roughly 6 months
-
-        # Filter reviews for the last 6 months
-        last_six_months_reviews = Review.objects.filter(date__gte=start_date, date__lte=end_date)
-
-        # Aggregate data by month
-        month_sentiment_counts = last_six_months_reviews.annotate(
-            year=ExtractYear('date'),
-            month=ExtractMonth('date')
-        ).values('year', 'month', 'sentiment').annotate(count=Count('id')).order_by('year', 'month')
-
-        # Organize data into a dictionary by year, month, and sentiment
-        months_data = {}
-        for item in month_sentiment_counts:
-            year = item['year']
-            month = item['month']
-            sentiment = item['sentiment'] # Convert to lowercase to match frontend
-            count = item['count']
-
-            key = f"{year}-{month:02d}"  # Format as YYYY-MM for consistency
-            if key not in months_data:
-                months_data[key] = {'positive': 0, 'negative': 0, 'neutral': 0}
-
-            months_data[key][sentiment] = count
-
-        # Convert to list with month names
-        response_data = []
-        month_names = [
-            "Jan", "Feb", "Mar", "Apr", "May", "Jun",
-            "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"
-        ]
-
-        # Get the last 6 months worth of data
-        current_date = end_date
-        for i in range(6):
-            year = current_date.year
-            month = current_date.month
-            key = f"{year}-{month:02d}"
-            month_name = month_names[month - 1]
-
-            data = months_data.get(key, {'positive': 0, 'negative': 0, 'neutral': 0})
-            response_data.insert(0, {  # Insert at beginning to get chronological order
-                'month': month_name,
-                'positive': data['positive'],
-                'negative': data['negative'],
-                'neutral': data['neutral'],
-            })
-            # Move to previous month
-            current_date = current_date.replace(day=1) - timedelta(days=1)
-
-        return Response(response_data)
+        return Response(self.get_series('sentiment', SENTIMENT_SERIES))
 
 
-class TrendingTopicsView(generics.RetrieveAPIView):
+class TrendingTopicsView(RollupMixin, generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
 
-    def retrieve(self, request, *args, **kwargs):
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=30)  # Last 30 days
-
-        # Fetch data for trending topics and their sentiments
-        topics_data = (Review.objects.filter(date__gte=start_date, date__lte=end_date)
-                       .values('category')
-                       .annotate(
-            mentions=Count('id'),
-            negative_sentiment=Count('id', filter=Q(sentiment='negative')),
-            positive_sentiment=Count('id', filter=Q(sentiment='positive')),
-            neutral_sentiment=Count('id', filter=Q(sentiment='neutral'))
-        )
-                       .order_by('-mentions')[:5])
-
-        # Fetch data for trend direction
-        trends = Review.objects.filter(date__gte=start_date - timedelta(days=60), date__lte=end_date)
-
-        # Calculate trend direction for each topic
-        trend_data = {}
-        for topic in topics_data:
-            last_month_mentions = trends.filter(category=topic['category'], date__gte=start_date - timedelta(days=30),
-                                                date__lte=start_date).count()
-            this_month_mentions = topic['mentions']
-
-            if topic['mentions'] > last_month_mentions + 5:  # Arbitrary threshold for 'up' trend
-                trend_direction = "↑ Trending up"
-            elif topic['mentions'] < last_month_mentions - 5:
-                trend_direction = "↓ Trending down"
-            else:
-                trend_direction = "→ Stable"
-
-            topic['trend_direction'] = trend_direction
-
-            high_sentiment = max('negative_sentiment', 'positive_sentiment', key=topic.get)
-            topic['sentiment'] = high_sentiment.split('_')[0]
-
-            topic['last_30_days_mentions'] = topic['mentions']
-            del topic['mentions'], topic['negative_sentiment'], topic['positive_sentiment'], topic['neutral_sentiment']
+    def get_window_days(self):
+        window_days = self.request.query_params.get('window_days')
+        if window_days:
+            try:
+                return max(1, int(window_days))
+            except ValueError:
+                pass
+        return trend_window_days(self.kwargs.get('time'))
 
-        return Response(topics_data)
+    @cached_dashboard_response('trending-topics')
+    def retrieve(self, request, *args, **kwargs):
+        return Response(trending_topics(self.get_rollups(), self.get_window_days()))
 
 
-class RecentFeedbackView(generics.ListAPIView):
+class RecentFeedbackView(RollupMixin, ReviewRowsMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated]
-    serializer_class = ReviewSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = RecentFeedbackPagination  # 15 newest first, then keyset pages further back
 
     def get_queryset(self):
-        return Review.objects.filter().order_by('-date')[:15]  # Fetch the last 15 reviews
+        return self.select_rows(self.get_reviews())
 
+    @conditional_on_data_version('recent-feedback')
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        page = self.paginate_queryset(queryset)
-
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return super().list(request, *args, **kwargs)
 
 
-class FeedbackSourcesView(generics.RetrieveAPIView):
+class FeedbackSourcesView(TimeSeriesMixin, generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
 
+    @cached_dashboard_response('feedback-sources')
     def get(self, request, time, *args, **kwargs):
-        end_date = datetime.now()
-
-        # Determine time range based on the 'time' parameter
-        if time == '7D':
-            start_date = end_date - timedelta(days=7)
-        elif time == '14D':
-            start_date = end_date - timedelta(days=14)
-        elif time == '4W':
-            start_date = end_date - timedelta(weeks=4)
-        elif time == '3M':
-            start_date = end_date - timedelta(days=3 * 30)
-        elif time == '6M':
-            start_date = end_date - timedelta(days=6 * 30)
-        elif time == '12M':
-            start_date = end_date - timedelta(days=365)
-        else:  # ALL or custom
-            start_date = datetime.min
+        window = resolve_time_window(time, request.query_params)
 
         # Fetch total counts by source
-        source_counts = (Review.objects.filter(date__gte=start_date, date__lte=end_date)
+        source_counts = (self.get_rollups()
+                         .filter(**window.rollup_filter())
                          .values('source')
-                         .annotate(count=Count('id'))
+                         .annotate(count=Sum('review_count'))
                          .order_by('-count'))
 
-        # Fetch data over time (last 6 months for detailed view)
-        six_months_ago = end_date - timedelta(days=6 * 30)
-        sources_over_time = (Review.objects.filter(date__gte=six_months_ago, date__lte=end_date)
-                             .annotate(
-            year=ExtractYear('date'),
-            month=ExtractMonth('date')
-        )
-                             .values('year', 'month', 'source')
-                             .annotate(count=Count('id'))
-                             .order_by('year', 'month'))
-
-        # Organize sources over time data
-        months_data = {}
-        month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-        for item in sources_over_time:
-            key = f"{month_names[item['month'] - 1]} {item['year']}"
-            if key not in months_data:
-                months_data[key] = {}
-            months_data[key][item['source']] = item['count']
-
-        # Format over-time data for the last 6 months
-        over_time_data = []
-        current_date = end_date
-        for _ in range(6):
-            month_name = month_names[current_date.month - 1]
-            key = f"{month_name} {current_date.year}"
-            month_data = months_data.get(key, {})
-            over_time_data.insert(0, {
-                'month': month_name,
-                'Playstore': month_data.get('Playstore', 0),
-                'Reddit': month_data.get('Reddit', 0),
-                'X': month_data.get('X', 0),
-                'AppStore': month_data.get('AppStore', 0),
-                'Trust Pilot': month_data.get('Trust Pilot', 0),
-            })
-            current_date = current_date.replace(day=1) - timedelta(days=1)
-
         # Format response
         response_data = {
             'sources': [{'source': item['source'], 'count': item['count']} for item in source_counts],
-            'sources_over_time': over_time_data
+            'sources_over_time': self.get_series('source', CHART_SOURCES),
         }
 
         return Response(response_data)
 
-class SentimentDistributionView(generics.RetrieveAPIView):
+class SentimentDistributionView(RollupMixin, generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
 
+    @cached_dashboard_response('sentiment-distribution')
     def retrieve(self, request, *args, **kwargs):
-        total_reviews = Review.objects.count()
-        sentiments = Review.objects.values('sentiment').annotate(count=Count('id'))
+        window = resolve_time_window('ALL', {})
+        percent = sample_percent(request, self.get_rollups())
+        if percent is not None:
+            sampled = sampled_counts(self.get_user_data_ids(), window, 'sentiment', percent)['groups']
+            empty = {'share': 0, 'share_error': 0}
+            return Response({
+                "overall_distribution": {s: sampled.get(s, empty)['share'] for s in SENTIMENT_SERIES},
+                "approximate": {
+                    **approximation_info(percent),
+                    "error": {s: sampled.get(s, empty)['share_error'] for s in SENTIMENT_SERIES},
+                },
+            })
+
+        sentiments = self.get_rollups().values('sentiment').annotate(count=Sum('review_count'))
 
         sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0}
+        total_reviews = 0
         for item in sentiments:
+            total_reviews += item['count']
             sentiment_counts[item['sentiment']] = item['count']
+        total_reviews = total_reviews or 1  # avoid division by zero for a tenant without reviews
 
         response_data = {
             "overall_distribution": {
@@ -295,49 +373,27 @@ class SentimentDistributionView(generics.RetrieveAPIView):
 
         return Response(response_data)
 
-class SentimentTrendsView(generics.RetrieveAPIView):
+class SentimentTrendsView(TimeSeriesMixin, generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
 
+    @cached_dashboard_response('sentiment-trends')
     def retrieve(self, request, *args, **kwargs):
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=6 * 31)  # More accurate for 6 months
-
-        monthly_sentiments = (Review.objects
-                              .filter(date__gte=start_date, date__lte=end_date)
-                              .annotate(month=TruncMonth('date'))
-                              .values('month', 'sentiment')
-                              .annotate(count=Count('id'))
-                              .order_by('month'))
-
-        data = {}
-        for month_item in monthly_sentiments:
-            month = month_item['month'].strftime('%b')
-            if month not in data:
-                data[month] = {'positive': 0, 'negative': 0, 'neutral': 0}
-            data[month][month_item['sentiment']] = month_item['count']
-
-        response_data = {
-            "trends": [
-                {"month": month, "positive": item['positive'], "negative": item['negative'], "neutral": item['neutral']}
-                for month, item in data.items()
-            ]
-        }
+        return Response({"trends": self.get_series('sentiment', SENTIMENT_SERIES)})
 
-        return Response(response_data)
 
-
-class SentimentBySourceView(generics.RetrieveAPIView):
+class SentimentBySourceView(RollupMixin, generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
 
+    @cached_dashboard_response('sentiments-by-source')
     def retrieve(self, request, *args, **kwargs):
         predefined_sources = ['googleplay', 'reddit', 'twitter', 'appstore', 'trustpilot']
 
         # Aggregate counts per source with sentiment breakdown
-        aggregated = Review.objects.filter(source__in=predefined_sources).values('source').annotate(
-            positive_count=Count(Case(When(sentiment='positive', then=1))),
-            negative_count=Count(Case(When(sentiment='negative', then=1))),
-            neutral_count=Count(Case(When(sentiment='neutral', then=1))),
-            total=Count('id')
+        aggregated = self.get_rollups().filter(source__in=predefined_sources).values('source').annotate(
+            positive_count=Sum('review_count', filter=Q(sentiment='positive'), default=0),
+            negative_count=Sum('review_count', filter=Q(sentiment='negative'), default=0),
+            neutral_count=Sum('review_count', filter=Q(sentiment='neutral'), default=0),
+            total=Sum('review_count')
         )
 
         # Build the response data
@@ -359,429 +415,216 @@ class SentimentBySourceView(generics.RetrieveAPIView):
         return Response(response_data)
 
 
-class ProductFeedbackCategoriesView(generics.RetrieveAPIView):
-    permission_classes = [IsAuthenticated]
+class CategoryMatrixMixin(RollupMixin):
+    """The category widgets read the shared, cached category x sentiment matrix."""
 
-    def retrieve(self, request, *args, **kwargs):
-        categories = Review.objects.values('category').annotate(
-            positive=Count('id', filter=Q(sentiment='positive')),
-            negative=Count('id', filter=Q(sentiment='negative'))
-        )
+    def get_category_matrix(self):
+        return category_matrix(self.request.user.pk, self.get_user_data_ids(), self.get_time_window())
 
-        response_data = [
-            {"category": item['category'], "positive": item['positive'], "negative": item['negative']}
-            for item in categories
-        ]
 
-        return Response(response_data)
+def category_cell(item):
+    return {
+        "positive": item['positive'],
+        "negative": item['negative'],
+        "neutral": item['neutral'],
+        "total": item['total'],
+        "share": item['share'],
+        "dominant_sentiment": item['dominant_sentiment'],
+        "average_rating": item['average_rating'],
+    }
+
 
-class TopFeedbackTopicsView(generics.RetrieveAPIView):
+def product_feedback_categories(matrix):
+    return [{"category": item['category'], **category_cell(item)} for item in matrix]
+
+
+def top_feedback_topics(matrix):
+    # One row per category ranked by volume, labelled with its dominant sentiment
+    return [
+        {"name": item['category'], "count": item['total'], "sentiment": item['dominant_sentiment'],
+         "share": item['share'], "average_rating": item['average_rating']}
+        for item in matrix[:TOP_TOPICS]
+    ]
+
+
+class ProductFeedbackCategoriesView(CategoryMatrixMixin, generics.RetrieveAPIView, TimeRangeMixin):
     permission_classes = [IsAuthenticated]
 
+    @cached_dashboard_response('product-feedback-categories')
     def retrieve(self, request, *args, **kwargs):
-        topics = Review.objects.values('category').annotate(
-            count=Count('id'),
-            sentiment=F('sentiment')
-        ).order_by('-count')[:12]
+        return Response(product_feedback_categories(self.get_category_matrix()))
 
-        response_data = [
-            {"name": item['category'], "count": item['count'], "sentiment": item['sentiment']}
-            for item in topics
-        ]
+class TopFeedbackTopicsView(CategoryMatrixMixin, generics.RetrieveAPIView, TimeRangeMixin):
+    permission_classes = [IsAuthenticated]
 
-        return Response(response_data)
+    @cached_dashboard_response('top-feedback-topics')
+    def retrieve(self, request, *args, **kwargs):
+        return Response(top_feedback_topics(self.get_category_matrix()))
 
-class FeatureSpecificFeedbackView(generics.RetrieveAPIView):
+class FeatureSpecificFeedbackView(CategoryMatrixMixin, generics.RetrieveAPIView, TimeRangeMixin):
     permission_classes = [IsAuthenticated]
 
+    @cached_dashboard_response('feature-specific-feedback')
     def retrieve(self, request, *args, **kwargs):
-        features = Review.objects.values('category').annotate(
-            positive=Count('id', filter=Q(sentiment='positive')),
-            negative=Count('id', filter=Q(sentiment='negative'))
-        )
-
         response_data = [
-            {"name": item['category'], "positive": item['positive'], "negative": item['negative']}
-            for item in features
+            {"name": item['category'], **category_cell(item)}
+            for item in self.get_category_matrix()
         ]
 
         return Response(response_data)
 
-class FeedbackSourcesDetailedView(generics.RetrieveAPIView):
+class FeedbackSourcesDetailedView(TimeSeriesMixin, generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
 
+    @cached_dashboard_response('feedback-sources-detailed')
     def get(self, request, *args, **kwargs):
-        end_date = datetime.now()
-
         # Fetch total counts by source
-        source_counts = (Review.objects.filter(date__lte=end_date)
+        source_counts = (self.get_rollups()
+                         .filter(day__lte=today())
                          .values('source')
-                         .annotate(count=Count('id'))
+                         .annotate(count=Sum('review_count'))
                          .order_by('-count'))
 
-        # Fetch data over time (last 6 months for detailed view)
-        six_months_ago = end_date - timedelta(days=6 * 30)
-        sources_over_time = (Review.objects.filter(date__gte=six_months_ago, date__lte=end_date)
-                             .annotate(
-            year=ExtractYear('date'),
-            month=ExtractMonth('date')
-        )
-                             .values('year', 'month', 'source')
-                             .annotate(count=Count('id'))
-                             .order_by('year', 'month'))
-
-        # Organize sources over time data
-        months_data = {}
-        month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-        for item in sources_over_time:
-            key = f"{month_names[item['month'] - 1]} {item['year']}"
-            if key not in months_data:
-                months_data[key] = {}
-            months_data[key][item['source']] = item['count']
-
-        # Format over-time data for the last 6 months
-        over_time_data = []
-        current_date = end_date
-        for _ in range(6):
-            month_name = month_names[current_date.month - 1]
-            key = f"{month_name} {current_date.year}"
-            month_data = months_data.get(key, {})
-            over_time_data.insert(0, {
-                'month': month_name,
-                'Playstore': month_data.get('Playstore', 0),
-                'Reddit': month_data.get('Reddit', 0),
-                'X': month_data.get('X', 0),
-                'AppStore': month_data.get('AppStore', 0),
-                'Trust Pilot': month_data.get('Trust Pilot', 0),
-            })
-            current_date = current_date.replace(day=1) - timedelta(days=1)
-
         # Format response
         response_data = {
             'sources': [{'source': item['source'], 'count': item['count']} for item in source_counts],
-            'sources_over_time': over_time_data
+            'sources_over_time': self.get_series('source', CHART_SOURCES),
         }
 
         return Response(response_data)
 
-class FeedbackPagination(PageNumberPagination):
-    page_size = 100  # Number of reviews per page
-    page_size_query_param = 'page_size'
-    max_page_size = 1000
-
-class FeedbackDetailsView(generics.ListAPIView):
+class FeedbackDetailsView(RollupMixin, ReviewRowsMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated]
-    serializer_class = ReviewSerializer
     pagination_class = FeedbackPagination
 
-    def get_queryset(self):
-        user = self.request.user
-        queryset = Review.objects.filter(user_data__user=user)
+    @property
+    def extra_fields(self):
+        if not self.request.query_params.get('search'):
+            return ()
+        return FUZZY_FIELDS if self.request.query_params.get('match') == 'fuzzy' else SEARCH_FIELDS
+
+    def get_search_queryset(self):
+        """The tenant's reviews narrowed by ?search=, before the source/sentiment/category filters."""
+        queryset = self.get_reviews()
+        self.keyset_ordering = None
 
-        # Apply filters
         search = self.request.query_params.get('search', '')
-        source = self.request.query_params.get('source', '')
-        sentiment = self.request.query_params.get('sentiment', '')
-        category = self.request.query_params.get('category', '')
-        print(f"Filters: search={search}, source={source}, sentiment={sentiment}, category={category}")
+        if search and self.request.query_params.get('match') == 'fuzzy':
+            # Typo-tolerant username/title lookup on the trigram indexes, closest first
+            queryset = fuzzy_search_reviews(queryset, search)
+            self.keyset_ordering = ('similarity', 'id')
+        elif search:
+            # Full-text match on the GIN-indexed search_vector, best matches first
+            queryset = search_reviews(queryset, search, self.request.query_params.get('lang'))
+            self.keyset_ordering = ('rank', 'id')
+        return queryset
+
+    def get_queryset(self):
+        # Only filters other than "all" apply
+        queryset = self.get_search_queryset().filter(**active_filters(self.request.query_params))
 
-        if search:
-            queryset = queryset.filter(Q(review__icontains=search) | Q(title__icontains=search))
+        # KeysetPagination orders by (date, id), or (rank, id) for searches; see dashboard/pagination.py
+        return self.select_rows(queryset)
 
-        # Only apply filters if not "all"
-        if source and source != "all":
-            queryset = queryset.filter(source=source)
-        if sentiment and sentiment != "all":
-            queryset = queryset.filter(sentiment=sentiment)
-        if category and category != "all":
-            queryset = queryset.filter(category=category)
+    @conditional_on_data_version('feedback-detail')
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get('facets') in ('1', 'true') and isinstance(response.data, dict):
+            # Counts for every filter value under the other active filters, in one query
+            response.data['facets'] = facet_counts(self.get_search_queryset(), active_filters(request.query_params))
+        return response
+
+
+class ExportReviewsView(RollupMixin, APIView):
+    """
+    Stream the tenant's reviews as CSV or NDJSON, or send a Parquet snapshot.
+
+    Accepts the feedback explorer's source/sentiment/category filters,
+    ?time_range= or ?start=/?end=, and ?since=<ISO timestamp> for reviews
+    created after a previous export; memory use does not grow with the tenant.
+    """
+    permission_classes = [IsAuthenticated]
 
-        return queryset.order_by('-date')
+    def get(self, request, export_format, *args, **kwargs):
+        if export_format not in EXPORT_WRITERS and export_format != 'parquet':
+            raise ValidationError({'format': f"Expected one of {', '.join([*EXPORT_WRITERS, 'parquet'])}."})
+        window = resolve_time_window(request.query_params.get('time_range', 'ALL'), request.query_params)
+        queryset = self.get_reviews().filter(**window.review_filter(), **active_filters(request.query_params))
+        since = None
+        if request.query_params.get('since'):
+            since = parse_datetime(request.query_params['since'])
+            if since is None:
+                raise ValidationError({'since': "Expected an ISO timestamp."})
+            queryset = queryset.filter(created_at__gt=since)
+
+        if export_format == 'parquet':
+            return self.parquet_response(queryset)
+
+        response = StreamingHttpResponse(EXPORT_WRITERS[export_format](queryset),
+                                         content_type=EXPORT_CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = f'attachment; filename="reviews-{today().isoformat()}.{export_format}"'
+        return response
+
+    def parquet_response(self, queryset):
+        if not PARQUET_AVAILABLE:
+            return Response({"error": "Parquet export is not available on this server."},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        # Parquet's footer is written last, so the file is spooled to disk and then sent
+        snapshot = tempfile.TemporaryFile()
+        write_parquet(queryset, snapshot)
+        snapshot.seek(0)
+        return FileResponse(snapshot, as_attachment=True, filename=f"reviews-{today().isoformat()}.parquet",
+                            content_type='application/vnd.apache.parquet')
 
 
 class GenerateReportView(APIView):
-    def _get_date_filter(self, time_filter, date_range=None):
-        """
-        Convert time filter to a dictionary suitable for database filtering
-        """
-        from django.utils import timezone
-        import datetime
-        
-        today = timezone.now()
-        date_filter = {'date__isnull': False}
-        
-        if time_filter == 'daily':
-            today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            date_filter = {'date__gte': today_start}
-        elif time_filter == 'weekly':
-            week_ago = today - datetime.timedelta(days=7)
-            date_filter = {'date__gte': week_ago}
-        elif time_filter == 'monthly':
-            month_ago = today - datetime.timedelta(days=30)
-            date_filter = {'date__gte': month_ago}
-        elif time_filter == 'quarterly':
-            quarter_ago = today - datetime.timedelta(days=90)
-            date_filter = {'date__gte': quarter_ago}
-        elif time_filter == 'custom' and date_range:
-            from_date = date_range.get('from')
-            to_date = date_range.get('to')
-            if from_date:
-                try:
-                    from_datetime = datetime.datetime.fromisoformat(from_date.replace('Z', '+00:00'))
-                    date_filter['date__gte'] = from_datetime
-                except (ValueError, TypeError):
-                    pass  
-            if to_date:
-                try:
-                    to_datetime = datetime.datetime.fromisoformat(to_date.replace('Z', '+00:00'))
-                    to_datetime = to_datetime.replace(hour=23, minute=59, second=59)
-                    date_filter['date__lte'] = to_datetime
-                except (ValueError, TypeError):
-                    pass
-        return date_filter
+    """
+    Send the tenant's report in the requested `format` (pdf, csv, xlsx or
+    html). A copy stored for the current data version is sent as is; CSV
+    and HTML are otherwise streamed while they are produced, and PDF and
+    XLSX are rendered in the request thread and stored.
+
+    Kept for existing clients; large reports should go through ReportJobsView,
+    which builds them on a Celery worker.
+    """
+    permission_classes = [IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
+        params = normalize_report_params(request.data)
+        if params['format'] == 'xlsx' and not XLSX_AVAILABLE:
+            return Response({"error": "XLSX reports are not available on this server."},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
         try:
-            # Extract parameters
-            report_type = request.data.get('reportType', 'comprehensive')
-            time_filter = request.data.get('timeFilter', 'default')
-            date_range = request.data.get('dateRange', {})
-            format_type = request.data.get('format', 'pdf')
-            sections = request.data.get('sections', [])
-            
-            # Create a file-like buffer to receive PDF data
-            buffer = io.BytesIO()
-            
-            # Create the PDF object using the buffer as its "file"
-            doc = SimpleDocTemplate(buffer, pagesize=letter)
-            styles = getSampleStyleSheet()
-            story = []
-            
-            # Add title
-            title_style = styles['Heading1']
-            title = f"{report_type.title()} Report"
-            story.append(Paragraph(title, title_style))
-            story.append(Spacer(1, 12))
-            
-            # Add date range - Use formatted dates if available, otherwise use ISO dates
-            date_from = date_range.get('fromFormatted', date_range.get('from', ''))
-            date_to = date_range.get('toFormatted', date_range.get('to', ''))
-            
-            if date_from and date_to:
-                date_text = f"Date Range: {date_from} to {date_to}"
-                story.append(Paragraph(date_text, styles['Normal']))
-                story.append(Spacer(1, 12))
-            
-            # Ensure sections is a list
-            if isinstance(sections, str):
-                sections = [sections]
-                
             # Log sections for debugging
-            print(f"Processing report with sections: {sections}")
-                
-            # Add sections based on selection with date_range
-            if 'executive_summary' in sections:
-                self._add_executive_summary(story, styles, time_filter, date_range=None)
-            
-            if 'sentiment_analysis' in sections:
-                self._add_sentiment_analysis(story, styles, time_filter, date_range=None)
-            
-            if 'feedback_sources' in sections:
-                self._add_feedback_sources(story, styles, time_filter, date_range=None)
-            
-            if 'product_feedback' in sections:
-                self._add_product_feedback(story, styles, time_filter, date_range=None)
-            
-            if 'detailed_feedback' in sections:
-                self._add_detailed_feedback(story, styles, time_filter, date_range=None)
-            
-            # Build the PDF
-            doc.build(story)
-            buffer.seek(0)
-            
-            # Return the PDF file
-            return FileResponse(
-                buffer, 
-                as_attachment=True,
-                filename=f"{report_type}_report_{datetime.now().strftime('%Y-%m-%d')}.pdf"
-            )
-            
+            print(f"Processing report with sections: {params['sections']}")
+
+            filename = report_filename(params, datetime.now())
+            content_type = REPORT_CONTENT_TYPES[params['format']]
+            name = find_stored_report(request.user.pk, params)
+            if name is None and params['format'] in REPORT_STREAMS:
+                data = ReportDataset(tenant_reviews(request.user.pk), params)
+                response = StreamingHttpResponse(REPORT_STREAMS[params['format']](params, data),
+                                                 content_type=content_type)
+                response['Content-Disposition'] = f'attachment; filename="{filename}"'
+                response['X-Cache'] = 'miss'
+                return response
+
+            cache_status = 'hit' if name else 'miss'
+            if name is None:
+                name = render_stored_report(request.user.pk, params)
+
+            # Return the report file
+            response = FileResponse(default_storage.open(name), as_attachment=True, filename=filename,
+                                    content_type=content_type)
+            response['X-Cache'] = cache_status
+            return response
+
         except Exception as e:
             print(f"Error generating report: {str(e)}")
             return Response(
                 {"error": str(e)}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
-    
-    def _add_executive_summary(self, story, styles, time_filter, date_range=None):
-        from django.db.models import Avg, Count
-        from reviews.models import Review
-        
-        # Get date filter based on time_filter
-        date_filter = self._get_date_filter(time_filter, date_range)
-        
-        # Apply date filter to all queries
-        total_reviews = Review.objects.filter(**date_filter).count()
-        
-        # For sentiment analysis with date filtering
-        sentiments = Review.objects.filter(**date_filter).values('sentiment').annotate(count=Count('id'))
-        
-        # Calculate positive percentage with null handling
-        sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0, 'unknown': 0}
-        for item in sentiments:
-            # Handle None values
-            sentiment_key = item['sentiment'] if item['sentiment'] is not None else 'unknown'
-            sentiment_counts[sentiment_key] = item.get('count', 0)
-        
-        # Calculate percentages safely
-        positive_percentage = 0
-        negative_percentage = 0
-        neutral_percentage = 0
-        unknown_percentage = 0
-        
-        if total_reviews > 0:
-            positive_percentage = round((sentiment_counts['positive'] / total_reviews) * 100, 2)
-            negative_percentage = round((sentiment_counts['negative'] / total_reviews) * 100, 2)
-            neutral_percentage = round((sentiment_counts['neutral'] / total_reviews) * 100, 2)
-            unknown_percentage = round((sentiment_counts['unknown'] / total_reviews) * 100, 2)
-        
-        # Add title
-        story.append(Paragraph("Executive Summary", styles['Heading2']))
-        story.append(Spacer(1, 12))
-        
-        # Add statistics as paragraphs
-        story.append(Paragraph(f"Total Feedback: {total_reviews}", styles['Normal']))
-        story.append(Paragraph(f"Positive Sentiment: {positive_percentage}%", styles['Normal']))
-        story.append(Paragraph(f"Negative Sentiment: {negative_percentage}%", styles['Normal']))
-        story.append(Paragraph(f"Neutral Sentiment: {neutral_percentage}%", styles['Normal']))
-        if unknown_percentage > 0:
-            story.append(Paragraph(f"Unknown Sentiment: {unknown_percentage}%", styles['Normal']))
-        story.append(Spacer(1, 12))
-    
-    def _add_sentiment_analysis(self, story, styles, time_filter, date_range=None):
-        from django.db.models import Count
-        from reviews.models import Review
-        
-        # Get date filter and apply to all queries
-        date_filter = self._get_date_filter(time_filter, date_range)
-        
-        total_reviews = Review.objects.filter(**date_filter).count()
-        sentiments = Review.objects.filter(**date_filter).values('sentiment').annotate(count=Count('id'))
-        
-        sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0, 'unknown': 0}
-        for item in sentiments:
-            # Handle None values
-            sentiment_key = item['sentiment'] if item['sentiment'] is not None else 'unknown'
-            sentiment_counts[sentiment_key] = item.get('count', 0)
-            
-        # Add title and content
-        story.append(Paragraph("Sentiment Analysis", styles['Heading2']))
-        story.append(Spacer(1, 12))
-        
-        # Create a table for sentiment distribution
-        data = [["Sentiment", "Count", "Percentage"]]
-        for sentiment, count in sentiment_counts.items():
-            percentage = round((count / total_reviews) * 100, 2) if total_reviews > 0 else 0
-            # Safe capitalize with null check
-            sentiment_display = sentiment.capitalize() if sentiment else "Unknown"
-            data.append([sentiment_display, str(count), f"{percentage}%"])
-        
-        # Add table
-        table = Table(data, colWidths=[150, 100, 100])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(table)
-        story.append(Spacer(1, 12))
-    
-    def _add_feedback_sources(self, story, styles, time_filter, date_range=None):
-        from django.db.models import Count
-        from reviews.models import Review
-        
-        # Get date filter and apply to all queries
-        date_filter = self._get_date_filter(time_filter, date_range)
-        
-        # Add title
-        story.append(Paragraph("Feedback Sources", styles['Heading2']))
-        story.append(Spacer(1, 12))
-        
-        # Fetch sources with null handling
-        sources = Review.objects.filter(**date_filter).values('source').annotate(count=Count('id'))
-        
-        # Add information about sources with null checks
-        if not sources:
-            story.append(Paragraph("No source data available", styles['Normal']))
-        else:
-            for source in sources:
-                source_name = source['source'] if source['source'] else "Unknown source"
-                story.append(Paragraph(f"{source_name}: {source['count']} reviews", styles['Normal']))
-        
-        story.append(Spacer(1, 12))
-    
-    def _add_product_feedback(self, story, styles, time_filter, date_range=None):
-        from django.db.models import Count
-        from reviews.models import Review
-        
-        # Get date filter and apply to all queries
-        date_filter = self._get_date_filter(time_filter, date_range)
-        
-        # Add title
-        story.append(Paragraph("Product Feedback", styles['Heading2']))
-        story.append(Spacer(1, 12))
-        
-        # Get top product categories
-        categories = Review.objects.filter(**date_filter).values('category').annotate(count=Count('id')).order_by('-count')[:5]
-        
-        # Add product category information with null checks
-        story.append(Paragraph("Top Product Categories:", styles['Heading3']))
-        if not categories:
-            story.append(Paragraph("No category data available", styles['Normal']))
-        else:
-            for cat in categories:
-                category_name = cat['category'] if cat['category'] else "Uncategorized"
-                story.append(Paragraph(f"{category_name}: {cat['count']} mentions", styles['Normal']))
-        
-        story.append(Spacer(1, 12))
-    
-    def _add_detailed_feedback(self, story, styles, time_filter, date_range=None):
-        from reviews.models import Review
-        
-        # Get date filter and apply to all queries
-        date_filter = self._get_date_filter(time_filter, date_range)
-        
-        # Add title
-        story.append(Paragraph("Detailed Feedback", styles['Heading2']))
-        story.append(Spacer(1, 12))
-        
-        # Get recent reviews with detailed comments
-        reviews = Review.objects.filter(**date_filter).order_by('-date')[:10]
-        
-        # Add detailed reviews with null checks
-        for idx, review in enumerate(reviews, 1):
-            story.append(Paragraph(f"Review #{idx}", styles['Heading3']))
-            
-            # Safe display with null checks
-            sentiment = review.sentiment.capitalize() if review.sentiment else "Unknown"
-            category = review.category if review.category else "Uncategorized"
-            source = review.source if review.source else "Unknown source"
-            
-            story.append(Paragraph(f"Sentiment: {sentiment}", styles['Normal']))
-            story.append(Paragraph(f"Category: {category}", styles['Normal']))
-            story.append(Paragraph(f"Source: {source}", styles['Normal']))
-            
-            # Only include text if it exists (could be in review or comments field)
-            if hasattr(review, 'review') and review.review:
-                story.append(Paragraph(f"Feedback: {review.review}", styles['Normal']))
-            elif hasattr(review, 'comments') and review.comments:
-                story.append(Paragraph(f"Feedback: {review.comments}", styles['Normal']))
-                
-            story.append(Spacer(1, 12))
 
     # def _get_date_filter(self, time_filter):
     #     from datetime import datetime, timedelta
@@ -810,93 +653,180 @@ class GenerateReportView(APIView):
     #         return Q()
 
 
-class TrendAnalysisView(APIView):
-    # For testing, we can comment out the authentication requirement
-    # permission_classes = [IsAuthenticated]
-    
+def expire_stale_report_jobs(user, digest):
+    """Fail active jobs whose worker never finished them, so they stop blocking identical requests."""
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'REPORT_JOB_TIMEOUT', 30 * 60))
+    ReportJob.objects.filter(
+        user=user, params_digest=digest, status__in=ReportJob.ACTIVE_STATUSES, created_at__lt=cutoff,
+    ).update(status=ReportJob.FAILED, error="Timed out", finished_at=timezone.now())
+
+
+class ReportJobsView(APIView):
+    """
+    Queue a report (same body as GenerateReportView) for a Celery worker.
+
+    Answers 202 with the job and a status URL to poll. Asking for a report
+    that is already pending or running returns that job instead of queueing
+    the same work again, and one already stored for the tenant's current
+    data version comes back as a finished job with 200.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        jobs = ReportJob.objects.filter(user=request.user)[:20]
+        return Response(ReportJobSerializer(jobs, many=True, context={'request': request}).data)
+
+    def post(self, request, *args, **kwargs):
+        params = normalize_report_params(request.data)
+        if params['format'] == 'xlsx' and not XLSX_AVAILABLE:
+            return Response({"error": "XLSX reports are not available on this server."},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        digest = report_params_digest(params)
+        expire_stale_report_jobs(request.user, digest)
+
+        name = find_stored_report(request.user.pk, params)
+        if name is not None:
+            # Already rendered at this data version: the job is done before it starts
+            now = timezone.now()
+            job = ReportJob.objects.create(
+                user=request.user, params=params, params_digest=digest, status=ReportJob.DONE, progress=100,
+                current_step='stored', file=name, started_at=now, finished_at=now,
+            )
+            return Response(ReportJobSerializer(job, context={'request': request}).data, status=status.HTTP_200_OK)
+
+        job = None
+        while job is None:
+            try:
+                with transaction.atomic():
+                    job = ReportJob.objects.create(user=request.user, params=params, params_digest=digest)
+                transaction.on_commit(lambda: generate_report_job.delay(str(job.pk)))
+            except IntegrityError:
+                # An identical job is already queued; it may finish before we read it, then we try again
+                job = ReportJob.objects.filter(
+                    user=request.user, params_digest=digest, status__in=ReportJob.ACTIVE_STATUSES,
+                ).first()
+
+        data = ReportJobSerializer(job, context={'request': request}).data
+        return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Location': data['status_url']})
+
+
+class ReportJobView(generics.RetrieveAPIView):
+    """Status and progress of one of the user's report jobs."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = ReportJobSerializer
+    lookup_url_kwarg = 'job_id'
+
+    def get_queryset(self):
+        return ReportJob.objects.filter(user=self.request.user)
+
+
+class ReportJobDownloadView(ReportJobView):
+    def retrieve(self, request, *args, **kwargs):
+        job = self.get_object()
+        if job.status != ReportJob.DONE:
+            return Response({"error": f"Report is {job.status}.", "status": job.status},
+                            status=status.HTTP_409_CONFLICT)
+        if not job.file.storage.exists(job.file.name):
+            return Response({"error": "The report file has expired; request the report again."},
+                            status=status.HTTP_410_GONE)
+        return FileResponse(job.file.open('rb'), as_attachment=True,
+                            filename=report_filename(job.params, job.finished_at),
+                            content_type=REPORT_CONTENT_TYPES[job.params['format']])
+
+
+TREND_ANALYSIS_PRESETS = {'daily': 1, 'weekly': 7, 'monthly': 30, 'quarterly': 90}
+
+
+def resolve_trend_analysis_range(data):
+    """
+    (category, date_from, date_to, from_datetime, to_datetime) for a trend
+    analysis request body; raises ValidationError with an "error" message.
+    """
+    category = data.get('category')
+    date_from = data.get('dateRange', {}).get('from')
+    date_to = data.get('dateRange', {}).get('to')
+    time_preset = data.get('timePreset')
+
+    # If time preset is provided, calculate date range
+    if time_preset:
+        if time_preset not in TREND_ANALYSIS_PRESETS:
+            raise ValidationError({"error": f"Invalid time preset: {time_preset}"})
+        end = datetime.now()
+        # Format dates for the query
+        date_from = (end - timedelta(days=TREND_ANALYSIS_PRESETS[time_preset])).strftime('%Y-%m-%d')
+        date_to = end.strftime('%Y-%m-%d')
+
+    if not category or (not time_preset and (not date_from or not date_to)):
+        raise ValidationError({"error": "Missing required parameters: category and either timePreset or dateRange"})
+
+    try:
+        # Convert string dates to datetime objects
+        from_date = datetime.strptime(date_from, "%Y-%m-%d")
+        to_date = datetime.strptime(date_to, "%Y-%m-%d") + timedelta(days=1)  # Include the end date
+    except ValueError:
+        raise ValidationError({"error": "Invalid date format. Please use YYYY-MM-DD."})
+    return category, date_from, date_to, from_date, to_date
+
+
+def trend_analysis_reviews(user_data_ids, category, from_date, to_date):
+    """Texts of the tenant's reviews in the category and date range, newest first."""
+    return Review.objects.filter(
+        user_data_id__in=user_data_ids,
+        category=category,
+        date__gte=from_date,
+        date__lte=to_date
+    ).order_by('-date').values_list('review', flat=True)
+
+
+def trend_analysis_metadata(review_count, category, date_from, date_to):
+    return {
+        "reviewCount": review_count,
+        "dateRange": {"from": date_from, "to": date_to},
+        "category": category
+    }
+
+
+def empty_trend_analysis(category, date_from, date_to):
+    return {
+        "pros": [f"No reviews found for category '{category}' in the selected date range."],
+        "cons": ["Consider selecting a different date range or category."],
+        "positiveInsights": ["No data available"],
+        "negativeInsights": ["No data available"],
+        "summary": f"No reviews found for category '{category}' between {date_from} and {date_to}.",
+        "metadata": trend_analysis_metadata(0, category, date_from, date_to),
+    }
+
+
+TREND_ANALYSIS_ERROR = {
+    "pros": ["Analysis failed. Please try again later."],
+    "cons": ["If the problem persists, contact support."],
+    "positiveInsights": ["Analysis error"],
+    "negativeInsights": ["Analysis error"],
+    "summary": "An error occurred during analysis."
+}
+
+
+class TrendAnalysisView(RollupMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
     def post(self, request):
         try:
-            # Extract request data
-            category = request.data.get('category')
-            date_from = request.data.get('dateRange', {}).get('from')
-            date_to = request.data.get('dateRange', {}).get('to')
-            time_preset = request.data.get('timePreset')
-            
-            # If time preset is provided, calculate date range
-            if time_preset:
-                date_to = datetime.now()
-                if time_preset == 'daily':
-                    date_from = date_to - timedelta(days=1)
-                elif time_preset == 'weekly':
-                    date_from = date_to - timedelta(days=7)
-                elif time_preset == 'monthly':
-                    date_from = date_to - timedelta(days=30)
-                elif time_preset == 'quarterly':
-                    date_from = date_to - timedelta(days=90)
-                else:
-                    return Response(
-                        {"error": f"Invalid time preset: {time_preset}"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                # Format dates for the query
-                date_from = date_from.strftime('%Y-%m-%d')
-                date_to = date_to.strftime('%Y-%m-%d')
-            
-            if not category or (not time_preset and (not date_from or not date_to)):
-                return Response(
-                    {"error": "Missing required parameters: category and either timePreset or dateRange"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
             try:
-                # Convert string dates to datetime objects
-                from_date = datetime.strptime(date_from, "%Y-%m-%d")
-                to_date = datetime.strptime(date_to, "%Y-%m-%d") + timedelta(days=1)  # Include the end date
-            except ValueError:
-                return Response(
-                    {"error": "Invalid date format. Please use YYYY-MM-DD."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Query database for ALL reviews in the date range for the selected category
-            reviews = Review.objects.filter(
-                category=category,
-                date__gte=from_date,
-                date__lte=to_date
-            ).order_by('-date')
-            
-            # Get total count for metadata
-            total_count = reviews.count()
-            
-            # Format reviews for analysis - get all of them
-            review_texts = [review.review for review in reviews]
-            
+                category, date_from, date_to, from_date, to_date = resolve_trend_analysis_range(request.data)
+            except ValidationError as exc:
+                return Response(exc.detail, status=status.HTTP_400_BAD_REQUEST)
+
+            # Only the text column: full rows would also drag the embeddings along
+            review_texts = list(trend_analysis_reviews(self.get_user_data_ids(), category, from_date, to_date))
+
             if not review_texts:
-                return Response(
-                    {
-                        "pros": [f"No reviews found for category '{category}' in the selected date range."],
-                        "cons": ["Consider selecting a different date range or category."],
-                        "positiveInsights": ["No data available"],
-                        "negativeInsights": ["No data available"],
-                        "summary": f"No reviews found for category '{category}' between {date_from} and {date_to}.",
-                        "metadata": {
-                            "reviewCount": 0,
-                            "dateRange": {"from": date_from, "to": date_to},
-                            "category": category
-                        }
-                    },
-                    status=status.HTTP_200_OK
-                )
+                return Response(empty_trend_analysis(category, date_from, date_to), status=status.HTTP_200_OK)
                 
             # Generate analysis
             analysis_result = generate_analysis(review_texts, category, date_from)
             
             # Add metadata to the response
-            analysis_result["metadata"] = {
-                "reviewCount": total_count,
-                "dateRange": {"from": date_from, "to": date_to},
-                "category": category
-            }
+            analysis_result["metadata"] = trend_analysis_metadata(len(review_texts), category, date_from, date_to)
             
             return Response(analysis_result)
             
@@ -905,14 +835,6 @@ class TrendAnalysisView(APIView):
             print(f"Error in trend analysis: {str(e)}")
             print(traceback.format_exc())
             return Response(
-                {
-                    "error": str(e),
-                    "pros": ["Analysis failed. Please try again later."],
-                    "cons": ["If the problem persists, contact support."],
-                    "positiveInsights": ["Analysis error"],
-                    "negativeInsights": ["Analysis error"],
-                    "summary": "An error occurred during analysis."
-                },
+                {"error": str(e), **TREND_ANALYSIS_ERROR},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
-
@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import ChatAPIView
+from .views import ChatAPIView, AsyncChatAPIView
 
 
 urlpatterns = [
     path('chat/', ChatAPIView.as_view(), name='chat_api'),
+    path('async/chat/', AsyncChatAPIView.as_view(), name='async_chat_api'),
 ]
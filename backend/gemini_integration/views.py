@@ -4,8 +4,9 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
-from django.http import StreamingHttpResponse
+from django.http import JsonResponse, StreamingHttpResponse
 import json
+import functools
 
 from reviews.models import Review
 from django.db.models import F
@@ -17,6 +18,8 @@ import re
 import datetime
 from django.utils.timezone import now
 
+from dashboard.async_views import AsyncAPIView, run_blocking
+
 # Load environment variables
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 genai.configure(api_key=GEMINI_API_KEY)  
@@ -58,6 +61,48 @@ def format_vector(vector):
     return "[" + ",".join(map(str, vector)) + "]"
 
 
+@functools.lru_cache(maxsize=1)
+def get_embedding_model():
+    # "all-MiniLM-L6-v2" produces 384-dimensional embeddings; load it once per process.
+    return SentenceTransformer("all-MiniLM-L6-v2")
+
+
+def embed_query(user_query):
+    return format_vector(get_embedding_model().encode([user_query])[0].tolist())
+
+
+def similar_reviews(formatted_query, filters, limit=200):
+    """Closest reviews to an embedded query, optionally filtered by sentiment."""
+    qs = Review.objects.filter(embedding__isnull=False)
+    if 'sentiment' in filters:
+        qs = qs.filter(sentiment=filters['sentiment'])
+
+    # Use RawSQL to compute the vector distance, casting the parameter to vector.
+    qs = qs.annotate(
+        distance=RawSQL("embedding <-> %s::vector", (formatted_query,))
+    ).order_by("distance")
+    return list(qs[:limit])
+
+
+def build_chat_prompt(context_str, user_query):
+    system_message = (
+        "You are an AI assistant analyzing Uber reviews. Below are some relevant reviews:\n\n"
+        f"{context_str}\n\n"
+        "Use these reviews to provide an insightful answer to the user's question. "
+        "If the reviews do not provide enough information, indicate uncertainty."
+    )
+    return [
+        {
+            "role": "model",
+            "parts": [{"text": system_message}]
+        },
+        {
+            "role": "user",
+            "parts": [{"text": user_query}]
+        }
+    ]
+
+
 class ChatAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -75,42 +120,16 @@ class ChatAPIView(APIView):
             filters = extract_filters_from_prompt(user_query)
 
             # 2. Embed the query using SentenceTransformer.
-            # "all-MiniLM-L6-v2" produces 384-dimensional embeddings.
-            st_model = SentenceTransformer("all-MiniLM-L6-v2")
-            query_embedding = st_model.encode([user_query])[0].tolist()
-            formatted_query = format_vector(query_embedding)
+            formatted_query = embed_query(user_query)
 
             # 3. Retrieve relevant reviews using vector similarity.
-            qs = Review.objects.filter(embedding__isnull=False)
-            if 'sentiment' in filters:
-                qs = qs.filter(sentiment=filters['sentiment'])
-
-            # Use RawSQL to compute the vector distance, casting the parameter to vector.
-            qs = qs.annotate(
-                distance=RawSQL("embedding <-> %s::vector", (formatted_query,))
-            ).order_by("distance")
-            top_reviews = list(qs[:200])  # Retrieve the top 5 closest reviews
+            top_reviews = similar_reviews(formatted_query, filters)
 
             # 4. Build a context string from the retrieved reviews.
             context_str = build_context_from_reviews(top_reviews)
 
             # 5. Construct the prompt for Gemini.
-            system_message = (
-                "You are an AI assistant analyzing Uber reviews. Below are some relevant reviews:\n\n"
-                f"{context_str}\n\n"
-                "Use these reviews to provide an insightful answer to the user's question. "
-                "If the reviews do not provide enough information, indicate uncertainty."
-            )
-            final_prompt = [
-                {
-                    "role": "model",
-                    "parts": [{"text": system_message}]
-                },
-                {
-                    "role": "user",
-                    "parts": [{"text": user_query}]
-                }
-            ]
+            final_prompt = build_chat_prompt(context_str, user_query)
 
             # 6. Call Gemini to generate a response.
             model = genai.GenerativeModel('gemini-1.5-pro')
@@ -123,3 +142,25 @@ class ChatAPIView(APIView):
                 {"error": f"Internal server error: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class AsyncChatAPIView(AsyncAPIView):
+    """ChatAPIView for ASGI: embedding, vector search and Gemini never block the event loop."""
+
+    async def post(self, request):
+        messages = request.data.get('messages', [])
+        if not messages:
+            return JsonResponse({"error": "No messages provided."}, status=400)
+        user_query = messages[-1]['content']
+
+        try:
+            filters = extract_filters_from_prompt(user_query)
+            formatted_query = await run_blocking(embed_query, user_query)
+            top_reviews = await run_blocking(similar_reviews, formatted_query, filters)
+            final_prompt = build_chat_prompt(build_context_from_reviews(top_reviews), user_query)
+
+            model = genai.GenerativeModel('gemini-1.5-pro')
+            response = await model.generate_content_async(final_prompt)
+            return {"response": response.text}
+        except Exception as e:
+            return JsonResponse({"error": f"Internal server error: {str(e)}"}, status=500)
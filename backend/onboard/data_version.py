@@ -0,0 +1,166 @@
+"""
+Per-tenant data version counters.
+
+A tenant's data version changes every time one of its reviews is
+inserted, re-classified or deleted. Anything derived from that data
+(cached dashboard responses, ETags) stores the version it was computed at
+and is invalid as soon as the counter moves.
+
+Onboarding status and progress have a separate status version, bumped
+when a UserData's status fields change. A scrape saves its progress many
+times, and only the status endpoints (conditional_on_data_version with
+include_status=True) read it, so those saves leave the dashboard caches
+alone.
+"""
+import functools
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+DATA_VERSION_KEY = "data-version:{user_data_id}"
+STATUS_VERSION_KEY = "status-version:{user_data_id}"
+TENANT_KEY = "tenant-user-data:{user_id}"
+
+
+def _seed():
+    # Seeded from the clock so a counter lost to eviction never repeats an old value
+    return time.time_ns()
+
+
+def get_data_version(user_data_id, key_template=DATA_VERSION_KEY):
+    key = key_template.format(user_data_id=user_data_id)
+    version = cache.get(key)
+    if version is None:
+        version = _seed()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def _bump(user_data_id, key_template=DATA_VERSION_KEY):
+    key = key_template.format(user_data_id=user_data_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, _seed(), timeout=None):
+            cache.incr(key)
+
+
+def bump_data_version(user_data_id):
+    """Advance a tenant's version once the current transaction commits."""
+    # Bumping before commit would let a reader cache pre-commit data under the new version
+    transaction.on_commit(lambda: _bump(user_data_id))
+
+
+def bump_status_version(user_data_id):
+    """Advance a tenant's onboarding status version once the current transaction commits."""
+    transaction.on_commit(lambda: _bump(user_data_id, STATUS_VERSION_KEY))
+
+
+def get_user_data_ids(user_id):
+    """UserData ids owned by a user, cached until a new UserData is created for them."""
+    key = TENANT_KEY.format(user_id=user_id)
+    user_data_ids = cache.get(key)
+    if user_data_ids is None:
+        from .models import UserData
+        user_data_ids = sorted(UserData.objects.filter(user_id=user_id).values_list('id', flat=True))
+        cache.set(key, user_data_ids, timeout=None)
+    return user_data_ids
+
+
+def forget_user_data_ids(user_id):
+    transaction.on_commit(lambda: cache.delete(TENANT_KEY.format(user_id=user_id)))
+
+
+def get_tenant_data_version(user_id, key_template=DATA_VERSION_KEY):
+    """Combined version of every UserData a user owns."""
+    keys = {key_template.format(user_data_id=user_data_id): user_data_id
+            for user_data_id in get_user_data_ids(user_id)}
+    found = cache.get_many(keys)
+    return tuple(found[key] if key in found else get_data_version(user_data_id, key_template)
+                 for key, user_data_id in keys.items())
+
+
+def get_tenant_status_version(user_id):
+    return get_tenant_data_version(user_id, STATUS_VERSION_KEY)
+
+
+def request_fingerprint(request, endpoint, kwargs, **extra):
+    """Stable digest of everything besides the data that can change a response."""
+    parts = {
+        'user': request.user.pk,
+        'endpoint': endpoint,
+        'kwargs': {k: str(v) for k, v in kwargs.items()},
+        'params': sorted((k, request.query_params.getlist(k)) for k in request.query_params),
+        **extra,
+    }
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def version_etag(fingerprint, version, media_type=None):
+    """
+    Strong ETag for a response fingerprint at a tenant data version.
+
+    JSON and MessagePack bodies of the same data are different bytes, so the
+    negotiated media type is part of the tag.
+    """
+    digest = hashlib.sha1(f"{fingerprint}:{list(version)}:{media_type or ''}".encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request, etag):
+    if_none_match = request.headers.get('If-None-Match')
+    if not if_none_match:
+        return False
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    tags = {tag.removeprefix('W/') for tag in parse_etags(if_none_match)}
+    return '*' in tags or etag in tags
+
+
+def not_modified(etag):
+    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    tag_response(response, etag)
+    return response
+
+
+def tag_response(response, etag):
+    response['ETag'] = etag
+    patch_vary_headers(response, ['Accept'])
+    # Let browsers keep the body but revalidate it on every poll
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_on_data_version(endpoint, vary_on=None, include_status=False):
+    """
+    Tag a read view's responses with an ETag derived from the tenant's data
+    version and answer a matching If-None-Match with 304 before the handler
+    runs. `vary_on(request)` adds inputs that are not part of the data
+    version, e.g. profile fields of the already-loaded request.user, and
+    `include_status` adds the onboarding status version for views that
+    return UserData status or progress.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            extra = {'vary_on': vary_on(request)} if vary_on else {}
+            fingerprint = request_fingerprint(request, endpoint, kwargs, **extra)
+            version = get_tenant_data_version(request.user.pk)
+            if include_status:
+                version += get_tenant_status_version(request.user.pk)
+            etag = version_etag(fingerprint, version, request.accepted_media_type)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            response = handler(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                tag_response(response, etag)
+            return response
+        return wrapper
+    return decorator
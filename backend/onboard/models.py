@@ -1,7 +1,11 @@
+import json
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.conf import settings
 
+STATUS_FIELDS = ('overall_status', 'current_step', 'step_status')
+
 class UserData(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     overall_status = models.CharField(
@@ -13,6 +17,17 @@ class UserData(models.Model):
     step_status = models.JSONField(default=dict)  # Tracks status of each step
     created_at = models.DateTimeField(auto_now_add=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if all(name in field_names for name in STATUS_FIELDS):
+            instance._status_snapshot = instance.status_snapshot()
+        return instance
+
+    def status_snapshot(self):
+        # step_status is mutated in place, so compare a serialised copy
+        return json.dumps([getattr(self, name) for name in STATUS_FIELDS], sort_keys=True)
+
     def save(self, *args, **kwargs):
         # Initialize step_status if empty
         if not self.step_status:
@@ -20,7 +35,19 @@ class UserData(models.Model):
                 "step1": "pending",
                 "step2": "pending",
             }
+        adding = self._state.adding
         super().save(*args, **kwargs)
+        from .data_version import bump_status_version, forget_user_data_ids
+        if adding:
+            forget_user_data_ids(self.user_id)
+        # Only the onboarding status views read these fields; reviews carry the data version
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not set(update_fields) & set(STATUS_FIELDS):
+            return
+        snapshot = self.status_snapshot()
+        if snapshot != getattr(self, '_status_snapshot', None):
+            bump_status_version(self.pk)
+        self._status_snapshot = snapshot
 
 
 
@@ -427,6 +427,11 @@ def scrape_source_4(user_data, user_id, total_reviews=20, batch_size=20):
 
 
 
+def unclassified_reviews(batch_size):
+    """The next step_2 batch: lowest ids still waiting for a sentiment (review_unclassified_idx)."""
+    return Review.objects.filter(sentiment__isnull=True).order_by('id')[:batch_size]
+
+
 def step_2(user_data, user_id):
     logger.info(f"Step 2 Started for all reviews")
     api_url = "https://3efb-34-32-158-123.ngrok-free.app/analyze_csv"
@@ -445,9 +450,7 @@ def step_2(user_data, user_id):
     # Continue processing until all records are processed
     while True:
         # Get next batch, excluding already processed IDs
-        batch_reviews = Review.objects.filter(
-            sentiment__isnull=True
-        ).order_by('id')[:BATCH_SIZE]
+        batch_reviews = unclassified_reviews(BATCH_SIZE)
 
         if not batch_reviews.exists():
             logger.info("No more unprocessed reviews found.")
@@ -751,19 +754,21 @@ def add_sentiment_analysis(user_data):
     import random
     
     reviews = user_data.reviews.all()
-    for review in reviews:
-        # Simple sentiment based on rating
-        if review.rating >= 4:
-            review.sentiment = 'positive'
-        elif review.rating <= 2:
-            review.sentiment = 'negative'
-        else:
-            review.sentiment = 'neutral'
-        
-        # Add category
-        categories = ['UI/UX', 'Performance', 'Features', 'Customer Service', 'Pricing']
-        review.category = random.choice(categories)
-        review.save()
+    # One transaction so the re-classification and its rollup moves land together
+    with transaction.atomic():
+        for review in reviews:
+            # Simple sentiment based on rating
+            if review.rating >= 4:
+                review.sentiment = 'positive'
+            elif review.rating <= 2:
+                review.sentiment = 'negative'
+            else:
+                review.sentiment = 'neutral'
+
+            # Add category
+            categories = ['UI/UX', 'Performance', 'Features', 'Customer Service', 'Pricing']
+            review.category = random.choice(categories)
+            review.save()
     
     logger.info(f"Added sentiment analysis to {reviews.count()} reviews")
 
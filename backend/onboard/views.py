@@ -2,10 +2,19 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .models import UserData, CustomUser
+from .data_version import conditional_on_data_version
+
+PROFILE_FIELDS = ('id', 'email', 'username', 'website_url', 'company_name', 'designation', 'mobile_number')
+
+
+def profile_fields(request):
+    return [getattr(request.user, field) for field in PROFILE_FIELDS]
+
 
 class CheckProcessingStatusView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_on_data_version('check-status', include_status=True)
     def get(self, request):
         user = request.user
         try:
@@ -47,6 +56,7 @@ class CompleteOnboardingView(APIView):
 class ProfileView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_on_data_version('profile', vary_on=profile_fields, include_status=True)
     def get(self, request):
         user = request.user
         try:
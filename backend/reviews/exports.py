@@ -0,0 +1,146 @@
+"""
+Streaming review exports.
+
+Rows are read with `.values_list().iterator(chunk_size=...)`, which on
+Postgres is a server-side cursor, and written out one chunk at a time, so
+an export holds at most EXPORT_CHUNK_SIZE rows in memory no matter how
+many reviews a tenant has. No model instances or serializers are built.
+"""
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_FIELDS = [
+    'id', 'review_id', 'date', 'rating', 'source', 'review', 'title', 'username', 'url',
+    'language', 'category', 'sub_category', 'sentiment', 'particular_issue', 'summary', 'created_at',
+]
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """File-like object whose write() hands the line straight back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, fields=EXPORT_FIELDS, chunk_size=EXPORT_CHUNK_SIZE):
+    """Tuples of `fields` in (date, id) order, fetched chunk_size rows at a time."""
+    return queryset.order_by('date', 'id').values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def chunked(lines, size):
+    """Join an iterable of strings into chunks of `size` items, one write per chunk."""
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= size:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_csv(queryset, fields=EXPORT_FIELDS, chunk_size=EXPORT_CHUNK_SIZE):
+    writer = csv.writer(Echo())
+
+    def lines():
+        yield writer.writerow(fields)
+        for row in iter_rows(queryset, fields, chunk_size):
+            yield writer.writerow(row)
+
+    # One write per chunk rather than per row keeps the response overhead down
+    return chunked(lines(), chunk_size)
+
+
+def stream_ndjson(queryset, fields=EXPORT_FIELDS, chunk_size=EXPORT_CHUNK_SIZE):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+    def lines():
+        for row in iter_rows(queryset, fields, chunk_size):
+            yield encoder.encode(dict(zip(fields, row))) + '\n'
+
+    return chunked(lines(), chunk_size)
+
+
+EXPORT_WRITERS = {
+    'csv': stream_csv,
+    'ndjson': stream_ndjson,
+}
+
+
+# Parquet snapshots for offline analysis. pyarrow is only needed here, so the
+# rest of the app keeps working without it.
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+PARQUET_BATCH_SIZE = 10_000
+EMBEDDING_DIMENSIONS = 384
+# Low-cardinality text columns are stored as dictionaries: one copy of each value per row group
+DICTIONARY_FIELDS = ('source', 'language', 'category', 'sub_category', 'sentiment')
+PARQUET_FIELDS = EXPORT_FIELDS + ['user_data_id', 'embedding']
+
+
+def parquet_schema():
+    timestamp = pa.timestamp('us', tz='UTC')
+    types = {
+        'id': pa.int64(),
+        'user_data_id': pa.int64(),
+        'date': timestamp,
+        'created_at': timestamp,
+        'rating': pa.float64(),
+        'embedding': pa.list_(pa.float32(), EMBEDDING_DIMENSIONS),
+    }
+    return pa.schema([
+        pa.field(name, types.get(name, pa.dictionary(pa.int32(), pa.string()) if name in DICTIONARY_FIELDS
+                 else pa.string()))
+        for name in PARQUET_FIELDS
+    ])
+
+
+def _record_batch(rows, schema):
+    columns = list(zip(*rows))
+    arrays = []
+    for field, values in zip(schema, columns):
+        if field.name == 'embedding':
+            values = [None if vector is None else [float(x) for x in vector] for vector in values]
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_parquet(queryset, sink, since=None, batch_size=PARQUET_BATCH_SIZE):
+    """
+    Write reviews to Parquet in record batches of `batch_size` rows.
+
+    `since` exports only reviews created after that datetime, for
+    incremental snapshots. Returns the number of rows written.
+    """
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError("Parquet export needs the pyarrow package.")
+    if since is not None:
+        queryset = queryset.filter(created_at__gt=since)
+    schema = parquet_schema()
+    written = 0
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        rows = []
+        for row in iter_rows(queryset, PARQUET_FIELDS, chunk_size=batch_size):
+            rows.append(row)
+            if len(rows) >= batch_size:
+                writer.write_batch(_record_batch(rows, schema))
+                written += len(rows)
+                rows = []
+        if rows:
+            writer.write_batch(_record_batch(rows, schema))
+            written += len(rows)
+    return written
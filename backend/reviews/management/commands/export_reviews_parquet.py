@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from reviews.exports import PARQUET_BATCH_SIZE, write_parquet
+from reviews.models import Review
+
+
+class Command(BaseCommand):
+    """
+    Usage:
+      python manage.py export_reviews_parquet reviews.parquet
+      python manage.py export_reviews_parquet reviews.parquet --user-data 12 --since 2025-06-01T00:00:00Z
+    """
+    help = "Write reviews to a Parquet file in Arrow record batches, optionally only those created since a timestamp."
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Path of the Parquet file to write.")
+        parser.add_argument(
+            '--user-data',
+            type=int,
+            action='append',
+            dest='user_data_ids',
+            help="Only export reviews of this UserData id (repeatable).",
+        )
+        parser.add_argument('--since', help="Only export reviews created after this ISO timestamp.")
+        parser.add_argument('--batch-size', type=int, default=PARQUET_BATCH_SIZE, help="Rows per record batch.")
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError("--since must be an ISO timestamp, e.g. 2025-06-01T00:00:00Z")
+
+        queryset = Review.objects.all()
+        if options['user_data_ids']:
+            queryset = queryset.filter(user_data_id__in=options['user_data_ids'])
+
+        self.stdout.write(f"Exporting reviews to {options['output']}...")
+        try:
+            written = write_parquet(queryset, options['output'], since=since, batch_size=options['batch_size'])
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(f"Parquet export completed! {written} reviews written."))
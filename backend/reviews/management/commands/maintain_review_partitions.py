@@ -0,0 +1,40 @@
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from reviews.partitions import MONTHS_AHEAD, add_months, drop_partitions_before, maintain_partitions, month_start
+
+
+class Command(BaseCommand):
+    """
+    Usage:
+      python manage.py maintain_review_partitions
+      python manage.py maintain_review_partitions --months-ahead 6 --retain-months 24
+    """
+    help = "Create upcoming monthly Review partitions and optionally drop months past retention."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=MONTHS_AHEAD,
+            help=f"Months after the current one to create partitions for (default {MONTHS_AHEAD}).",
+        )
+        parser.add_argument(
+            '--retain-months',
+            type=int,
+            default=getattr(settings, 'REVIEW_PARTITION_RETAIN_MONTHS', None),
+            help="Drop partitions older than this many months (default: keep everything).",
+        )
+
+    def handle(self, *args, **options):
+        created = maintain_partitions(options['months_ahead'])
+        self.stdout.write(f"Created {len(created)} partition(s): {', '.join(created) or '-'}")
+
+        retain = options['retain_months']
+        if retain:
+            cutoff = add_months(month_start(datetime.now(timezone.utc)), -retain)
+            dropped = drop_partitions_before(cutoff)
+            self.stdout.write(f"Dropped {len(dropped)} partition(s) before {cutoff}: {', '.join(dropped) or '-'}")
+
+        self.stdout.write(self.style.SUCCESS("Review partition maintenance completed!"))
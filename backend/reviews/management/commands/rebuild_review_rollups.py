@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from reviews.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    """
+    Usage:
+      python manage.py rebuild_review_rollups
+      python manage.py rebuild_review_rollups --user-data 12 --user-data 15
+    """
+    help = "Recompute the daily review rollups that back the dashboard from the raw Review table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-data',
+            type=int,
+            action='append',
+            dest='user_data_ids',
+            help="Only rebuild rollups for this UserData id (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        user_data_ids = options.get('user_data_ids')
+        scope = f"UserData {', '.join(map(str, user_data_ids))}" if user_data_ids else "all tenants"
+        self.stdout.write(f"Rebuilding review rollups for {scope}...")
+
+        written = rebuild_rollups(user_data_ids)
+
+        self.stdout.write(self.style.SUCCESS(f"Rollup rebuild completed! {written} rows written."))
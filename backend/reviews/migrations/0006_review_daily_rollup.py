@@ -0,0 +1,48 @@
+# Generated by Django 5.2 on 2026-10-18 07:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+BACKFILL_SQL = """
+INSERT INTO reviews_reviewdailyrollup
+    (user_data_id, day, source, category, sentiment, review_count, rating_sum, rating_count)
+SELECT user_data_id,
+       (date AT TIME ZONE 'UTC')::date,
+       source,
+       COALESCE(category, ''),
+       COALESCE(sentiment, ''),
+       COUNT(*),
+       COALESCE(SUM(rating), 0),
+       COUNT(rating)
+FROM reviews_review
+GROUP BY 1, 2, 3, 4, 5
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('onboard', '0001_initial'),
+        ('reviews', '0005_alter_review_embedding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('source', models.CharField(max_length=200)),
+                ('category', models.CharField(blank=True, default='', max_length=100)),
+                ('sentiment', models.CharField(blank=True, default='', max_length=20)),
+                ('review_count', models.IntegerField(default=0)),
+                ('rating_sum', models.FloatField(default=0)),
+                ('rating_count', models.IntegerField(default=0)),
+                ('user_data', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_rollups', to='onboard.userdata')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user_data', 'day', 'source', 'category', 'sentiment'), name='reviews_rollup_key')],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
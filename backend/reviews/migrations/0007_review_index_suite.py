@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 09:12
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('reviews', '0006_review_daily_rollup'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='review',
+            index=models.Index(fields=['user_data', 'date'], name='review_tenant_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='review',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['date'], name='review_date_brin'),
+        ),
+        AddIndexConcurrently(
+            model_name='review',
+            index=models.Index(fields=['user_data', 'category', 'date'], include=('sentiment',), name='review_tenant_cat_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='review',
+            index=models.Index(condition=models.Q(('sentiment__isnull', True)), fields=['id'], name='review_unclassified_idx'),
+        ),
+    ]
@@ -0,0 +1,141 @@
+# Generated by Django 5.2 on 2026-10-18 09:40
+
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.db import migrations
+
+# Frozen copy of reviews.partitions as of this migration: later edits to that
+# module must not change what this migration does.
+MONTHS_AHEAD = 3
+
+MOVE_MONTH_SQL = """
+CREATE TABLE "{name}" (LIKE reviews_review INCLUDING DEFAULTS INCLUDING STORAGE);
+WITH moved AS (
+    DELETE FROM reviews_review_default
+    WHERE date >= '{lower}'::timestamptz AND date < '{upper}'::timestamptz
+    RETURNING *
+)
+INSERT INTO "{name}" SELECT * FROM moved;
+ALTER TABLE reviews_review ATTACH PARTITION "{name}" FOR VALUES FROM ('{lower}') TO ('{upper}');
+"""
+
+REGISTRY_SQL = """
+CREATE TABLE reviews_review_id_registry (
+    review_id varchar(100) PRIMARY KEY
+);
+INSERT INTO reviews_review_id_registry (review_id) SELECT review_id FROM reviews_review;
+
+CREATE FUNCTION reviews_review_register_id() RETURNS trigger AS $$
+BEGIN
+    -- Set while maintenance moves rows between partitions; the review is not going away
+    IF current_setting('reviews.moving_partition_rows', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO reviews_review_id_registry (review_id) VALUES (NEW.review_id);
+    ELSIF TG_OP = 'UPDATE' THEN
+        UPDATE reviews_review_id_registry SET review_id = NEW.review_id WHERE review_id = OLD.review_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        DELETE FROM reviews_review_id_registry WHERE review_id = OLD.review_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER reviews_review_register_id
+AFTER INSERT OR DELETE OR UPDATE OF review_id ON reviews_review
+FOR EACH ROW EXECUTE FUNCTION reviews_review_register_id();
+"""
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def split_default_partition(cursor):
+    """
+    Create a partition (reviews_review_pYYYY_MM) for the current month, the
+    next MONTHS_AHEAD months and every month with rows in the default
+    partition, moving those rows into it.
+    """
+    current = datetime.now(dt_timezone.utc).date().replace(day=1)
+    months = {add_months(current, offset) for offset in range(MONTHS_AHEAD + 1)}
+    cursor.execute("SELECT DISTINCT date_trunc('month', date AT TIME ZONE 'UTC')::date FROM reviews_review_default")
+    months.update(row[0] for row in cursor.fetchall())
+    # Moving rows out of DEFAULT must not touch the review_id registry
+    cursor.execute("SET LOCAL reviews.moving_partition_rows = 'on'")
+    for month in sorted(months):
+        cursor.execute(MOVE_MONTH_SQL.format(
+            name=f"reviews_review_p{month:%Y_%m}",
+            lower=f"{month.isoformat()} 00:00:00+00",
+            upper=f"{add_months(month, 1).isoformat()} 00:00:00+00",
+        ))
+    cursor.execute("SET LOCAL reviews.moving_partition_rows = 'off'")
+
+
+def partition_reviews(apps, schema_editor):
+    """
+    Rebuild reviews_review as a table range-partitioned by month on `date`.
+
+    Indexes and foreign keys are recreated from the old table's catalog
+    entries under their original names, so Django's view of the schema is
+    unchanged. The primary key becomes (id, date), and the unique
+    constraint on review_id moves to reviews_review_id_registry. Postgres
+    requires both because constraints on a partitioned table must include
+    the partition key.
+
+    The copy holds an exclusive lock on reviews_review for its whole run,
+    so this migration needs a maintenance window. It cannot be reversed.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT indexdef FROM pg_indexes
+            WHERE tablename = 'reviews_review' AND indexdef NOT LIKE 'CREATE UNIQUE INDEX%%'
+            """
+        )
+        index_defs = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            """
+            SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = 'reviews_review'::regclass AND contype = 'f'
+            """
+        )
+        foreign_keys = cursor.fetchall()
+
+        cursor.execute(
+            """
+            CREATE TABLE reviews_review_partitioned (
+                LIKE reviews_review INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING STORAGE
+            ) PARTITION BY RANGE (date)
+            """
+        )
+        cursor.execute("ALTER TABLE reviews_review_partitioned ADD CONSTRAINT reviews_review_partitioned_pkey PRIMARY KEY (id, date)")
+        cursor.execute("CREATE TABLE reviews_review_default PARTITION OF reviews_review_partitioned DEFAULT")
+        cursor.execute("INSERT INTO reviews_review_partitioned SELECT * FROM reviews_review")
+        cursor.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM reviews_review")
+        next_id = cursor.fetchone()[0]
+
+        cursor.execute("DROP TABLE reviews_review")
+        cursor.execute("ALTER TABLE reviews_review_partitioned RENAME TO reviews_review")
+        cursor.execute("ALTER TABLE reviews_review RENAME CONSTRAINT reviews_review_partitioned_pkey TO reviews_review_pkey")
+        cursor.execute("ALTER TABLE reviews_review ALTER COLUMN id RESTART WITH %s", [next_id])
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE reviews_review ADD CONSTRAINT "{name}" {definition}')
+        for index_def in index_defs:
+            cursor.execute(index_def)
+        cursor.execute(REGISTRY_SQL)
+        # Split the copied history out of the default partition, one table per month
+        split_default_partition(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_review_index_suite'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_reviews, elidable=False),
+    ]
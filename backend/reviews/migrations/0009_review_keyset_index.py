@@ -0,0 +1,47 @@
+# Generated by Django 5.2 on 2026-10-18 07:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from reviews.partitions import AddPartitionedIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # The (user_data, date, id) index is built per partition with CREATE INDEX CONCURRENTLY while the
+    # old (user_data, date) one keeps serving queries; only the final DROP INDEX takes a brief lock.
+    atomic = False
+
+    dependencies = [
+        ('onboard', '0001_initial'),
+        ('reviews', '0008_partition_review_by_month'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'ALTER INDEX "review_tenant_date_idx" RENAME TO "review_tenant_date_idx_old"',
+                    'ALTER INDEX "review_tenant_date_idx_old" RENAME TO "review_tenant_date_idx"',
+                ),
+            ],
+            state_operations=[
+                migrations.RemoveIndex(
+                    model_name='review',
+                    name='review_tenant_date_idx',
+                ),
+            ],
+        ),
+        AddPartitionedIndexConcurrently(
+            model_name='review',
+            index=models.Index(fields=['user_data', 'date', 'id'], name='review_tenant_date_idx'),
+        ),
+        migrations.RunSQL(
+            'DROP INDEX "review_tenant_date_idx_old"',
+            'CREATE INDEX "review_tenant_date_idx_old" ON "reviews_review" ("user_data_id", "date")',
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='user_data',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='onboard.userdata'),
+        ),
+    ]
@@ -0,0 +1,110 @@
+# Generated by Django 5.2 on 2026-10-18 10:05
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+from reviews.partitions import AddPartitionedIndexConcurrently
+
+# ISO 639-1 codes (and the configs' own names) to Postgres text search
+# configs. Anything else, including a missing language, is indexed with
+# 'simple': no stemming or stop words, but exact words still match.
+SEARCH_SQL = """
+CREATE FUNCTION reviews_review_search_config(language text) RETURNS regconfig AS $$
+    SELECT CASE lower(split_part(split_part(coalesce(language, ''), '-', 1), '_', 1))
+        WHEN 'ar' THEN 'arabic'
+        WHEN 'ca' THEN 'catalan'
+        WHEN 'da' THEN 'danish'
+        WHEN 'de' THEN 'german'
+        WHEN 'el' THEN 'greek'
+        WHEN 'en' THEN 'english'
+        WHEN 'es' THEN 'spanish'
+        WHEN 'fi' THEN 'finnish'
+        WHEN 'fr' THEN 'french'
+        WHEN 'hi' THEN 'hindi'
+        WHEN 'hu' THEN 'hungarian'
+        WHEN 'id' THEN 'indonesian'
+        WHEN 'it' THEN 'italian'
+        WHEN 'nl' THEN 'dutch'
+        WHEN 'no' THEN 'norwegian'
+        WHEN 'nb' THEN 'norwegian'
+        WHEN 'pt' THEN 'portuguese'
+        WHEN 'ro' THEN 'romanian'
+        WHEN 'ru' THEN 'russian'
+        WHEN 'sv' THEN 'swedish'
+        WHEN 'ta' THEN 'tamil'
+        WHEN 'tr' THEN 'turkish'
+        ELSE coalesce(
+            (SELECT cfgname FROM pg_ts_config WHERE cfgname = lower(language) LIMIT 1),
+            'simple'
+        )
+    END::regconfig
+$$ LANGUAGE sql STABLE;
+
+CREATE FUNCTION reviews_review_search_vector() RETURNS trigger AS $$
+DECLARE
+    config regconfig := reviews_review_search_config(NEW.language);
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector(config, coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector(config, coalesce(NEW.review, '')), 'B');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER reviews_review_search_vector
+BEFORE INSERT OR UPDATE OF review, title, language, search_vector ON reviews_review
+FOR EACH ROW EXECUTE FUNCTION reviews_review_search_vector();
+"""
+
+BACKFILL_SQL = """
+UPDATE reviews_review SET search_vector =
+    setweight(to_tsvector(reviews_review_search_config(language), coalesce(title, '')), 'A') ||
+    setweight(to_tsvector(reviews_review_search_config(language), coalesce(review, '')), 'B')
+WHERE id >= %s AND id < %s AND search_vector IS NULL
+"""
+BACKFILL_BATCH_SIZE = 5000
+
+REVERSE_SQL = """
+DROP TRIGGER IF EXISTS reviews_review_search_vector ON reviews_review;
+DROP FUNCTION IF EXISTS reviews_review_search_vector();
+DROP FUNCTION IF EXISTS reviews_review_search_config(text);
+"""
+
+
+def backfill_search_vectors(apps, schema_editor):
+    """
+    Fill search_vector for existing rows in id ranges, one short transaction
+    each, so no batch holds row locks for long. New and edited rows are
+    already handled by the trigger.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT MIN(id), MAX(id) FROM reviews_review")
+        first, last = cursor.fetchone()
+        if first is None:
+            return
+        for start in range(first, last + 1, BACKFILL_BATCH_SIZE):
+            cursor.execute(BACKFILL_SQL, [start, start + BACKFILL_BATCH_SIZE])
+
+
+class Migration(migrations.Migration):
+    # The backfill commits per batch and the GIN index is built per partition concurrently
+    atomic = False
+
+    dependencies = [
+        ('reviews', '0009_review_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(SEARCH_SQL, REVERSE_SQL),
+        migrations.RunPython(backfill_search_vectors, migrations.RunPython.noop),
+        AddPartitionedIndexConcurrently(
+            model_name='review',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='review_search_gin'),
+        ),
+    ]
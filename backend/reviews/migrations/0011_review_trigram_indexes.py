@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 10:40
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+from reviews.partitions import AddPartitionedIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Built per partition with CREATE INDEX CONCURRENTLY; see reviews/partitions.py
+    atomic = False
+
+    dependencies = [
+        ('reviews', '0010_review_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddPartitionedIndexConcurrently(
+            model_name='review',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['username'], name='review_username_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        AddPartitionedIndexConcurrently(
+            model_name='review',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='review_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
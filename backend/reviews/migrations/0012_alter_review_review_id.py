@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # State only. 0008 already replaced the unique index on review_id with the
+    # reviews_review_id_registry table and its trigger; this brings the model
+    # state in line so Django does not believe a unique constraint exists.
+
+    dependencies = [
+        ('reviews', '0011_review_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='review',
+                    name='review_id',
+                    field=models.CharField(max_length=100),
+                ),
+            ],
+        ),
+    ]
@@ -1,12 +1,72 @@
+from itertools import islice
+
 from django.contrib.postgres.fields import ArrayField
-from django.db import models
+from django.contrib.postgres.indexes import BrinIndex, GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
 from onboard.models import UserData
 from pgvector.django import VectorField
 
 
+ROLLUP_FIELD_NAMES = {'user_data', 'user_data_id', 'date', 'source', 'category', 'sentiment', 'rating'}
+UPDATE_BATCH_SIZE = 1000
+
+
+class ReviewQuerySet(models.QuerySet):
+    """
+    Bulk writes that keep ReviewDailyRollup in step (see reviews/rollups.py).
+
+    Updates that touch a rollup column take the affected rows out of the
+    rollups, write, and count them back in, all in one transaction.
+    bulk_update() is covered too, since Django runs it through update().
+    """
+
+    def update(self, **kwargs):
+        if not ROLLUP_FIELD_NAMES & set(kwargs):
+            return super().update(**kwargs)
+        from .rollups import apply_rollup_deltas, collect_rollup_deltas
+        rows, deltas = 0, {}
+        with transaction.atomic(using=self.db):
+            # The filter is evaluated once, by a cursor that locks the rows as it
+            # reads them; each batch then updates exactly the ids it returned, so
+            # rows that start matching mid-way are left alone and no statement
+            # carries more than UPDATE_BATCH_SIZE ids.
+            pks = (self.select_for_update(of=('self',)).order_by()
+                   .values_list('pk', flat=True).iterator(chunk_size=UPDATE_BATCH_SIZE))
+            while batch := list(islice(pks, UPDATE_BATCH_SIZE)):
+                affected = Review.objects.using(self.db).filter(pk__in=batch)
+                collect_rollup_deltas(affected, -1, deltas)
+                rows += super(ReviewQuerySet, affected).update(**kwargs)
+                collect_rollup_deltas(affected, 1, deltas)
+            apply_rollup_deltas(deltas)
+        return rows
+
+    def delete(self):
+        from .rollups import shift_rollups
+        with transaction.atomic(using=self.db):
+            shift_rollups(self, -1)
+            return super().delete()
+
+    def bulk_create(self, objs, *args, **kwargs):
+        if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+            # Which rows were written is unknown; callers rebuild the rollups afterwards
+            return super().bulk_create(objs, *args, **kwargs)
+        from .rollups import add_created_rollups
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            add_created_rollups(objs)
+        return objs
+
+
 class Review(models.Model):
-    user_data = models.ForeignKey(UserData, on_delete=models.CASCADE, related_name="reviews")
-    review_id = models.CharField(max_length=100, unique=True)  # Custom ID from source
+    # Stored as monthly range partitions on `date` (reviews/partitions.py). The
+    # physical primary key is (id, date) and review_id uniqueness is enforced by
+    # the reviews_review_id_registry trigger rather than a unique index, so
+    # review_id is not unique=True here: duplicates surface as IntegrityError on
+    # save, not as model validation errors.
+    # No standalone FK index: every composite index below leads with user_data
+    user_data = models.ForeignKey(UserData, on_delete=models.CASCADE, related_name="reviews", db_index=False)
+    review_id = models.CharField(max_length=100)  # Custom ID from source
     date = models.DateTimeField()
     rating = models.FloatField(null=True, blank=True)
     source = models.CharField(max_length=200)
@@ -29,11 +89,83 @@ class Review(models.Model):
     particular_issue = models.TextField(null=True, blank=True)
     summary = models.TextField(null=True, blank=True)
     embedding = VectorField(dimensions=384, null=True, blank=True, default=None)
+    # Weighted title (A) + review (B) lexemes, maintained by a database trigger
+    # with the text search config for `language` (see reviews/search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
 
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ReviewQuerySet.as_manager()
+
     class Meta:
         indexes = [
             models.Index(fields=['user_data', 'review_id']),
-        ]
\ No newline at end of file
+            # Tenant-scoped date ranges and newest-first keyset pages on (date, id)
+            models.Index(fields=['user_data', 'date', 'id'], name='review_tenant_date_idx'),
+            # Cheap block-range index for date scans across tenants; rows arrive roughly in date order
+            BrinIndex(fields=['date'], name='review_date_brin'),
+            # Per-category drill-downs answered from the index alone
+            models.Index(fields=['user_data', 'category', 'date'], include=['sentiment'],
+                         name='review_tenant_cat_date_idx'),
+            # Full-text search in the feedback explorer
+            GinIndex(fields=['search_vector'], name='review_search_gin'),
+            # Typo-tolerant reviewer and title lookups (pg_trgm)
+            GinIndex(fields=['username'], opclasses=['gin_trgm_ops'], name='review_username_trgm'),
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='review_title_trgm'),
+            # step_2 polls for reviews still waiting for classification
+            models.Index(fields=['id'], condition=models.Q(sentiment__isnull=True),
+                         name='review_unclassified_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what this row contributed to the rollups so a later save can move it
+        from .rollups import ROLLUP_SOURCE_FIELDS, rollup_state
+        if all(name in field_names for name in ROLLUP_SOURCE_FIELDS):
+            instance._rollup_state = rollup_state(instance)
+        return instance
+
+    def save(self, *args, **kwargs):
+        from .rollups import stored_rollup_state, sync_review_rollup
+        # Ingest/enrichment and the dashboard rollups commit or roll back together
+        with transaction.atomic(using=kwargs.get('using')):
+            old = getattr(self, '_rollup_state', None)
+            if old is None and self.pk is not None and not self._state.adding:
+                # Loaded with only()/defer(): read the key it is counted under now
+                old = stored_rollup_state(self.pk)
+            super().save(*args, **kwargs)
+            sync_review_rollup(self, old)
+
+    def delete(self, *args, **kwargs):
+        from .rollups import discard_review_rollup
+        with transaction.atomic(using=kwargs.get('using')):
+            discard_review_rollup(self)
+            return super().delete(*args, **kwargs)
+
+
+class ReviewDailyRollup(models.Model):
+    """
+    Per-tenant daily counts of reviews by source, category and sentiment.
+
+    Maintained by Review.save()/delete() and rebuilt from scratch with
+    `python manage.py rebuild_review_rollups`. Unclassified reviews are
+    stored with an empty category/sentiment so the key stays unique.
+    """
+    user_data = models.ForeignKey(UserData, on_delete=models.CASCADE, related_name="review_rollups")
+    day = models.DateField()
+    source = models.CharField(max_length=200)
+    category = models.CharField(max_length=100, blank=True, default="")
+    sentiment = models.CharField(max_length=20, blank=True, default="")
+    review_count = models.IntegerField(default=0)
+    rating_sum = models.FloatField(default=0)
+    rating_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user_data', 'day', 'source', 'category', 'sentiment'],
+                name='reviews_rollup_key',
+            ),
+        ]
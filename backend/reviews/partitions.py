@@ -0,0 +1,215 @@
+"""
+Monthly range partitions of reviews_review.
+
+reviews_review is partitioned by `date` into one table per UTC calendar
+month (reviews_review_pYYYY_MM) plus a DEFAULT partition that catches
+rows for months that have no partition yet, e.g. old history pulled in by
+a first scrape. `maintain_partitions()` creates the upcoming months and
+moves any months that landed in the default partition into their own
+tables; `drop_partitions_before()` implements retention by dropping whole
+months.
+
+Postgres requires unique constraints on a partitioned table to include
+the partition key, so the global uniqueness of review_id is enforced by a
+trigger-maintained registry table instead (see migration 0008).
+
+Postgres cannot CREATE INDEX CONCURRENTLY on a partitioned table, so
+migrations add indexes with AddPartitionedIndexConcurrently, which builds
+each partition's index concurrently and attaches it to the parent.
+"""
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.contrib.postgres.operations import NotInTransactionMixin
+from django.db import connection, transaction
+from django.db.migrations.operations import AddIndex
+
+PARENT_TABLE = 'reviews_review'
+DEFAULT_PARTITION = 'reviews_review_default'
+PARTITION_PREFIX = 'reviews_review_p'
+MONTHS_AHEAD = 3
+
+
+def month_start(value):
+    """First day of the UTC month containing a date or datetime."""
+    if isinstance(value, datetime):
+        value = value.astimezone(dt_timezone.utc).date()
+    return value.replace(day=1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{PARTITION_PREFIX}{month:%Y_%m}"
+
+
+def _bound(month):
+    return f"{month.isoformat()} 00:00:00+00"
+
+
+def partition_tables(parent, cursor):
+    """Every partition of `parent`, the default one included."""
+    cursor.execute(
+        """
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = %s
+        ORDER BY child.relname
+        """,
+        [parent],
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def create_partitioned_index(schema_editor, model, index):
+    """
+    Build `index` on a partitioned table without blocking writes.
+
+    The parent index is created ON ONLY the parent, which is instant and
+    leaves it invalid. Each partition's index is then built CONCURRENTLY
+    and attached, and the parent index becomes valid once the last one is.
+    Safe to re-run after an interruption.
+    """
+    quote = schema_editor.quote_name
+    table = model._meta.db_table
+    statement = str(index.create_sql(model, schema_editor))
+    prefix = f"CREATE INDEX {quote(index.name)} ON {quote(table)}"
+    if not statement.startswith(prefix):
+        raise ValueError(f"Unexpected index definition: {statement}")
+    definition = statement[len(prefix):]
+
+    schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {quote(index.name)} ON ONLY {quote(table)}{definition}")
+    with schema_editor.connection.cursor() as cursor:
+        partitions = partition_tables(table, cursor)
+    for partition in partitions:
+        child = f"{partition}_{index.name}"[:63]
+        schema_editor.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {quote(child)} ON {quote(partition)}{definition}")
+        schema_editor.execute(f"ALTER INDEX {quote(index.name)} ATTACH PARTITION {quote(child)}")
+
+
+class AddPartitionedIndexConcurrently(NotInTransactionMixin, AddIndex):
+    """AddIndexConcurrently for a partitioned table; see create_partitioned_index()."""
+    atomic = False
+
+    def describe(self):
+        return "Concurrently create partitioned index %s on field(s) %s of model %s" % (
+            self.index.name, ", ".join(self.index.fields), self.model_name,
+        )
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        self._ensure_not_in_transaction(schema_editor)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            create_partitioned_index(schema_editor, model, self.index)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        # Partitioned indexes cannot be dropped concurrently; dropping is quick but locks the table briefly
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index)
+
+
+def month_partitions(cursor=None):
+    """{month: table name} for every monthly partition that exists."""
+    with (cursor or connection.cursor()) as cursor:
+        names = [name for name in partition_tables(PARENT_TABLE, cursor) if name.startswith(PARTITION_PREFIX)]
+    partitions = {}
+    for name in names:
+        year, month = name[len(PARTITION_PREFIX):].split('_')
+        partitions[date(int(year), int(month), 1)] = name
+    return partitions
+
+
+def ensure_month_partition(month):
+    """
+    Create the partition for `month` if it is missing.
+
+    Rows for that month already sitting in the default partition are moved
+    into the new table before it is attached, since Postgres refuses to add
+    a partition whose range overlaps rows in DEFAULT. Returns True when a
+    partition was created.
+    """
+    month = month_start(month)
+    name = partition_name(month)
+    if month in month_partitions():
+        return False
+    quote = connection.ops.quote_name
+    lower, upper = _bound(month), _bound(add_months(month, 1))
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE {quote(name)} (LIKE {quote(PARENT_TABLE)} INCLUDING DEFAULTS INCLUDING STORAGE)")
+        # Moving rows out of DEFAULT must not touch the review_id registry
+        cursor.execute("SET LOCAL reviews.moving_partition_rows = 'on'")
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {quote(DEFAULT_PARTITION)}
+                WHERE date >= %s::timestamptz AND date < %s::timestamptz
+                RETURNING *
+            )
+            INSERT INTO {quote(name)} SELECT * FROM moved
+            """,
+            [lower, upper],
+        )
+        cursor.execute(
+            f"ALTER TABLE {quote(PARENT_TABLE)} ATTACH PARTITION {quote(name)} "
+            f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+        )
+        cursor.execute("SET LOCAL reviews.moving_partition_rows = 'off'")
+    return True
+
+
+def default_partition_months():
+    """Months that currently have rows in the default partition."""
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', date AT TIME ZONE 'UTC')::date FROM {quote(DEFAULT_PARTITION)}"
+        )
+        return sorted(row[0] for row in cursor.fetchall())
+
+
+def maintain_partitions(months_ahead=MONTHS_AHEAD, today=None):
+    """
+    Create partitions for the current and next `months_ahead` months and
+    split any months out of the default partition. Returns the names of the
+    partitions created.
+    """
+    current = month_start(today or datetime.now(dt_timezone.utc))
+    months = [add_months(current, offset) for offset in range(months_ahead + 1)]
+    months += default_partition_months()
+    created = []
+    for month in sorted(set(months)):
+        if ensure_month_partition(month):
+            created.append(partition_name(month))
+    return created
+
+
+def drop_partitions_before(month):
+    """
+    Retention: drop every monthly partition that ends on or before `month`.
+
+    The daily rollups are left intact, so dashboard history survives the
+    raw reviews. Their review_ids stay in the registry, so a re-scrape
+    cannot bring the dropped reviews back. Returns the dropped table names.
+    """
+    from onboard.data_version import bump_data_version
+    from onboard.models import UserData
+
+    cutoff = month_start(month)
+    quote = connection.ops.quote_name
+    dropped = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for partition_month, name in sorted(month_partitions().items()):
+            if add_months(partition_month, 1) > cutoff:
+                continue
+            cursor.execute(f"ALTER TABLE {quote(PARENT_TABLE)} DETACH PARTITION {quote(name)}")
+            cursor.execute(f"DROP TABLE {quote(name)}")
+            dropped.append(name)
+        if dropped:
+            # Review listings change even though the aggregates do not
+            for user_data_id in UserData.objects.values_list('id', flat=True):
+                bump_data_version(user_data_id)
+    return dropped
@@ -0,0 +1,234 @@
+"""
+Incremental maintenance of ReviewDailyRollup.
+
+Every Review write moves its contribution from the rollup row it used to be
+counted in to the row it belongs to now, inside the caller's transaction.
+The dashboard reads these rows instead of re-aggregating reviews_review.
+
+Review.save()/delete() handle single rows, including instances loaded with
+only()/defer(), whose previous key is read back from the table. The
+ReviewQuerySet bulk paths (update(), and through it bulk_update(), delete()
+and bulk_create()) shift the affected rows with aggregate queries, update()
+one batch of ids at a time.
+Raw SQL and bulk_create() with ignore_conflicts/update_conflicts bypass
+this; run `python manage.py rebuild_review_rollups` after either.
+"""
+from datetime import timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.db.models import Count, FloatField, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+from onboard.data_version import bump_data_version
+
+ROLLUP_SOURCE_FIELDS = ('user_data_id', 'date', 'source', 'category', 'sentiment', 'rating')
+
+
+def rollup_day(value):
+    """UTC calendar day a review date is counted under."""
+    from .models import Review
+    value = Review._meta.get_field('date').to_python(value)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, timezone.get_default_timezone())
+    return value.astimezone(dt_timezone.utc).date()
+
+
+def _rollup_key(user_data_id, date, source, category, sentiment):
+    return user_data_id, rollup_day(date), source, category or '', sentiment or ''
+
+
+def rollup_state(review):
+    """The (key, rating) a review contributes to the rollup table."""
+    key = _rollup_key(review.user_data_id, review.date, review.source, review.category, review.sentiment)
+    return key, review.rating
+
+
+def stored_rollup_state(pk):
+    """
+    rollup_state() of the row as it is stored now, or None if there is no
+    such row. Locks the row until the end of the caller's transaction.
+    """
+    from .models import Review
+    row = (Review.objects.select_for_update()
+           .filter(pk=pk)
+           .values_list(*ROLLUP_SOURCE_FIELDS)
+           .first())
+    if row is None:
+        return None
+    *key, rating = row
+    return _rollup_key(*key), rating
+
+
+def _add_delta(deltas, key, count, rating):
+    delta = deltas.setdefault(key, [0, 0.0, 0])
+    delta[0] += count
+    if rating is not None:
+        delta[1] += rating * count
+        delta[2] += count
+
+
+def _apply_deltas(deltas, batch_size=1000):
+    """
+    Add {key: [review_count, rating_sum, rating_count]} to the rollup rows,
+    one multi-row upsert per batch, and drop rows that reach zero.
+    """
+    from .models import ReviewDailyRollup
+    deltas = [(key, delta) for key, delta in deltas.items() if any(delta)]
+    if not deltas:
+        return
+    table = connection.ops.quote_name(ReviewDailyRollup._meta.db_table)
+    with connection.cursor() as cursor:
+        for start in range(0, len(deltas), batch_size):
+            batch = deltas[start:start + batch_size]
+            cursor.execute(
+                f"""
+                INSERT INTO {table}
+                    (user_data_id, day, source, category, sentiment, review_count, rating_sum, rating_count)
+                VALUES {', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s)'] * len(batch))}
+                ON CONFLICT (user_data_id, day, source, category, sentiment) DO UPDATE SET
+                    review_count = {table}.review_count + EXCLUDED.review_count,
+                    rating_sum = {table}.rating_sum + EXCLUDED.rating_sum,
+                    rating_count = {table}.rating_count + EXCLUDED.rating_count
+                """,
+                [value for key, delta in batch for value in (*key, *delta)],
+            )
+        emptied = [key for key, delta in deltas if delta[0] < 0]
+        for start in range(0, len(emptied), batch_size):
+            batch = emptied[start:start + batch_size]
+            cursor.execute(
+                f"""
+                DELETE FROM {table}
+                WHERE (user_data_id, day, source, category, sentiment) IN (
+                    VALUES {', '.join(['(%s::bigint, %s::date, %s, %s, %s)'] * len(batch))}
+                ) AND review_count <= 0
+                """,
+                [value for key in batch for value in key],
+            )
+
+
+def sync_review_rollup(review, old):
+    """
+    Move a just-saved review's contribution from `old`, the rollup_state()
+    it had before the save (None for a new row), to its current rollup row.
+    """
+    new = rollup_state(review)
+    review._rollup_state = new
+    if old == new:
+        return
+    deltas = {}
+    if old is not None:
+        _add_delta(deltas, old[0], -1, old[1])
+    _add_delta(deltas, new[0], 1, new[1])
+    _apply_deltas(deltas)
+    for user_data_id in {key[0] for key in deltas}:
+        bump_data_version(user_data_id)
+
+
+def discard_review_rollup(review):
+    """Remove a review that is about to be deleted from the rollups."""
+    old = getattr(review, '_rollup_state', None)
+    if old is None and review.pk is not None:
+        old = stored_rollup_state(review.pk)
+    if old is not None:
+        deltas = {}
+        _add_delta(deltas, old[0], -1, old[1])
+        _apply_deltas(deltas)
+        bump_data_version(old[0][0])
+    review._rollup_state = None
+
+
+def _grouped_rollups(reviews):
+    """Rollup rows, as dicts, for the reviews in a queryset."""
+    return (reviews
+            .annotate(day=TruncDate('date', tzinfo=dt_timezone.utc),
+                      category_key=Coalesce('category', Value('')),
+                      sentiment_key=Coalesce('sentiment', Value('')))
+            .values('user_data_id', 'day', 'source', 'category_key', 'sentiment_key')
+            .annotate(review_count=Count('id'),
+                      rating_sum=Coalesce(Sum('rating'), Value(0.0), output_field=FloatField()),
+                      rating_count=Count('rating'))
+            .order_by())
+
+
+def collect_rollup_deltas(reviews, sign, deltas):
+    """
+    Add the contribution of every review in a queryset, times `sign`, to
+    `deltas` ({key: [review_count, rating_sum, rating_count]}), in one
+    aggregate query.
+    """
+    for row in _grouped_rollups(reviews).iterator(chunk_size=2000):
+        key = (row['user_data_id'], row['day'], row['source'], row['category_key'], row['sentiment_key'])
+        delta = deltas.setdefault(key, [0, 0.0, 0])
+        delta[0] += sign * row['review_count']
+        delta[1] += sign * row['rating_sum']
+        delta[2] += sign * row['rating_count']
+
+
+def apply_rollup_deltas(deltas):
+    """Write collect_rollup_deltas() output to the rollup table."""
+    _apply_deltas(deltas)
+    for user_data_id in {key[0] for key in deltas}:
+        bump_data_version(user_data_id)
+
+
+def shift_rollups(reviews, sign):
+    """
+    Add (sign=1) or remove (sign=-1) the contribution of every review in a
+    queryset. Used by the bulk ReviewQuerySet paths.
+    """
+    deltas = {}
+    collect_rollup_deltas(reviews, sign, deltas)
+    apply_rollup_deltas(deltas)
+
+
+def add_created_rollups(reviews):
+    """Count reviews that were just inserted with bulk_create()."""
+    deltas = {}
+    for review in reviews:
+        key, rating = rollup_state(review)
+        _add_delta(deltas, key, 1, rating)
+        review._rollup_state = key, rating
+    _apply_deltas(deltas)
+    for user_data_id in {key[0] for key in deltas}:
+        bump_data_version(user_data_id)
+
+
+def rebuild_rollups(user_data_ids=None):
+    """
+    Recompute rollup rows from reviews_review.
+
+    Rebuilds every tenant when user_data_ids is None. Returns the number of
+    rollup rows written.
+    """
+    from onboard.models import UserData
+    from .models import Review, ReviewDailyRollup
+
+    reviews = Review.objects.all()
+    rollups = ReviewDailyRollup.objects.all()
+    if user_data_ids is not None:
+        reviews = reviews.filter(user_data_id__in=user_data_ids)
+        rollups = rollups.filter(user_data_id__in=user_data_ids)
+
+    grouped = _grouped_rollups(reviews)
+
+    with transaction.atomic():
+        rollups.delete()
+        objs = [
+            ReviewDailyRollup(
+                user_data_id=row['user_data_id'],
+                day=row['day'],
+                source=row['source'],
+                category=row['category_key'],
+                sentiment=row['sentiment_key'],
+                review_count=row['review_count'],
+                rating_sum=row['rating_sum'],
+                rating_count=row['rating_count'],
+            )
+            for row in grouped.iterator(chunk_size=2000)
+        ]
+        ReviewDailyRollup.objects.bulk_create(objs, batch_size=2000)
+        if user_data_ids is None:
+            user_data_ids = UserData.objects.values_list('id', flat=True)
+        for user_data_id in user_data_ids:
+            bump_data_version(user_data_id)
+    return len(objs)
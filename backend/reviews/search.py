@@ -0,0 +1,88 @@
+"""
+Full-text search over reviews.
+
+Review.search_vector holds the weighted title (A) and review (B) lexemes,
+kept up to date by a trigger (migration 0010) using the text search config
+that reviews_review_search_config() picks for the review's `language`.
+Searches parse the user's input with websearch_to_tsquery ("quoted
+phrases", -exclusions, OR) so they hit the GIN index, rank matches with
+ts_rank_cd and highlight them with ts_headline. Review text is scraped
+from third-party sites, so it is HTML-escaped before ts_headline adds the
+<mark> tags; the headline is safe to render as HTML.
+
+Fuzzy lookups of reviewers and titles use pg_trgm instead, which
+tolerates typos that full-text search cannot (migration 0011).
+"""
+from django.conf import settings
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import F, FloatField, Func, Q, TextField, Value
+from django.db.models.functions import Cast, Coalesce, Greatest, Replace
+
+HEADLINE_START = '<mark>'
+HEADLINE_STOP = '</mark>'
+
+# Same replacements as django.utils.html.escape; '&' goes first
+HTML_ESCAPES = [('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;'), ('"', '&quot;'), ("'", '&#x27;')]
+
+
+class SearchConfigFor(Func):
+    """reviews_review_search_config(language): the regconfig used for a language code."""
+    function = 'reviews_review_search_config'
+    output_field = TextField()
+
+
+def html_escaped(expression):
+    """`expression` with HTML special characters replaced by entities, in SQL."""
+    for char, entity in HTML_ESCAPES:
+        expression = Replace(expression, Value(char), Value(entity))
+    return expression
+
+
+def search_query(text, language=None):
+    """
+    websearch_to_tsquery for `text` in the language's config.
+
+    It is OR'd with the 'simple' config so reviews in languages without a
+    dedicated config, which are indexed unstemmed, still match exact words.
+    """
+    language = language or getattr(settings, 'REVIEW_SEARCH_LANGUAGE', 'en')
+    query = SearchQuery(text, search_type='websearch', config=SearchConfigFor(Value(language)))
+    return query | SearchQuery(text, search_type='websearch', config='simple')
+
+
+def search_reviews(queryset, text, language=None):
+    """
+    Reviews matching `text`, annotated with `rank` and an HTML `headline`:
+    the escaped review text with matches wrapped in <mark>.
+
+    The headline is only computed for the rows actually returned, since
+    Postgres evaluates it after the ORDER BY ... LIMIT.
+    """
+    query = search_query(text, language)
+    return queryset.filter(search_vector=query).annotate(
+        # float8, so the value round-trips exactly through a keyset cursor
+        rank=Cast(SearchRank(F('search_vector'), query, cover_density=True), FloatField()),
+        headline=SearchHeadline(
+            html_escaped(F('review')), query, config=SearchConfigFor(F('language')),
+            start_sel=HEADLINE_START, stop_sel=HEADLINE_STOP,
+            max_fragments=2, min_words=8, max_words=25,
+        ),
+    )
+
+
+def fuzzy_search_reviews(queryset, text):
+    """
+    Reviews whose username or title contains something close to `text`,
+    most similar first, annotated with `similarity` (0-1).
+
+    Uses pg_trgm word similarity (`<%`), so "jon smtih" still finds
+    "John Smith" and a misspelt word finds titles containing the real one.
+    Both columns have gin_trgm_ops indexes.
+    """
+    return queryset.filter(Q(username__trigram_word_similar=text) | Q(title__trigram_word_similar=text)).annotate(
+        # float8, so the value round-trips exactly through a keyset cursor
+        similarity=Cast(Greatest(
+            TrigramWordSimilarity(text, Coalesce('username', Value(''))),
+            TrigramWordSimilarity(text, Coalesce('title', Value(''))),
+        ), FloatField()),
+    )
@@ -0,0 +1,8 @@
+from celery import shared_task
+from django.core.management import call_command
+
+
+@shared_task
+def maintain_review_partitions():
+    """Scheduled by CELERY_BEAT_SCHEDULE so next month's partition exists before its first review."""
+    call_command('maintain_review_partitions')
@@ -1,3 +1,369 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import re
+from datetime import datetime, timedelta, timezone
 
-# Create your tests here.
+from django.db import IntegrityError, connection, transaction
+from unittest import mock, skipUnless
+
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from dashboard.reports import REPORT_SECTIONS, ReportDataset, normalize_report_params
+from onboard.models import CustomUser, UserData
+from onboard.tasks import unclassified_reviews
+from .exports import EXPORT_FIELDS, PARQUET_AVAILABLE, PARQUET_FIELDS, stream_csv, stream_ndjson, write_parquet
+from .models import Review, ReviewDailyRollup
+from .partitions import maintain_partitions, month_start, partition_name
+from .rollups import collect_rollup_deltas, rebuild_rollups
+from .search import search_reviews
+
+CATEGORIES = ['Bugs', 'Pricing', 'UI/UX', 'Performance', 'Support']
+SENTIMENTS = ['positive', 'negative', 'neutral', None]
+
+# Data versions and view caching live in the cache; keep them off the configured Redis
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReviewRollupTests(TestCase):
+    """Every write path leaves ReviewDailyRollup equal to a rebuild from reviews_review."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = CustomUser.objects.create_user(username='rollups', email='rollups@example.com')
+        cls.user_data = UserData.objects.create(user=user)
+        cls.day = datetime(2025, 3, 10, 12, tzinfo=timezone.utc)
+
+    def make_review(self, n, **fields):
+        values = dict(user_data=self.user_data, review_id=f'r{n}', date=self.day, source='googleplay',
+                      review='text', url='https://example.com', category='Bugs', sentiment='negative', rating=2)
+        values.update(fields)
+        return Review.objects.create(**values)
+
+    def rollups(self):
+        return sorted(ReviewDailyRollup.objects
+                      .filter(user_data=self.user_data)
+                      .values_list('day', 'source', 'category', 'sentiment', 'review_count', 'rating_sum', 'rating_count'))
+
+    def assertRollupsRebuilt(self):
+        """The incrementally maintained rows match a from-scratch rebuild."""
+        maintained = self.rollups()
+        rebuild_rollups([self.user_data.id])
+        self.assertEqual(maintained, self.rollups())
+        return maintained
+
+    def test_registry_enforces_unique_review_id(self):
+        # The model no longer declares review_id unique; the registry trigger rejects duplicates across partitions
+        self.make_review(1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.make_review(1, date=self.day - timedelta(days=90))
+        self.assertEqual(Review.objects.filter(review_id='r1').count(), 1)
+
+    def test_create_counts_review(self):
+        self.make_review(1)
+        self.make_review(2, rating=None)
+        rows = self.assertRollupsRebuilt()
+        self.assertEqual(rows, [(self.day.date(), 'googleplay', 'Bugs', 'negative', 2, 2.0, 1)])
+
+    def test_edit_in_place_updates_rating(self):
+        review = self.make_review(1)
+        review.rating = 5
+        review.save()
+        self.assertEqual(self.assertRollupsRebuilt()[0][4:], (1, 5.0, 1))
+
+    def test_move_between_buckets(self):
+        review = self.make_review(1, sentiment=None, category=None)
+        review.sentiment, review.category = 'positive', 'Pricing'
+        review.date = self.day + timedelta(days=1)
+        review.save()
+        rows = self.assertRollupsRebuilt()
+        self.assertEqual(rows, [((self.day + timedelta(days=1)).date(), 'googleplay', 'Pricing', 'positive', 1, 2.0, 1)])
+
+    def test_save_of_deferred_instance_moves_bucket(self):
+        self.make_review(1)
+        for queryset in (Review.objects.only('id', 'sentiment'), Review.objects.defer('category', 'date')):
+            review = queryset.get(review_id='r1')
+            review.sentiment = 'neutral' if review.sentiment == 'negative' else 'negative'
+            review.save()
+            self.assertEqual([row[4] for row in self.assertRollupsRebuilt()], [1])
+
+    def test_delete_removes_review(self):
+        keep = self.make_review(1)
+        self.make_review(2, category='Pricing')
+        Review.objects.only('id').get(review_id='r2').delete()
+        self.assertEqual(self.assertRollupsRebuilt(), [(self.day.date(), 'googleplay', 'Bugs', 'negative', 1, 2.0, 1)])
+        keep.delete()
+        self.assertEqual(self.rollups(), [])
+
+    def test_bulk_paths(self):
+        Review.objects.bulk_create([
+            Review(user_data=self.user_data, review_id=f'b{n}', date=self.day - timedelta(days=n % 3),
+                   source='googleplay', review='text', url='https://example.com', sentiment=None, rating=n % 5)
+            for n in range(30)
+        ])
+        self.assertRollupsRebuilt()
+        # The filter no longer matches the rows once they are classified
+        Review.objects.filter(sentiment__isnull=True, rating__gte=3).update(sentiment='positive')
+        self.assertRollupsRebuilt()
+        reviews = list(Review.objects.filter(sentiment__isnull=True))
+        for review in reviews:
+            review.category = 'Support'
+        Review.objects.bulk_update(reviews, ['category'])
+        self.assertRollupsRebuilt()
+        Review.objects.filter(rating=0).delete()
+        self.assertEqual(sum(row[4] for row in self.assertRollupsRebuilt()), 24)
+
+    def test_update_touches_only_rows_matched_at_start(self):
+        for n in range(5):
+            self.make_review(n, sentiment=None)
+        calls = []
+
+        def collect(reviews, sign, deltas):
+            if not calls:
+                # A row that starts matching after the filter has been read
+                self.make_review(99, sentiment=None)
+            calls.append(sign)
+            return collect_rollup_deltas(reviews, sign, deltas)
+
+        with mock.patch('reviews.models.UPDATE_BATCH_SIZE', 2), \
+                mock.patch('reviews.rollups.collect_rollup_deltas', collect):
+            self.assertEqual(Review.objects.filter(sentiment__isnull=True).update(sentiment='neutral'), 5)
+        self.assertEqual(calls, [-1, 1] * 3)
+        self.assertIsNone(Review.objects.get(review_id='r99').sentiment)
+        self.assertRollupsRebuilt()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReviewExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = CustomUser.objects.create_user(username='exporter', email='exporter@example.com', password='secret')
+        cls.user = user
+        cls.user_data = UserData.objects.create(user=user)
+        start = datetime(2025, 2, 1, tzinfo=timezone.utc)
+        for i in range(7):
+            Review.objects.create(
+                user_data=cls.user_data, review_id=f'export-{i}', date=start + timedelta(days=i),
+                rating=i or None, source='appstore', review=f'line one\nline "two", {i}', title=f'Título {i}',
+                username=f'user{i}', url=f'https://example.com/{i}', language='es',
+                category=CATEGORIES[i % len(CATEGORIES)], sentiment=SENTIMENTS[i % 4],
+            )
+        other = UserData.objects.create(user=CustomUser.objects.create_user(username='other', email='o@example.com'))
+        Review.objects.create(user_data=other, review_id='not-mine', date=start, source='appstore',
+                              review='private', url='https://example.com')
+
+    def expected_rows(self):
+        return list(Review.objects.filter(user_data=self.user_data).order_by('date', 'id').values_list(*EXPORT_FIELDS))
+
+    def test_csv_rows(self):
+        body = ''.join(stream_csv(Review.objects.filter(user_data=self.user_data), chunk_size=3))
+        header, *rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(header, EXPORT_FIELDS)
+        expected = [['' if value is None else str(value) for value in row] for row in self.expected_rows()]
+        self.assertEqual(rows, expected)
+
+    def test_ndjson_rows(self):
+        body = ''.join(stream_ndjson(Review.objects.filter(user_data=self.user_data), chunk_size=3))
+        records = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([record['review_id'] for record in records], [f'export-{i}' for i in range(7)])
+        first = records[1]
+        self.assertEqual((first['review'], first['title'], first['rating']), ('line one\nline "two", 1', 'Título 1', 1.0))
+        self.assertEqual(datetime.fromisoformat(first['date'].replace('Z', '+00:00')), datetime(2025, 2, 2, tzinfo=timezone.utc))
+        self.assertIsNone(records[0]['rating'])
+
+    def test_export_view_is_tenant_scoped_and_filtered(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/feedback-export/ndjson/?sentiment=positive')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        records = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([record['review_id'] for record in records], ['export-0', 'export-4'])
+        self.assertEqual(client.get('/feedback-export/xml/').status_code, 400)
+
+    @skipUnless(PARQUET_AVAILABLE, "pyarrow is not installed")
+    def test_parquet_rows_and_incremental_since(self):
+        import pyarrow.parquet as pq
+
+        reviews = Review.objects.filter(user_data=self.user_data)
+        Review.objects.filter(review_id='export-2').update(embedding=[0.5] * 384)
+        sink = io.BytesIO()
+        self.assertEqual(write_parquet(reviews, sink, batch_size=3), 7)
+        table = pq.read_table(io.BytesIO(sink.getvalue()))
+        self.assertEqual(table.num_rows, 7)
+        self.assertEqual(table.schema.names, PARQUET_FIELDS)
+        columns = table.to_pydict()
+        expected = self.expected_rows()
+        for position, field in enumerate(EXPORT_FIELDS):
+            self.assertEqual(columns[field], [row[position] for row in expected], field)
+        self.assertEqual(columns['embedding'][2], [0.5] * 384)
+        self.assertIsNone(columns['embedding'][0])
+
+        cutoff = reviews.order_by('created_at')[4].created_at
+        sink = io.BytesIO()
+        self.assertEqual(write_parquet(reviews, sink, since=cutoff), 2)
+
+
+class ReviewSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user_data = UserData.objects.create(user=CustomUser.objects.create_user(username='searcher', email='s@example.com'))
+        for i, text in enumerate([
+            'The app crashes <script>alert(1)</script> on launch',
+            'Crashes when I tap <img src=x onerror="alert(1)"> & then it\'s frozen',
+            'Works fine',
+        ]):
+            Review.objects.create(user_data=user_data, review_id=f'search-{i}', date=datetime(2025, 2, 1, tzinfo=timezone.utc),
+                                  source='reddit', review=text, url='https://example.com')
+
+    def test_headline_escapes_review_html(self):
+        headlines = dict(search_reviews(Review.objects.all(), 'crashes').values_list('review_id', 'headline'))
+        self.assertEqual(set(headlines), {'search-0', 'search-1'})
+        self.assertIn('<mark>crashes</mark> &lt;script&gt;alert(1)&lt;/script&gt; on launch', headlines['search-0'])
+        self.assertIn('&lt;img src=x onerror=&quot;alert(1)&quot;&gt; &amp; then it&#x27;s', headlines['search-1'])
+        for headline in headlines.values():
+            self.assertEqual(re.sub(r'</?mark>', '', headline).count('<'), 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReviewIndexPlanTests(TestCase):
+    """
+    EXPLAIN the Review queries the dashboard and step_2 actually send and
+    check the planner, at its default settings, picks the index suite.
+
+    Twenty tenants with hourly reviews over ~4 months, inserted in date
+    order like a steady stream of scrapes, so one tenant is a small slice
+    of every monthly partition.
+    """
+    tenants = 20
+    reviews_per_tenant = 3000
+
+    @classmethod
+    def setUpTestData(cls):
+        now = datetime.now(timezone.utc)
+        cls.now = now
+        cls.users = []
+        reviews = []
+        for tenant in range(cls.tenants):
+            user = CustomUser.objects.create_user(username=f'tenant{tenant}', email=f'tenant{tenant}@example.com')
+            user_data = UserData.objects.create(user=user)
+            cls.users.append((user, user_data))
+            for i in range(cls.reviews_per_tenant):
+                reviews.append(Review(
+                    user_data=user_data,
+                    review_id=f'{tenant}-{i}',
+                    date=now - timedelta(hours=i, minutes=tenant),
+                    source='googleplay',
+                    review='app crashes on login' if i % 250 == 0 else f'works fine, review {i}',
+                    username=f'reviewer{tenant}_{i}',
+                    url='https://example.com',
+                    category=CATEGORIES[i % len(CATEGORIES)],
+                    # Only a small tail of recent reviews is still unclassified
+                    sentiment=SENTIMENTS[i % 3] if i > 20 else None,
+                ))
+        reviews.sort(key=lambda review: review.date)
+        Review.objects.bulk_create(reviews, batch_size=2000)
+        # The fixture spans several months; split them out of the default partition
+        maintain_partitions(months_ahead=1)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE reviews_review")
+
+    def partition_indexes(self, *index_names):
+        """Names of the parent indexes and the per-partition indexes attached to them."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT child.relname FROM pg_inherits
+                JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE parent.relname = ANY(%s)
+                """,
+                [list(index_names)],
+            )
+            return set(index_names) | {row[0] for row in cursor.fetchall()}
+
+    def explain(self, sql, params=None):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {sql}", params)
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+    def request_plan(self, user, url, data=None):
+        """Plan of the reviews_review query a GET request (or a POST of `data`) runs."""
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url) if data is None else client.post(url, data, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        statements = [query['sql'] for query in queries if 'FROM "reviews_review"' in query['sql']]
+        self.assertEqual(len(statements), 1, statements)
+        return self.explain(statements[0])
+
+    def queryset_plan(self, queryset):
+        return self.explain(*queryset.query.sql_with_params())
+
+    def assertUsesIndex(self, plan, *index_names):
+        self.assertTrue(any(name in plan for name in self.partition_indexes(*index_names)), plan)
+
+    def test_feedback_details_uses_tenant_date_index(self):
+        user, _ = self.users[0]
+        plan = self.request_plan(user, '/feedback-detail/?total=none')
+        self.assertUsesIndex(plan, 'review_tenant_date_idx')
+
+    def test_category_filter_uses_tenant_index(self):
+        user, _ = self.users[2]
+        plan = self.request_plan(user, '/feedback-detail/?category=Bugs&total=none')
+        self.assertUsesIndex(plan, 'review_tenant_cat_date_idx', 'review_tenant_date_idx')
+
+    def test_hourly_series_uses_tenant_index_and_prunes_partitions(self):
+        user, _ = self.users[1]
+        start = (self.now - timedelta(days=2)).date()
+        plan = self.request_plan(
+            user, f'/last-6-months/ALL/?granularity=hour&start={start}&end={self.now.date()}',
+        )
+        self.assertUsesIndex(plan, 'review_tenant_date_idx', 'review_tenant_cat_date_idx')
+        scanned = set(re.findall(r'on (reviews_review_(?:p\d{4}_\d{2}|default)) ', plan))
+        self.assertEqual(scanned, {partition_name(month_start(start)), partition_name(month_start(self.now))}, plan)
+
+    def test_search_uses_gin_index(self):
+        user, _ = self.users[3]
+        plan = self.request_plan(user, '/feedback-detail/?search=crashes&total=none')
+        self.assertUsesIndex(plan, 'review_search_gin')
+
+    def test_fuzzy_lookup_uses_trigram_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT lanname FROM pg_operator
+                JOIN pg_proc ON pg_proc.oid = oprcode JOIN pg_language ON pg_language.oid = prolang
+                WHERE oprname = '%%>' AND oprright = 'text'::regtype
+                """
+            )
+            if cursor.fetchone() != ('c',):
+                self.skipTest("pg_trgm operators are not the native extension's")
+        user, _ = self.users[3]
+        plan = self.request_plan(user, '/feedback-detail/?search=reviewer3_1234&match=fuzzy&total=none')
+        self.assertUsesIndex(plan, 'review_username_trgm', 'review_title_trgm')
+
+    def test_trend_analysis_uses_tenant_category_index(self):
+        user, _ = self.users[4]
+        body = {'category': 'Bugs', 'timePreset': 'weekly'}
+        with mock.patch('dashboard.gemini_service.GEMINI_AVAILABLE', False):
+            plan = self.request_plan(user, '/trends/analysis/', body)
+        self.assertUsesIndex(plan, 'review_tenant_cat_date_idx')
+
+    def test_unclassified_batch_uses_partial_index(self):
+        plan = self.queryset_plan(unclassified_reviews(50))
+        self.assertUsesIndex(plan, 'review_unclassified_idx')
+
+    def test_report_dataset_is_two_queries(self):
+        _, user_data = self.users[1]
+        params = normalize_report_params({'timeFilter': 'monthly', 'sections': REPORT_SECTIONS})
+        with self.assertNumQueries(2):
+            data = ReportDataset(Review.objects.filter(user_data=user_data), params)
+            # Every review in range, read through one server-side cursor
+            reviews = list(data.iter_reviews(chunk_size=50))
+        self.assertEqual(data.total, sum(data.sentiment_counts.values()))
+        self.assertEqual(data.total, sum(source['count'] for source in data.sources))
+        self.assertEqual(len(reviews), data.total)
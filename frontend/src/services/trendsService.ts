@@ -1,5 +1,6 @@
 import axios from 'axios';
 import { DateRange } from 'react-day-picker';
+import { getCSRFToken } from '@/lib/cerfToken.ts';
 
 // Set the base URL for API requests
 const API_URL = 'http://localhost:8000/api';
@@ -40,7 +41,11 @@ export const generateTrendAnalysis = async (
       };
     }
     
-    const response = await axios.post(`${API_URL}/trends/analysis/`, requestData);
+    // The endpoint requires the session login
+    const response = await axios.post(`${API_URL}/trends/analysis/`, requestData, {
+      withCredentials: true,
+      headers: { 'X-CSRFToken': getCSRFToken() || '' },
+    });
     
     return response.data;
   } catch (error) {